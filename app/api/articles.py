@@ -1,21 +1,54 @@
 from sqlite3 import IntegrityError
 from typing import Callable, Optional
 from fastapi import APIRouter, HTTPException, Depends, Query, BackgroundTasks, Request
-from app.database.asyncdb import AsyncDatabase, get_db
-from app.models.article import Filter
-from app.utils.nlp.lang import Lang
-from google.cloud import translate_v2 as translate
+from app.database import BaseDatabase, get_db
+from app.models.article import Filter, parse_fields, project_fields
+from app.api.responses import etag_response, render_json
+from app.backend.cache import get_cache
 import app.backend.event_scheduler as internals
+import app.core.translation as translation
 import logging
 import os
-import html
 
 router = APIRouter()
 log = logging.getLogger(__name__)
 
+# Largest trending `limit`, bounding the rows read and rendered per request
+MAX_TRENDING_LIMIT = 100
+
+
+def articles_cache_params(
+    filter: Filter,
+    page: int,
+    page_size: int,
+    cursor: Optional[str],
+    fields: Optional[list[str]],
+) -> dict:
+    """
+    Returns the cache key parameters of an /articles request, normalized so
+    equivalent filters share a cache entry. Sources and categories are already
+    normalized by `Filter`, as the query uses them.
+    """
+    language = filter.language.upper() if filter.language else None
+    return {
+        "source": filter.source,
+        "category": filter.category,
+        "startDate": filter.startDate,
+        "endDate": filter.endDate,
+        "text": filter.text,
+        "sortBy": "recent" if filter.sortBy in (None, "recent") else "random",
+        "seed": filter.seed,
+        "language": "TAGALOG" if language == "FILIPINO" else language,
+        "page": page if cursor is None else None,
+        "page_size": page_size,
+        "cursor": cursor,
+        "fields": sorted(set(fields)) if fields is not None else None,
+    }
+
 
 @router.get("/")
 async def get_articles(
+    request: Request,
     source: Optional[str] = Query(None),
     category: Optional[str] = Query(None),
     startDate: Optional[str] = Query(None),
@@ -23,9 +56,12 @@ async def get_articles(
     text: Optional[str] = Query(None),
     language: Optional[str] = Query(None),
     sortBy: Optional[str] = Query(None),
+    seed: Optional[int] = Query(None),
     page: int = Query(1),
     page_size: int = Query(30),
-    db: AsyncDatabase = Depends(get_db),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None),
+    db: BaseDatabase = Depends(get_db),
 ):
     filter = Filter(
         source=source,
@@ -35,14 +71,83 @@ async def get_articles(
         text=text,
         language=language,
         sortBy=sortBy,
+        seed=seed,
     )
     try:
-        articles = await db.get_articles(filter, page, page_size)
-        return {
-            "status": "success",
-            "totalResults": len(articles),
-            "articles": articles,
-        }
+        projection = parse_fields(fields)
+        # Random sorting is only cached when seeded, i.e. reproducible
+        is_recent = filter.sortBy in (None, "recent")
+        cache = get_cache() if is_recent or filter.seed is not None else None
+        cache_params = articles_cache_params(
+            filter, page, page_size, cursor, projection
+        )
+        if cache:
+            cache_key = await cache.key("articles", cache_params)
+            cached = await cache.get(cache_key)
+            if cached is not None:
+                return etag_response(request, cached)
+
+        articles, next_cursor = await db.get_article_rows_page(
+            filter, page, page_size, cursor, projection
+        )
+        body = render_json(
+            {
+                "status": "success",
+                "totalResults": len(articles),
+                "articles": (
+                    articles
+                    if projection is None
+                    else [project_fields(article, projection) for article in articles]
+                ),
+                "nextCursor": next_cursor,
+            }
+        )
+        if cache:
+            await cache.set(cache_key, body)
+        return etag_response(request, body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/trending")
+async def get_trending_articles(
+    request: Request,
+    source: Optional[str] = Query(None),
+    category: Optional[str] = Query(None),
+    language: Optional[str] = Query(None),
+    limit: int = Query(30, ge=1, le=MAX_TRENDING_LIMIT),
+    fields: Optional[str] = Query(None),
+    db: BaseDatabase = Depends(get_db),
+):
+    filter = Filter(source=source, category=category, language=language)
+    try:
+        projection = parse_fields(fields)
+        cache = get_cache()
+        cache_params = articles_cache_params(filter, 1, limit, None, projection)
+        cache_key = await cache.key("trending", cache_params)
+        cached = await cache.get(cache_key)
+        if cached is not None:
+            return etag_response(request, cached)
+
+        articles = await db.get_trending_rows(filter, limit, projection)
+        body = render_json(
+            {
+                "status": "success",
+                "totalResults": len(articles),
+                "articles": (
+                    articles
+                    if projection is None
+                    else [project_fields(article, projection) for article in articles]
+                ),
+            }
+        )
+        # Cached for the TTL only, behaviors do not invalidate the cache
+        await cache.set(cache_key, body)
+        return etag_response(request, body)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -74,27 +179,14 @@ async def scrape_all_providers(
 async def translate_article(
     article_id: int,
     service: str = Query("bing", description="The translation service to use."),
-    db: AsyncDatabase = Depends(get_db),
+    db: BaseDatabase = Depends(get_db),
 ):
     try:
         article = await db.get_article_by_id(article_id)
-
-        translated_title = Lang(detector=False).translate_text(
-            article.title, service=service
-        )
-
-        newline_replace = "[-]"
-        clean_text = article.body.replace("\n", newline_replace)
-        translated_body = Lang(detector=False).translate_text(
-            clean_text, service=service
-        )
-        translated_body = translated_body.replace(newline_replace, "\n")
-        translated_body = translated_body.replace("[ -]", "\n").replace("[- ]", "\n")
-        translated_body = html.unescape(translated_body)
-
-        return {
-            "title": translated_title,
-            "body": translated_body,
-        }
+        if article is None:
+            raise HTTPException(status_code=404, detail="Article not found")
+        return await translation.translate_article(db, article, service=service)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -1,6 +1,8 @@
 from typing import Callable
 from app.core.recommender import Recommender
-from app.database.asyncdb import AsyncDatabase, get_db
+from app.database import BaseDatabase, create_database, get_db
+from app.database.pool import get_pool, get_pg_pool, pg_pool_metrics
+from app.backend.cache import get_cache
 from app.utils.scrapers import news
 from app.utils.scrapers.proxy import ProxyScraper
 from fastapi import (
@@ -51,6 +53,17 @@ def verify_key(key: str = Query(...)):
     return key
 
 
+@router.get("/metrics", include_in_schema=False)
+def get_metrics(key: str = Depends(verify_key)):
+    db_pool = get_pool()
+    pg_pool = get_pg_pool()
+    return {
+        "db_pool": db_pool.metrics() if db_pool else None,
+        "pg_pool": pg_pool_metrics(pg_pool) if pg_pool else None,
+        "cache": get_cache().metrics(),
+    }
+
+
 async def add_task(background_tasks: BackgroundTasks, func: Callable, *args, **kwargs):
     async def wrapper():
         await func(*args, **kwargs)
@@ -64,6 +77,11 @@ async def download_db(key: str = Depends(verify_key)):
     if not os.path.exists(db_path):
         raise HTTPException(status_code=404, detail="Database not found")
 
+    # Make sure recent writes in the WAL are part of the downloaded file
+    db_pool = get_pool()
+    if db_pool:
+        await db_pool.checkpoint()
+
     return FileResponse(
         db_path, media_type="application/octet-stream", filename=os.getenv("DB_NAME")
     )
@@ -83,7 +101,7 @@ async def create_upload_db(
     return {"message": "Database uploaded successfully"}
 
 
-async def sync(recommender: Recommender, db: AsyncDatabase):
+async def sync(recommender: Recommender, db: BaseDatabase):
     try:
         if os.getenv("MODEL_LANG") == "en":
             log.info("Skipping sync")
@@ -98,9 +116,19 @@ async def sync(recommender: Recommender, db: AsyncDatabase):
                 "https://newsmead.southeastasia.cloudapp.azure.com/download-db",
                 params={"key": os.getenv("SECRET_KEY")},
             )
-            async with aiofiles.open(second_db, "wb") as f:
-                await f.write(orig_db.content)
-
+            # Connections must be closed while the database file is replaced
+            db_pool = get_pool()
+            if db_pool:
+                async with db_pool.suspended():
+                    async with aiofiles.open(second_db, "wb") as f:
+                        await f.write(orig_db.content)
+            else:
+                async with aiofiles.open(second_db, "wb") as f:
+                    await f.write(orig_db.content)
+            await get_cache().invalidate()
+
+        # The downloaded database may predate the latest migrations
+        await db.migrate()
         # await db.merge_articles(second_db)
         await recommender.save_news(db)
         recommender.load_news()
@@ -114,7 +142,7 @@ async def sync(recommender: Recommender, db: AsyncDatabase):
 async def sync_news(
     bg: BackgroundTasks,
     request: Request,
-    db: AsyncDatabase = Depends(get_db),
+    db: BaseDatabase = Depends(get_db),
     key: str = Depends(verify_key),
 ):
     await add_task(bg, sync, request.app.state.recommender, db)
@@ -152,17 +180,18 @@ async def download_sources(key: str = Depends(verify_key)):
 
 
 # TO BE REMOVED
-async def ts(recommender: Recommender, db: AsyncDatabase):
+async def ts(recommender: Recommender, db: BaseDatabase):
     log.info("Scraping Abante News...")
     proxy = ProxyScraper()
     while proxy.get_proxies() == []:
         await proxy.scrape_proxies()
-    async with AsyncDatabase() as db:
+    async with create_database() as db:
         provider = news.Provider.AbanteNews
         scraper_strategy = news.get_scraper_strategy(provider)
         news_scraper = news.NewsScraper(scraper_strategy)
+        url_index = await db.load_url_index()
         for category in news.Category:
-            articles = await news_scraper.scrape_category(category, proxy)
+            articles = await news_scraper.scrape_category(category, proxy, url_index)
             await db.insert_articles(articles)
         await recommender.save_news(db)
     recommender.load_news()
@@ -176,7 +205,7 @@ async def ts(recommender: Recommender, db: AsyncDatabase):
 
 @router.get("/ts", include_in_schema=False)
 async def test_scrape(
-    bg: BackgroundTasks, request: Request, db: AsyncDatabase = Depends(get_db)
+    bg: BackgroundTasks, request: Request, db: BaseDatabase = Depends(get_db)
 ):
     await add_task(bg, ts, request.app.state.recommender, db)
     return {"message": "Scraping started"}
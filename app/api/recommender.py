@@ -1,11 +1,14 @@
 import os
 from typing import Optional
 from fastapi import APIRouter, Request, HTTPException, Depends, Query
+from fastapi.responses import Response
 from app.core.recommender import Recommender
-from app.database.asyncdb import AsyncDatabase, get_db
-from app.models.article import Filter
+from app.database import BaseDatabase, get_db
+from app.models.article import Filter, parse_fields, project_fields
+from app.api.responses import render_json
 from datetime import datetime
 from pytz import timezone
+import asyncio
 import logging
 import traceback
 
@@ -14,7 +17,7 @@ router = APIRouter()
 
 
 @router.get("/refresh-news")
-async def refresh_news(request: Request, db: AsyncDatabase = Depends(get_db)):
+async def refresh_news(request: Request, db: BaseDatabase = Depends(get_db)):
     try:
         log.info("Refreshing news...")
         request.app.state.recommender = Recommender()
@@ -25,6 +28,17 @@ async def refresh_news(request: Request, db: AsyncDatabase = Depends(get_db)):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def articles_response(articles: list[dict], projection: Optional[list[str]]):
+    if projection is not None:
+        articles = [project_fields(article, projection) for article in articles]
+    return Response(
+        content=render_json(
+            {"status": "success", "totalResults": len(articles), "articles": articles}
+        ),
+        media_type="application/json",
+    )
+
+
 @router.get("/{user_id}")
 async def recommended_articles(
     request: Request,
@@ -32,14 +46,31 @@ async def recommended_articles(
     page: int = Query(1),
     page_size: int = Query(35),
     language: Optional[str] = Query(None),
-    db: AsyncDatabase = Depends(get_db),
+    fields: Optional[str] = Query(None),
+    db: BaseDatabase = Depends(get_db),
 ):
+    try:
+        projection = parse_fields(fields)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
     articles = []
     try:
         log.info(f"Getting recommended articles for user {user_id}...")
-        history = await db.get_user_history(user_id)
         filter = Filter(language=language)
-        articles = await db.get_articles(filter, page, page_size)
+        # The Firestore reads and the article query run concurrently; the
+        # history mirror queries on `db` queue behind the article query
+        profile, (articles, _) = await asyncio.gather(
+            db.get_user_profile(user_id),
+            # Ranking needs the category on top of the requested fields
+            db.get_article_rows_page(
+                filter,
+                page,
+                page_size,
+                fields=None if projection is None else projection + ["category"],
+            ),
+        )
+        history = profile.history
         # log filter if LOG_PREDICT from env is verbose
         if os.getenv("LOG_PREDICT") == "verbose":
             log.info(f"filter: {filter}")
@@ -48,7 +79,16 @@ async def recommended_articles(
         log.info(f"articles count: {len(articles)}")
 
         if len(history) == 0:
-            preferred_categories = await db.get_user_preferences(user_id)
+            # Cold start: most read articles first, then preferred categories on top
+            scores = await db.get_popularity_scores(
+                [article["article_id"] for article in articles]
+            )
+            articles.sort(
+                key=lambda article: scores.get(article["article_id"], 0.0),
+                reverse=True,
+            )
+
+            preferred_categories = profile.preferences
             log.info(f"preferred_categories: {preferred_categories}")
 
             if len(preferred_categories) > 0:
@@ -57,24 +97,20 @@ async def recommended_articles(
                 preferred_articles = []
                 other_articles = []
                 for article in articles:
-                    if article.category in preferred_categories:
+                    if article["category"] in preferred_categories:
                         preferred_articles.append(article)
                     else:
                         other_articles.append(article)
 
                 articles = preferred_articles + other_articles
 
-            return {
-                "status": "success",
-                "totalResults": len(articles),
-                "articles": articles,
-            }
+            return articles_response(articles, projection)
 
-        # Limit history to last 50
+        # Limit history to last 50, the history is ordered by click time
         history = history[-50:]
         impression_news = " ".join(
             [
-                f"{article.article_id}-{'1' if str(article.article_id) in history else '0'}"
+                f"{article['article_id']}-{'1' if str(article['article_id']) in history else '0'}"
                 for article in articles
             ]
         )
@@ -86,14 +122,10 @@ async def recommended_articles(
         await db.insert_behavior(user_id, time_now, history, impression_news, score)
         log.info(f"ranked_ids: {ranked_ids}")
         articles = sorted(
-            articles, key=lambda article: ranked_ids.index(str(article.article_id))
+            articles, key=lambda article: ranked_ids.index(str(article["article_id"]))
         )
     except Exception as e:
         log.error(f"Error predicting (L{e.__traceback__.tb_lineno}): {e}")
         log.error(traceback.format_exc())
 
-    return {
-        "status": "success",
-        "totalResults": len(articles),
-        "articles": articles,
-    }
+    return articles_response(articles, projection)
@@ -0,0 +1,28 @@
+from typing import Any
+from fastapi import Request
+from fastapi.responses import Response
+import hashlib
+import orjson
+
+
+def render_json(content: Any) -> bytes:
+    """
+    Serializes plain dicts/lists straight to JSON bytes, skipping the
+    Pydantic validation and `jsonable_encoder` pass of the default response.
+    """
+    return orjson.dumps(content)
+
+
+def etag_response(request: Request, body: bytes) -> Response:
+    """
+    Returns the JSON `body` with an ETag, or an empty 304 response if the
+    client already has the same representation (If-None-Match).
+    """
+    etag = f'W/"{hashlib.sha1(body).hexdigest()}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    if_none_match = request.headers.get("if-none-match", "")
+    if etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
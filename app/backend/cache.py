@@ -0,0 +1,178 @@
+from collections import OrderedDict
+from typing import Any, Optional
+import hashlib
+import json
+import os
+import time
+import logging
+
+# Configure logging
+log = logging.getLogger(__name__)
+
+
+class LocalCacheBackend:
+    """
+    In-process LRU cache bounded by entry count. The generation counter is
+    local, so only writes made by this process invalidate it.
+    """
+
+    def __init__(self, max_entries: int = 1024):
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self.generation = 0
+
+    async def get(self, key: str) -> Optional[Any]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: Any, ttl: int):
+        self.entries[key] = (time.monotonic() + ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    async def get_generation(self) -> int:
+        return self.generation
+
+    async def bump_generation(self) -> int:
+        self.generation += 1
+        # Entries of older generations can never be hit again
+        self.entries.clear()
+        return self.generation
+
+    def size(self) -> int:
+        return len(self.entries)
+
+
+class RedisCacheBackend:
+    """
+    Redis cache shared by every API node. The generation counter lives in
+    Redis, so a write on one node invalidates the cache of all nodes.
+    """
+
+    generation_key = "newsmead:cache:generation"
+
+    def __init__(self, url: str):
+        import redis.asyncio
+
+        self.redis = redis.asyncio.from_url(url)
+
+    async def get(self, key: str) -> Optional[bytes]:
+        return await self.redis.get(key)
+
+    async def set(self, key: str, value: bytes, ttl: int):
+        await self.redis.set(key, value, ex=ttl)
+
+    async def get_generation(self) -> int:
+        return int(await self.redis.get(self.generation_key) or 0)
+
+    async def bump_generation(self) -> int:
+        return await self.redis.incr(self.generation_key)
+
+    def size(self) -> Optional[int]:
+        return None
+
+
+class ResponseCache:
+    """
+    Caches rendered response bodies (bytes) keyed by namespace, request
+    parameters and the current write generation.
+
+    Writers call `invalidate` after changing articles, which bumps the
+    generation so every previously cached response becomes unreachable.
+    """
+
+    def __init__(self, backend, ttl: int = 600):
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    async def key(self, namespace: str, params: dict) -> Optional[str]:
+        """
+        Returns the cache key of a response under the current generation, or
+        `None` if the generation cannot be read.
+
+        Compute it once before reading the database and pass it to both `get`
+        and `set`: a body read before a write must not be stored under the
+        generation that write started.
+        """
+        try:
+            generation = await self.backend.get_generation()
+        except Exception as e:
+            log.warning(f"Cache generation read failed: {e}")
+            return None
+        digest = hashlib.sha1(
+            json.dumps(params, sort_keys=True, default=str).encode("utf-8")
+        ).hexdigest()
+        return f"newsmead:{namespace}:{generation}:{digest}"
+
+    async def get(self, key: Optional[str]) -> Optional[bytes]:
+        value = None
+        if key is not None:
+            try:
+                value = await self.backend.get(key)
+            except Exception as e:
+                log.warning(f"Cache get failed: {e}")
+
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def set(self, key: Optional[str], value: bytes):
+        if key is None:
+            return
+        try:
+            await self.backend.set(key, value, self.ttl)
+        except Exception as e:
+            log.warning(f"Cache set failed: {e}")
+
+    async def invalidate(self):
+        try:
+            generation = await self.backend.bump_generation()
+            log.info(f"Cache invalidated (generation {generation})")
+        except Exception as e:
+            log.warning(f"Cache invalidation failed: {e}")
+
+    def metrics(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "backend": self.backend.__class__.__name__,
+            "entries": self.backend.size(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / total if total else 0.0,
+        }
+
+
+_cache = ResponseCache(LocalCacheBackend())
+
+
+def configure_cache() -> ResponseCache:
+    """
+    Sets up the response cache from the environment. Redis is used when
+    REDIS_URL is set, otherwise a bounded in-process cache.
+    """
+    global _cache
+    ttl = int(os.getenv("CACHE_TTL", 600))
+    redis_url = os.getenv("REDIS_URL")
+    if redis_url:
+        backend = RedisCacheBackend(redis_url)
+    else:
+        backend = LocalCacheBackend(int(os.getenv("CACHE_MAX_ENTRIES", 1024)))
+    _cache = ResponseCache(backend, ttl=ttl)
+    log.info(f"Response cache: {backend.__class__.__name__} (ttl={ttl}s)")
+    return _cache
+
+
+def get_cache() -> ResponseCache:
+    return _cache
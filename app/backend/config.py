@@ -2,7 +2,17 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from app.core.recommender import Recommender
 from app.backend import event_scheduler
-from app.database.asyncdb import AsyncDatabase
+from app.utils.scrapers.extraction import (
+    create_extraction_pool,
+    close_extraction_pool,
+)
+from app.database import create_database, open_pool, close_pool
+from app.backend.cache import configure_cache
+from app.database.user_store import create_user_store, close_user_store
+from app.utils.nlp.translator import (
+    create_translation_service,
+    close_translation_service,
+)
 import logging.config
 import dotenv
 import os
@@ -68,12 +78,33 @@ async def lifespan(app: FastAPI):
         # Configure logging
         configure_logging()
 
+        # Start the HTML extraction workers before the model is loaded
+        create_extraction_pool()
+
         # Setup ML model
         log.info("Setting up ML model...")
         app.state.recommender = Recommender()
 
+        # Configure response cache
+        configure_cache()
+
+        # Open the translation clients
+        create_translation_service()
+
+        # Create the Firestore client and the user history cache
+        try:
+            create_user_store()
+        except Exception as e:
+            log.error(f"Could not create the Firestore client: {e}")
+
+        # Open the database pool and apply pending schema migrations
+        log.info("Opening database pool...")
+        await open_pool()
+        async with create_database() as db:
+            await db.migrate()
+
         if os.getenv("LOAD_NEWS_ON_STARTUP", "true").lower() == "true":
-            async with AsyncDatabase() as db:
+            async with create_database() as db:
                 await app.state.recommender.save_news(db)
 
             app.state.recommender.load_news()
@@ -85,6 +116,17 @@ async def lifespan(app: FastAPI):
 
         yield
     finally:
+        # Close database connections
+        log.info("Closing database pool...")
+        await close_pool()
+        await close_translation_service()
+        # Imported here, as news.py imports this module
+        from app.utils.scrapers.news import close_scraper_clients
+
+        await close_scraper_clients()
+        close_extraction_pool()
+        close_user_store()
+
         # Shutdown scheduler
         log.info("Shutting down scheduler...")
         app.state.scheduler.shutdown()
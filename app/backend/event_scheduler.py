@@ -2,10 +2,11 @@ from apscheduler.schedulers.asyncio import AsyncIOScheduler
 import httpx
 from pytz import timezone
 from app.utils.scrapers.proxy import ProxyScraper
-from app.database.asyncdb import AsyncDatabase
+from app.database import create_database
 from typing import TYPE_CHECKING
 from fastapi import FastAPI
 import app.utils.scrapers.news as news
+import app.core.translation as translation
 import os
 import logging.config
 
@@ -21,7 +22,7 @@ async def check_and_fix_empty_articles(app: FastAPI):
     proxy = ProxyScraper()
     while proxy.get_proxies() == []:
         await proxy.scrape_proxies()
-    async with AsyncDatabase() as db:
+    async with create_database() as db:
         for provider in news.Provider:
             scraper_strategy = news.get_scraper_strategy(provider)
             news_scraper = news.NewsScraper(scraper_strategy)
@@ -43,12 +44,14 @@ async def scrape_all_providers(app: FastAPI):
     proxy = ProxyScraper()
     while proxy.get_proxies() == []:
         await proxy.scrape_proxies()
-    async with AsyncDatabase() as db:
-        for provider in news.Provider:
-            scraper_strategy = news.get_scraper_strategy(provider)
-            news_scraper = news.NewsScraper(scraper_strategy)
-            articles = await news_scraper.scrape_all(proxy)
+    async with create_database() as db:
+        # Loaded once, every provider dedups against it in memory
+        url_index = await db.load_url_index()
+        results, _ = await news.scrape_providers(proxy, url_index)
+        for articles in results.values():
             await db.insert_articles(articles)
+        # New random neighbors for unseeded random pages
+        await db.reshuffle_articles()
         await recommender.save_news(db)
     recommender.load_news()
     log.info("All providers scraped and loaded.")
@@ -58,6 +61,13 @@ async def scrape_all_providers(app: FastAPI):
             params={"key": os.getenv("SECRET_KEY")},
         )
         log.info("Synced news.")
+    await pretranslate_new_articles(app)
+
+
+async def pretranslate_new_articles(app: FastAPI):
+    # Most translate requests then only read the translations table
+    async with create_database() as db:
+        await translation.pretranslate_articles(db)
 
 
 # Scheduler jobs
@@ -1,5 +1,5 @@
 from concurrent.futures import ThreadPoolExecutor
-from app.database.asyncdb import AsyncDatabase
+from app.database import BaseDatabase
 from aiocsv import AsyncWriter
 import asyncio
 import logging
@@ -108,18 +108,14 @@ class Recommender:
                 await write_func(writer, item)
 
     async def save_news(
-        self, db: AsyncDatabase, chunk_size: int = 1000, news_file: str = None
+        self, db: BaseDatabase, chunk_size: int = 1000, news_file: str = None
     ):
         log.info(f"Saving news...")
         news_file = news_file or self.news_file
         if os.path.exists(news_file):
             os.remove(news_file)
-        cursor = await db.get_all_articles_cursor()
         last_row_in_chunk = None
-        while True:
-            chunk = await cursor.fetchmany(chunk_size)
-            if not chunk:
-                break
+        async for chunk in db.iter_articles(chunk_size):
             last_row_in_chunk = chunk[-1]
             await self.write_chunk_to_tsv(chunk, news_file, self.write_article_to_tsv)
 
@@ -129,7 +125,7 @@ class Recommender:
         log.info(f"Saved news to {news_file}")
 
     async def save_impressions(
-        self, db: AsyncDatabase, chunk_size: int = 1000, impression_file: str = None
+        self, db: BaseDatabase, chunk_size: int = 1000, impression_file: str = None
     ):
         impression_file = impression_file or self.impression_file
         if os.path.exists(impression_file):
@@ -0,0 +1,86 @@
+from datetime import datetime, timedelta
+from app.database import BaseDatabase
+from app.models.article import Article
+from app.utils.nlp.lang import Lang
+from app.utils.nlp.translator import get_translation_service
+import asyncio
+import hashlib
+import logging
+import os
+
+# Configure logging
+log = logging.getLogger(__name__)
+
+
+def content_hash(article: Article) -> str:
+    """
+    Hash of the translated content, so cached translations of an article
+    are not reused after its title or body changes.
+    """
+    content = f"{article.title}\n{article.body}".encode("utf-8")
+    return hashlib.sha1(content).hexdigest()
+
+
+async def translate_article(
+    db: BaseDatabase, article: Article, service: str = "bing", target: str = "fil"
+) -> dict:
+    """
+    Returns the translated title and body of `article`, from the translations
+    table if it was translated before, otherwise from the translation service.
+    """
+    key = content_hash(article)
+    translation = await db.get_translation(article.article_id, target, service, key)
+    if translation is not None:
+        return translation
+
+    translation = await get_translation_service().translate_article(
+        article.title, article.body, service=service, target=target
+    )
+    await db.save_translation(article.article_id, target, service, key, translation)
+    return translation
+
+
+async def pretranslate_articles(db: BaseDatabase, target: str = "fil"):
+    """
+    Translates recent English articles that have no cached translation yet,
+    at most PRETRANSLATE_LIMIT per run and PRETRANSLATE_CONCURRENCY at a time.
+    """
+    limit = int(os.getenv("PRETRANSLATE_LIMIT", 100))
+    if limit <= 0:
+        return
+    concurrency = int(os.getenv("PRETRANSLATE_CONCURRENCY", 4))
+    service = os.getenv("PRETRANSLATE_SERVICE", "bing")
+    since = datetime.now() - timedelta(days=int(os.getenv("PRETRANSLATE_DAYS", 2)))
+
+    lang = Lang()
+    articles = await db.get_untranslated_articles(
+        target, service, int(since.timestamp()), limit, accept=lang.is_english
+    )
+    log.info(f"Pre-translating {len(articles)} articles ({service}, {target})...")
+
+    # Only the translation requests run concurrently: `db` may be a single
+    # connection, which runs one query at a time
+    semaphore = asyncio.Semaphore(concurrency)
+    db_lock = asyncio.Lock()
+
+    async def pretranslate(article: Article) -> bool:
+        try:
+            async with semaphore:
+                translation = await get_translation_service().translate_article(
+                    article.title, article.body, service=service, target=target
+                )
+            async with db_lock:
+                await db.save_translation(
+                    article.article_id,
+                    target,
+                    service,
+                    content_hash(article),
+                    translation,
+                )
+            return True
+        except Exception as e:
+            log.warning(f"Pre-translation failed ({article.article_id}): {e}")
+            return False
+
+    results = await asyncio.gather(*[pretranslate(article) for article in articles])
+    log.info(f"Pre-translated {sum(results)}/{len(articles)} articles.")
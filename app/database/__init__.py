@@ -0,0 +1,43 @@
+from app.database.base import BaseDatabase
+from app.database.asyncdb import AsyncDatabase
+from app.database.asyncpgdb import AsyncPGDatabase
+from app.database import pool
+import os
+
+# Storage backends selectable with the DB_BACKEND environment variable
+BACKENDS: dict[str, type[BaseDatabase]] = {
+    "sqlite": AsyncDatabase,
+    "postgres": AsyncPGDatabase,
+}
+
+
+def get_backend_name() -> str:
+    name = os.getenv("DB_BACKEND", "sqlite").lower()
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown DB_BACKEND: {name}")
+    return name
+
+
+def create_database() -> BaseDatabase:
+    """
+    Returns a database of the configured backend, e.g.
+    `async with create_database() as db: ...`
+    """
+    return BACKENDS[get_backend_name()]()
+
+
+async def open_pool():
+    if get_backend_name() == "postgres":
+        await pool.create_pg_pool()
+    else:
+        await pool.create_pool()
+
+
+async def close_pool():
+    await pool.close_pool()
+    await pool.close_pg_pool()
+
+
+async def get_db():
+    async with create_database() as db:
+        yield db
@@ -1,279 +1,174 @@
-from typing import Any, Optional
-from app.models.article import Article, Filter
-from app.utils.nlp.lang import Lang
-from firebase_admin import firestore, credentials
-import firebase_admin
-import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+from app.backend.cache import get_cache
+from app.database.base import BaseDatabase
+from app.database.pool import SQLitePool, get_pool
+from app.database.query import SQLITE
+from app.database.compression import get_body_codec, register_functions
+from app.database.migrations import (
+    SQLITE_MIGRATIONS,
+    SQLITE_SCHEMA_TABLE,
+    SQLITE_SHUFFLE_KEY,
+    Migration,
+    migrate,
+)
 import os
 import aiosqlite
 import logging
-import json
 
 # Configure logging
 log = logging.getLogger(__name__)
 
+# Rows sampled per index by ANALYZE, which bounds its cost on large tables
+ANALYSIS_LIMIT = 1000
 
-class AsyncDatabase:
-    def __init__(self, db_name=None):
+
+class AsyncDatabase(BaseDatabase):
+    dialect = SQLITE
+    compressed_body = True
+    random_expression = SQLITE_SHUFFLE_KEY
+
+    def __init__(self, db_name=None, pool: Optional[SQLitePool] = None):
         self.db_name = db_name or os.getenv("DB_NAME")
+        # Use the application pool unless a specific database file is requested
+        self.pool = pool or (get_pool() if db_name is None else None)
+        self.conn = None
+        self.body_codec = get_body_codec()
 
     async def __aenter__(self):
-        self.conn = await aiosqlite.connect(self.db_name)
+        if self.pool is None:
+            self.conn = await aiosqlite.connect(self.db_name)
+            await register_functions(self.conn)
         return self
 
     async def __aexit__(self, exc_type, exc_value, traceback):
-        await self.conn.close()
-
-    async def create_article_table(self):
-        query = """
-            CREATE TABLE IF NOT EXISTS articles (
-                article_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                date TEXT,
-                category TEXT,
-                source TEXT,
-                title TEXT,
-                author TEXT,
-                url TEXT UNIQUE,
-                body TEXT,
-                image_url TEXT,
-                read_time TEXT
-            );
+        if self.pool is None:
+            await self.conn.close()
+
+    @asynccontextmanager
+    async def _reader(self):
+        if self.pool is None:
+            yield self.conn
+        else:
+            async with self.pool.reader() as conn:
+                yield conn
+
+    @asynccontextmanager
+    async def _writer(self):
+        if self.pool is None:
+            yield self.conn
+        else:
+            async with self.pool.writer() as conn:
+                yield conn
+
+    async def create_schema_table(self):
+        await self.run_query(SQLITE_SCHEMA_TABLE)
+
+    async def get_schema_version(self) -> int:
+        result = await self.fetch("SELECT MAX(version) FROM schema_migrations;")
+        return result[0][0] or 0
+
+    async def apply_migration(self, migration: Migration):
+        async with self._writer() as conn:
+            try:
+                await conn.execute("BEGIN")
+                for statement in migration.statements:
+                    await conn.execute(statement)
+                await conn.execute(
+                    "INSERT INTO schema_migrations (version, description) VALUES (?, ?);",
+                    (migration.version, migration.description),
+                )
+                await conn.commit()
+            except Exception as e:
+                await conn.rollback()
+                raise e
+
+    async def migrate(self) -> int:
+        version = await migrate(self, SQLITE_MIGRATIONS)
+        await self._backfill_published_at()
+        await self.analyze()
+        return version
+
+    async def analyze(self):
         """
-        await self.run_query(query)
-
-    async def create_behavior_table(self):
-        query = """
-            CREATE TABLE IF NOT EXISTS behaviors (
-                behavior_id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id TEXT,
-                time TEXT,
-                history TEXT,
-                impression_news TEXT,
-                score TEXT
-            );
+        Refreshes the query planner statistics. Without them SQLite cannot tell
+        the partial index of empty articles from the (source, published_at)
+        one and scans the latter.
         """
-        await self.run_query(query)
+        async with self._writer() as conn:
+            await conn.execute(f"PRAGMA analysis_limit={ANALYSIS_LIMIT};")
+            await conn.execute("ANALYZE;")
+            await conn.commit()
 
     async def run_query(self, query, params=None, is_many=False):
-        cursor = await self.conn.cursor()
-        try:
-            if is_many:
-                await cursor.executemany(query, params)
-            else:
-                await cursor.execute(query, params)
-            await self.conn.commit()
-        except Exception as e:
-            await self.conn.rollback()
-            raise e
-
-    async def execute_query(self, query, params=None):
-        return await self.conn.execute(query, params)
+        async with self._writer() as conn:
+            cursor = await conn.cursor()
+            try:
+                if is_many:
+                    await cursor.executemany(query, params)
+                else:
+                    await cursor.execute(query, params)
+                await conn.commit()
+            except Exception as e:
+                await conn.rollback()
+                raise e
+
+    async def insert_rows(
+        self,
+        table_name: str,
+        columns: list[str],
+        rows: list[tuple],
+        followups: Optional[list[tuple[str, list[tuple]]]] = None,
+    ) -> int:
+        query = (
+            f"INSERT INTO {table_name} ({', '.join(columns)})"
+            f" VALUES ({self.query().placeholders(len(columns))}) ON CONFLICT DO NOTHING;"
+        )
+        async with self._writer() as conn:
+            cursor = await conn.cursor()
+            try:
+                await conn.execute("BEGIN")
+                await cursor.executemany(query, rows)
+                # executemany sums the rows changed by every execution
+                inserted = cursor.rowcount
+                for followup, params in followups or []:
+                    await cursor.executemany(followup, params)
+                await conn.commit()
+            except Exception as e:
+                await conn.rollback()
+                raise e
+        return inserted
+
+    async def run_many(self, steps: list[tuple[str, list[tuple]]]):
+        async with self._writer() as conn:
+            cursor = await conn.cursor()
+            try:
+                await conn.execute("BEGIN")
+                for query, params in steps:
+                    await cursor.executemany(query, params)
+                await conn.commit()
+            except Exception as e:
+                await conn.rollback()
+                raise e
 
     async def fetch(self, query, params=None):
-        cursor = await self.execute_query(query, params)
-        return await cursor.fetchall()
+        async with self._reader() as conn:
+            cursor = await conn.execute(query, params)
+            return await cursor.fetchall()
 
     async def table_exists(self, table_name):
         query = f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}';"
         result = await self.fetch(query)
         return bool(result)
 
-    async def drop_table(self, table_name):
-        query = f"DROP TABLE IF EXISTS {table_name};"
-        await self.run_query(query)
-
-    async def show_table(self, table_name):
-        query = f"SELECT * FROM {table_name};"
-        return await self.fetch(query)
-
-    async def insert_data(self, data: list[dict[str, Any]], table_name: str):
-        if not data:
-            return
-
-        columns = ", ".join(data[0].keys())
-        placeholders = ", ".join(["?" for _ in range(len(data[0]))])
-        query = (
-            f"INSERT OR IGNORE INTO {table_name} ({columns}) VALUES ({placeholders});"
-        )
-        values = [tuple(record.values()) for record in data]
-        await self.run_query(query, values, is_many=True)
-
-    async def insert_articles(self, articles: list[Article]):
-        if not articles:
-            return
-
-        if not await self.table_exists("articles"):
-            await self.create_article_table()
-
-        existing_urls = await self.get_existing_urls()
-
-        new_articles = []
-        invalid_count = 0
-        existing_count = 0
-        empty_count = 0
-
-        for article in articles:
-            try:
-                article_dict = article.model_dump()
-                # Temporary fix - remove language data for now
-                article_dict.pop("language", None)
-
-                # Check if article already exists in the database
-                if article_dict["url"] in existing_urls:
-                    log.info(f"Article already exists: {article_dict['title']}")
-                    existing_count += 1
-                    continue
-
-                # Check if "body" key exists and article body is empty
-                if "body" not in article_dict or not article_dict["body"]:
-                    log.info(f"Article body is empty: {article_dict['title']}")
-                    article_dict["body"] = ""
-                    empty_count += 1
-
-                # Log the article to be inserted
-                log_article = article_dict.copy()
-                log_article["body"] = log_article["body"][:10]
-                log.info(f"Inserting article: {log_article}")
-
-                new_articles.append(article_dict)
-
-            except ValueError as e:
-                log.warning(f"Invalid article: {e}")
-                invalid_count += 1
-
-        if new_articles:
-            await self.insert_data(new_articles, "articles")
-
-        log.info(
-            f"Inserted {len(new_articles)}/{len(articles)} (dup:-{existing_count}, inv:-{invalid_count}, emt:+{empty_count}, ok=+{len(new_articles)-empty_count}) articles."
-        )
-
-    async def insert_behavior(
-        self, user_id: str, time: str, history: str, impression_news: str, score: dict
-    ):
-        if not await self.table_exists("behaviors"):
-            await self.create_behavior_table()
-
-        await self.insert_data(
-            [
-                {
-                    "user_id": user_id,
-                    "time": time,
-                    "history": history,
-                    "impression_news": impression_news,
-                    "score": json.dumps(score),
-                }
-            ],
-            "behaviors",
-        )
-
-        log.info(f"Inserted behavior for user {user_id}.")
-
-    async def get_article_by_id(self, article_id: int) -> Article:
-        query = "SELECT * FROM articles WHERE article_id=?;"
-        result = await self.fetch(query, (article_id,))
-        if not result:
-            return None
-        return self._set_article(result[0])
-
-    async def get_articles(
-        self, filter: Filter, page: int = 1, page_size: int = 10
-    ) -> list[Article]:
-        conditions = []
-        params = []
-
-        if filter.source is not None:
-            sources = filter.source.split(",")
-            placeholders = ", ".join("?" for _ in sources)
-            conditions.append(f"source IN ({placeholders})")
-            params.extend(sources)
-
-        if filter.category is not None:
-            categories = filter.category.split(",")
-            placeholders = ", ".join("?" for _ in categories)
-            conditions.append(f"category IN ({placeholders})")
-            params.extend(categories)
-
-        if filter.startDate is not None:
-            conditions.append("date >= ?")
-            params.append(filter.startDate)
-
-        if filter.endDate is not None:
-            conditions.append("date <= ?")
-            params.append(filter.endDate)
-
-        if filter.text is not None:
-            conditions.append("(title LIKE ? OR body LIKE ?)")
-            params.extend([f"%{filter.text}%", f"%{filter.text}%"])
-
-        conditions_sql = " AND ".join(conditions)
-        sort_order = (
-            "date DESC"
-            if filter.sortBy == None or filter.sortBy == "recent"
-            else "RANDOM()"
-        )
-        query = (
-            f"SELECT * FROM articles WHERE {conditions_sql} ORDER BY {sort_order} LIMIT ? OFFSET ?;"
-            if conditions
-            else f"SELECT * FROM articles ORDER BY {sort_order} LIMIT ? OFFSET ?;"
-        )
-
-        lang = Lang()
-        language = filter.language.upper() if filter.language else None
-        # Temporary fix - set page size to 500 for Filipino language
-        if language == "TAGALOG" or language == "FILIPINO":
-            language = "TAGALOG"
-            original_page_size = page_size
-            page_size = 500
-
-        offset = (page - 1) * page_size
-        params.extend([page_size, offset])
-
-        log.info(f"Query: {query}")
-        log.info(f"Params: {params}")
-        results = await self.fetch(query, params)
-        articles = []
-        # Filter out non-matching lang articles and articles with empty bodies
-        for article in self._set_articles(results):
-            if not article.body:
-                continue
-            article.language = lang.detect(article.body[:250])
-            if language and article.language != language:
-                continue
-            articles.append(article)
-
-        # Temporary fix - limit articles to original page size for Filipino language
-        if language == "TAGALOG":
-            articles = articles[:original_page_size]
-        return articles
-
-    async def get_all_articles_cursor(self) -> aiosqlite.Cursor:
-        query = "SELECT * FROM articles;"
-        return await self.execute_query(query)
-
-    async def get_empty_articles(self, provider: str) -> list[Article]:
-        query = "SELECT * FROM articles WHERE (author = '' OR author IS NULL OR body = '' OR body IS NULL OR image_url = '' OR image_url IS NULL) AND source = ?;"
-        articles = await self.fetch(query, (provider,))
-        empty_articles = self._set_articles(articles)
-        log.info(f"Empty articles ({provider}): {len(empty_articles)}")
-        return empty_articles
-
-    def _set_articles(self, articles) -> list[Article]:
-        return [self._set_article(article) for article in articles]
-
-    def _set_article(self, article) -> Article:
-        return Article(
-            article_id=article[0],
-            date=article[1],
-            category=article[2],
-            source=article[3],
-            title=article[4],
-            author=article[5],
-            url=article[6],
-            body=article[7],
-            image_url=article[8],
-            read_time=article[9],
-        )
+    async def iter_articles(self, chunk_size: int = 1000) -> AsyncIterator[list]:
+        async with self._reader() as conn:
+            cursor = await conn.execute(f"{self.query().select_articles()};")
+            while True:
+                chunk = await cursor.fetchmany(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
 
     async def delete_duplicates(self):
         query = """
@@ -285,129 +180,39 @@ class AsyncDatabase:
             );
         """
         await self.run_query(query)
-
-    async def filter_new_urls(
-        self, articles: list[Article], category: str = None
-    ) -> list[Article]:
-        if not articles:
-            return []
-
-        if not await self.table_exists("articles"):
-            return articles
-
-        # Fetch existing URLs asynchronously
-        existing_urls = await self.get_existing_urls(category=category)
-
-        # Use asyncio.gather to parallelize URL filtering
-        tasks = [self.filter_url(article, existing_urls) for article in articles]
-        filtered_articles = await asyncio.gather(*tasks)
-
-        return [article for article in filtered_articles if article is not None]
-
-    async def get_existing_urls(self, category: str = None) -> set:
-        if not await self.table_exists("articles"):
-            return set()
-        query = "SELECT url FROM articles"
-        query += " WHERE category=?" if category else ""
-        params = (category,) if category else None
-        result = await self.fetch(query, params)
-        return set(url[0] for url in result)
-
-    async def filter_url(self, article: Article, existing_urls: set) -> Article:
-        if article.url not in existing_urls:
-            return article
-        return None
-
-    async def url_exists(self, url):
-        query = "SELECT 1 FROM articles WHERE url=?;"
-        result = await self.fetch(query, (url,))
-        return bool(result)
-
-    async def update_empty_articles(self, articles: list[Article]):
-        if not articles:
-            return
-
-        if not await self.table_exists("articles"):
-            return
-
-        query = "UPDATE articles SET author=?, url=?, body=?, image_url=? WHERE article_id=?;"
-        params = [
-            (
-                article.author,
-                article.url,
-                article.body,
-                article.image_url,
-                article.article_id,
+        # Foreign keys are not enforced, so dependent rows are not deleted in cascade
+        for table_name in ("article_bodies", "translations", "article_popularity"):
+            await self.run_query(
+                f"DELETE FROM {table_name} WHERE article_id NOT IN (SELECT article_id FROM articles);"
             )
-            for article in articles
-        ]
-        await self.run_query(query, params, is_many=True)
-        log.info(f"Updated {len(articles)} articles ({articles[0].source}).")
-
-    async def get_article_count(self):
-        query = "SELECT COUNT(1) FROM articles;"
-        result = await self.fetch(query)
-        return result[0][0]
-
-    def _get_firestore_db(self):
-        cred = credentials.Certificate(os.getenv("FIREBASE_ADMIN_SDK_NAME"))
-        if not firebase_admin._apps:
-            firebase_admin.initialize_app(cred)
-        return firestore.client()
-
-    def _get_user_history(self, user_id: str) -> list[str]:
-        db = self._get_firestore_db()
-        user_ref = db.collection("users").document(user_id)
-        if not user_ref.get().exists:
-            return ["-1"]
-        history = user_ref.collection("history")
-        return [doc.id for doc in history.stream()]
-
-    def _get_user_preferences(self, user_id: str) -> list[str]:
-        db = self._get_firestore_db()
-        user_ref = db.collection("users").document(user_id)
-        if not user_ref.get().exists:
-            return ["-1"]
-        categories = user_ref.collection("preferences").document("categories")
-        return categories.get().to_dict().get("categories", [])
-
-    async def get_user_history(self, user_id: str) -> list[str]:
-        history = await asyncio.get_event_loop().run_in_executor(
-            None, self._get_user_history, user_id
-        )
-        if history and history[0] == "-1":
-            raise ValueError(f"User {user_id} does not exist.")
-        return history
-
-    async def get_user_preferences(self, user_id: str) -> list[str]:
-        preferences = await asyncio.get_event_loop().run_in_executor(
-            None, self._get_user_preferences, user_id
-        )
-        if preferences and preferences[0] == "-1":
-            raise ValueError(f"User {user_id} does not exist.")
-        return preferences
 
     async def merge_articles(self, second_db_path: str):
-        try:
-            await self.conn.execute("BEGIN")
-            await self.conn.execute(f"ATTACH DATABASE '{second_db_path}' AS second_db")
-            await self.conn.execute(
-                """
-                INSERT INTO articles (date, category, source, title, author, url, body, image_url, read_time)
-                SELECT date, category, source, title, author, url, body, image_url, read_time
-                FROM second_db.articles
-                LEFT JOIN articles ON second_db.articles.url = articles.url
-                WHERE articles.url IS NULL
-                """
-            )
-            await self.conn.commit()
-        except Exception as e:
-            await self.conn.execute("ROLLBACK")
-            raise e
-        finally:
-            await self.conn.execute("DETACH DATABASE second_db")
-
-
-async def get_db():
-    async with AsyncDatabase() as db:
-        yield db
+        async with self._writer() as conn:
+            # ATTACH is not allowed inside a transaction
+            await conn.execute(f"ATTACH DATABASE '{second_db_path}' AS second_db")
+            try:
+                await conn.execute("BEGIN")
+                await conn.execute(
+                    f"""
+                    INSERT INTO articles (date, category, source, title, author, url, snippet, image_url, read_time, shuffle_key, url_hash, published_at)
+                    SELECT date, category, source, title, author, url, snippet, image_url, read_time, {SQLITE_SHUFFLE_KEY}, url_hash, published_at
+                    FROM second_db.articles
+                    WHERE url NOT IN (SELECT url FROM articles);
+                    """
+                )
+                await conn.execute(
+                    """
+                    INSERT OR IGNORE INTO article_bodies (article_id, body, body_z)
+                    SELECT articles.article_id, second_bodies.body, second_bodies.body_z
+                    FROM second_db.articles AS second_articles
+                    JOIN second_db.article_bodies AS second_bodies USING (article_id)
+                    JOIN articles ON articles.url = second_articles.url;
+                    """
+                )
+                await conn.commit()
+            except Exception as e:
+                await conn.execute("ROLLBACK")
+                raise e
+            finally:
+                await conn.execute("DETACH DATABASE second_db")
+        await get_cache().invalidate()
@@ -0,0 +1,757 @@
+from abc import ABC, abstractmethod
+from typing import Any, AsyncIterator, Callable, Optional
+from app.models.article import ARTICLE_FIELDS, SNIPPET_LENGTH, Article, Filter
+from app.database.pagination import encode_cursor, decode_cursor
+from app.database.migrations import EMPTY_ARTICLE_PREDICATE
+from app.database.query import QueryBuilder, projection_columns
+from app.database.url_index import UrlIndex, url_hash
+from app.database.dates import published_timestamp
+from app.database.popularity import (
+    EPOCH_DECAY,
+    current_score,
+    decay_epoch,
+    event_weight,
+    parse_impressions,
+)
+from app.database.compression import compress_body
+from app.database.user_store import HistoryEntry, UserProfile, get_user_store
+from app.backend.cache import get_cache
+from app.utils.nlp.lang import Lang
+import random
+import time
+import logging
+import json
+
+# Configure logging
+log = logging.getLogger(__name__)
+
+
+class BaseDatabase(ABC):
+    """
+    Storage backend interface shared by the SQLite and Postgres databases.
+
+    Backends only implement connection handling and the few dialect-specific
+    queries; every article query is built with `QueryBuilder` and lives here.
+    """
+
+    dialect: str
+    # Whether article_bodies has the compressed `body_z` column, see compression.py
+    compressed_body = False
+    body_codec: Optional[str] = None
+    # SQL expression of a uniform random number in [0, 1), for `shuffle_key`
+    random_expression = "random()"
+
+    @abstractmethod
+    async def __aenter__(self):
+        pass
+
+    @abstractmethod
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        pass
+
+    @abstractmethod
+    async def migrate(self) -> int:
+        pass
+
+    @abstractmethod
+    async def run_query(self, query, params=None, is_many=False):
+        pass
+
+    @abstractmethod
+    async def fetch(self, query, params=None) -> list:
+        pass
+
+    @abstractmethod
+    async def insert_rows(
+        self,
+        table_name: str,
+        columns: list[str],
+        rows: list[tuple],
+        followups: Optional[list[tuple[str, list[tuple]]]] = None,
+    ) -> int:
+        """
+        Inserts `rows` in one transaction, skipping rows that conflict with a
+        unique index. Returns the number of rows actually inserted.
+
+        `followups` are `(query, params)` pairs run with `executemany` in the same
+        transaction, e.g. to insert rows that reference the new ones.
+        """
+        pass
+
+    @abstractmethod
+    async def run_many(self, steps: list[tuple[str, list[tuple]]]):
+        """
+        Runs every `(query, params)` pair with `executemany` in one transaction.
+        """
+        pass
+
+    @abstractmethod
+    async def table_exists(self, table_name) -> bool:
+        pass
+
+    @abstractmethod
+    async def delete_duplicates(self):
+        pass
+
+    @abstractmethod
+    def iter_articles(self, chunk_size: int = 1000) -> AsyncIterator[list]:
+        """
+        Yields every article row in chunks of `chunk_size` rows.
+        """
+        pass
+
+    def query(self) -> QueryBuilder:
+        return QueryBuilder(self.dialect)
+
+    async def drop_table(self, table_name):
+        query = f"DROP TABLE IF EXISTS {table_name};"
+        await self.run_query(query)
+
+    async def show_table(self, table_name):
+        query = f"SELECT * FROM {table_name};"
+        return await self.fetch(query)
+
+    async def insert_data(self, data: list[dict[str, Any]], table_name: str) -> int:
+        if not data:
+            return 0
+
+        columns = list(data[0].keys())
+        return await self.insert_rows(
+            table_name, columns, [tuple(record.values()) for record in data]
+        )
+
+    async def insert_articles(self, articles: list[Article]) -> int:
+        """
+        Bulk inserts `articles`, relying on the unique URL index to skip the
+        ones already stored. Returns the number of inserted articles.
+        """
+        if not articles:
+            return 0
+
+        rows = {}
+        bodies = []
+        empty_count = 0
+        for article in articles:
+            if article.url in rows:
+                continue
+            if not article.body:
+                log.info(f"Article body is empty: {article.title}")
+                empty_count += 1
+            row = {
+                field: getattr(article, field)
+                for field in ARTICLE_FIELDS[1:]
+                if field != "body"
+            }
+            row["snippet"] = article.body[:SNIPPET_LENGTH]
+            row["shuffle_key"] = random.random()
+            row["url_hash"] = url_hash(article.url)
+            row["published_at"] = published_timestamp(article.date)
+            rows[article.url] = row
+            bodies.append(
+                tuple(self._body_values(article.body).values()) + (article.url,)
+            )
+
+        columns = list(next(iter(rows.values())).keys())
+        # Bodies are matched to the new article ids through the unique URL. The
+        # cast gives Postgres a type for the body parameter of the SELECT.
+        p = self.query().placeholder
+        body_columns = self._body_columns()
+        values = [f"CAST({p(1)} AS TEXT)"] + [
+            p(i + 1) for i in range(1, len(body_columns))
+        ]
+        body_query = (
+            f"INSERT INTO article_bodies (article_id, {', '.join(body_columns)})"
+            f" SELECT article_id, {', '.join(values)} FROM articles"
+            f" WHERE url = {p(len(body_columns) + 1)} ON CONFLICT DO NOTHING;"
+        )
+        inserted = await self.insert_rows(
+            "articles",
+            columns,
+            [tuple(row.values()) for row in rows.values()],
+            followups=[(body_query, bodies)],
+        )
+        if inserted:
+            await get_cache().invalidate()
+
+        log.info(
+            f"Inserted {inserted}/{len(articles)} (dup:-{len(articles)-inserted}, emt:+{empty_count}) articles."
+        )
+        return inserted
+
+    def _body_columns(self) -> list[str]:
+        return ["body", "body_z"] if self.compressed_body else ["body"]
+
+    def _body_values(self, body: str) -> dict[str, Any]:
+        """
+        Returns the article_bodies columns of `body`. With a body codec the
+        text is only stored compressed, in `body_z`.
+        """
+        if not self.compressed_body:
+            return {"body": body}
+        if self.body_codec and body:
+            return {"body": None, "body_z": compress_body(body, self.body_codec)}
+        return {"body": body, "body_z": None}
+
+    async def insert_behavior(
+        self, user_id: str, time: str, history: str, impression_news: str, score: dict
+    ):
+        if not await self.table_exists("behaviors"):
+            await self.migrate()
+
+        behavior = {
+            "user_id": user_id,
+            "time": str(time),
+            "history": history,
+            "impression_news": impression_news,
+            "score": json.dumps(score),
+        }
+        query = (
+            f"INSERT INTO behaviors ({', '.join(behavior)})"
+            f" VALUES ({self.query().placeholders(len(behavior))});"
+        )
+        # The popularity counts are updated with the behavior, in one transaction
+        await self.run_many(
+            [
+                (query, [tuple(behavior.values())]),
+                self._popularity_update(impression_news),
+            ]
+        )
+
+        log.info(f"Inserted behavior for user {user_id}.")
+
+    def _popularity_update(self, impression_news: str) -> tuple[str, list[tuple]]:
+        """
+        Returns the upsert adding the impressions and clicks of a behavior to
+        article_popularity, weighted for the current decay epoch (see
+        popularity.py). Counts of the previous epoch are scaled down first.
+        """
+        epoch, weight = event_weight()
+
+        def carry(column: str) -> str:
+            return (
+                f"CASE article_popularity.epoch"
+                f" WHEN excluded.epoch THEN article_popularity.{column}"
+                f" WHEN excluded.epoch - 1 THEN article_popularity.{column} * {EPOCH_DECAY!r}"
+                f" ELSE 0 END + excluded.{column}"
+            )
+
+        # Selecting from articles skips impressions of deleted articles
+        p = self.query().placeholder
+        query = (
+            "INSERT INTO article_popularity (article_id, epoch, impressions, clicks)"
+            f" SELECT article_id, CAST({p(1)} AS BIGINT), CAST({p(2)} AS DOUBLE PRECISION),"
+            f" CAST({p(3)} AS DOUBLE PRECISION) FROM articles WHERE article_id = {p(4)}"
+            f" ON CONFLICT (article_id) DO UPDATE SET impressions = {carry('impressions')},"
+            f" clicks = {carry('clicks')}, epoch = excluded.epoch;"
+        )
+        params = [
+            (epoch, impressions * weight, clicks * weight, article_id)
+            for article_id, (impressions, clicks) in parse_impressions(
+                impression_news
+            ).items()
+        ]
+        return query, params
+
+    async def get_article_by_id(self, article_id: int) -> Optional[Article]:
+        q = self.query()
+        query = f"{q.select_articles()} WHERE article_id={q.param(article_id)};"
+        result = await self.fetch(query, q.params)
+        if not result:
+            return None
+        return self._set_article(result[0])
+
+    async def get_articles(
+        self,
+        filter: Filter,
+        page: int = 1,
+        page_size: int = 10,
+        cursor: Optional[str] = None,
+        fields: Optional[list[str]] = None,
+    ) -> list[Article]:
+        articles, _ = await self.get_articles_page(
+            filter, page, page_size, cursor, fields
+        )
+        return articles
+
+    async def get_articles_page(
+        self,
+        filter: Filter,
+        page: int = 1,
+        page_size: int = 10,
+        cursor: Optional[str] = None,
+        fields: Optional[list[str]] = None,
+    ) -> tuple[list[Article], Optional[str]]:
+        rows, next_cursor = await self.get_article_rows_page(
+            filter, page, page_size, cursor, fields
+        )
+        return [self._set_row_article(row) for row in rows], next_cursor
+
+    async def get_article_rows_page(
+        self,
+        filter: Filter,
+        page: int = 1,
+        page_size: int = 10,
+        cursor: Optional[str] = None,
+        fields: Optional[list[str]] = None,
+    ) -> tuple[list[dict[str, Any]], Optional[str]]:
+        """
+        Returns a page of articles as plain dicts and the cursor of the next page.
+
+        If `cursor` is given, the page starts right after the article it points to
+        (keyset pagination) and `page` is ignored. The next cursor is `None` when
+        there are no more articles or when sorting randomly without a seed.
+
+        If `fields` is given, only those columns are selected; unselected string
+        fields are left empty and `body` only holds the stored snippet.
+        """
+        is_recent = filter.sortBy is None or filter.sortBy == "recent"
+
+        language = self._filter_language(filter)
+        # Temporary fix - set page size to 500 for Filipino language
+        original_page_size = page_size
+        if language == "TAGALOG":
+            page_size = 500
+
+        if is_recent:
+            after = decode_cursor(cursor) if cursor is not None else None
+            offset = 0 if after is not None else (page - 1) * page_size
+            q = self.query()
+            query = q.articles_query(filter, page_size, offset, after=after, fields=fields)
+            log.info(f"Query: {query}")
+            log.info(f"Params: {q.params}")
+            results = await self.fetch(query, q.params)
+            columns = projection_columns(fields) + ["published_at"]
+            sort_key = "published_at"
+        else:
+            results = await self._sample_article_rows(
+                filter, page, page_size, cursor, fields
+            )
+            columns = projection_columns(fields) + ["shuffle_key"]
+            sort_key = "shuffle_key"
+
+        articles = self._article_dicts(results, columns, language)
+
+        next_cursor = None
+        # Temporary fix - limit articles to original page size for Filipino language
+        if len(articles) > original_page_size:
+            articles = articles[:original_page_size]
+            last = articles[-1]
+            next_cursor = encode_cursor(last[sort_key], last["article_id"])
+        elif len(results) == page_size:
+            last = dict(zip(columns, results[-1]))
+            next_cursor = encode_cursor(last[sort_key], last["article_id"])
+
+        for article in articles:
+            del article[sort_key]
+        if not is_recent and filter.seed is None:
+            next_cursor = None
+        return articles, next_cursor
+
+    def _filter_language(self, filter: Filter) -> Optional[str]:
+        language = filter.language.upper() if filter.language else None
+        return "TAGALOG" if language == "FILIPINO" else language
+
+    def _article_dicts(
+        self, results: list, columns: list[str], language: Optional[str]
+    ) -> list[dict[str, Any]]:
+        """
+        Returns the rows as dicts with their detected `language`, leaving out
+        articles with empty bodies and, if given, those not in `language`.
+        """
+        lang = Lang()
+        articles = []
+        for result in results:
+            article = dict(zip(columns, result))
+            if not article["body"]:
+                continue
+            article["language"] = lang.detect(article["body"][:SNIPPET_LENGTH])
+            if language and article["language"] != language:
+                continue
+            articles.append(article)
+        return articles
+
+    async def get_trending_rows(
+        self, filter: Filter, limit: int = 30, fields: Optional[list[str]] = None
+    ) -> list[dict[str, Any]]:
+        """
+        Returns the most read articles matching `filter` as plain dicts, ranked
+        by clicks decayed over time (see popularity.py), then by impressions.
+        """
+        q = self.query()
+        query = q.trending_query(filter, decay_epoch(), limit, fields)
+        results = await self.fetch(query, q.params)
+        columns = projection_columns(fields) + ["clicks", "impressions"]
+        language = self._filter_language(filter)
+        articles = self._article_dicts(results, columns, language)
+        for article in articles:
+            del article["clicks"], article["impressions"]
+        return articles
+
+    async def get_popularity_scores(self, article_ids: list[int]) -> dict[int, float]:
+        """
+        Returns the decayed click count of each of `article_ids` that has one,
+        e.g. to rank articles for users without a reading history.
+        """
+        if not article_ids:
+            return {}
+
+        q = self.query()
+        query = (
+            "SELECT article_id, epoch, clicks FROM article_popularity"
+            f" WHERE article_id IN ({q.param_list(article_ids)})"
+            f" AND epoch >= {q.param(decay_epoch() - 1)};"
+        )
+        now = time.time()
+        return {
+            article_id: current_score(clicks, epoch, now)
+            for article_id, epoch, clicks in await self.fetch(query, q.params)
+        }
+
+    async def _sample_article_rows(
+        self,
+        filter: Filter,
+        page: int,
+        page_size: int,
+        cursor: Optional[str],
+        fields: Optional[list[str]],
+    ) -> list:
+        """
+        Returns up to `page_size` random article rows by reading the
+        `shuffle_key` order from a random pivot (see `QueryBuilder.sample_query`).
+
+        With `filter.seed` the pivot is fixed, so `page` or `cursor` page through
+        the same order. Without a seed every call returns a new sample.
+        """
+        seed = filter.seed
+        pivot = random.Random(seed).random() if seed is not None else random.random()
+        after = None
+        offset = 0
+        if seed is not None:
+            if cursor is not None:
+                after = decode_cursor(cursor, float)
+            else:
+                offset = (page - 1) * page_size
+
+        rows = []
+        # A cursor below the pivot points into the wrapped pass
+        wrapped = after is not None and after[0] < pivot
+        if not wrapped:
+            q = self.query()
+            query = q.sample_query(
+                filter, page_size, pivot, offset=offset, after=after, fields=fields
+            )
+            rows = list(await self.fetch(query, q.params))
+            if len(rows) == page_size:
+                return rows
+            if rows or not offset:
+                offset = 0
+            else:
+                # The page starts past the first pass, skip what is left of it
+                q = self.query()
+                query = q.sample_count_query(filter, pivot)
+                offset -= (await self.fetch(query, q.params))[0][0]
+            after = None
+
+        q = self.query()
+        query = q.sample_query(
+            filter,
+            page_size - len(rows),
+            pivot,
+            wrapped=True,
+            offset=offset,
+            after=after,
+            fields=fields,
+        )
+        return rows + list(await self.fetch(query, q.params))
+
+    async def get_empty_articles(self, provider: str) -> list[Article]:
+        q = self.query()
+        query = f"{q.select_articles()} WHERE {EMPTY_ARTICLE_PREDICATE} AND source = {q.param(provider)};"
+        articles = await self.fetch(query, q.params)
+        empty_articles = self._set_articles(articles)
+        log.info(f"Empty articles ({provider}): {len(empty_articles)}")
+        return empty_articles
+
+    def _set_articles(self, articles) -> list[Article]:
+        return [self._set_article(article) for article in articles]
+
+    def _set_row_article(self, row: dict[str, Any]) -> Article:
+        data = dict(row)
+        return Article(
+            category=data.pop("category", ""),
+            source=data.pop("source", ""),
+            title=data.pop("title", ""),
+            url=data.pop("url", ""),
+            **data,
+        )
+
+    def _set_article(self, article) -> Article:
+        return Article(
+            article_id=article[0],
+            date=article[1],
+            category=article[2],
+            source=article[3],
+            title=article[4],
+            author=article[5],
+            url=article[6],
+            body=article[7],
+            image_url=article[8],
+            read_time=article[9],
+        )
+
+    async def filter_new_urls(
+        self, articles: list[Article], url_index: Optional[UrlIndex] = None
+    ) -> list[Article]:
+        """
+        Returns the articles that are not stored yet. Pass the `url_index` of the
+        current scrape run to avoid loading it again.
+        """
+        if not articles:
+            return []
+
+        if url_index is None:
+            url_index = await self.load_url_index()
+        return url_index.filter_new(articles)
+
+    async def load_url_index(self) -> UrlIndex:
+        """
+        Loads the URL hashes of every stored article, from the url_hash index.
+        """
+        await self._backfill_url_hashes()
+        result = await self.fetch("SELECT url_hash FROM articles;")
+        url_index = UrlIndex(row[0] for row in result)
+        log.info(f"Loaded URL index ({len(url_index)} articles)")
+        return url_index
+
+    async def _backfill_url_hashes(self):
+        result = await self.fetch(
+            "SELECT article_id, url FROM articles WHERE url_hash IS NULL;"
+        )
+        if not result:
+            return
+
+        p = self.query().placeholder
+        query = f"UPDATE articles SET url_hash={p(1)} WHERE article_id={p(2)};"
+        params = [(url_hash(url or ""), article_id) for article_id, url in result]
+        await self.run_query(query, params, is_many=True)
+        log.info(f"Backfilled {len(params)} URL hashes")
+
+    async def _backfill_published_at(self):
+        """
+        Sets `published_at` of rows stored before it existed (or merged from
+        older databases) from their `date` text. Called by `migrate`.
+        """
+        result = await self.fetch(
+            "SELECT article_id, date FROM articles WHERE published_at IS NULL;"
+        )
+        if not result:
+            return
+
+        p = self.query().placeholder
+        query = f"UPDATE articles SET published_at={p(1)} WHERE article_id={p(2)};"
+        params = [
+            (published_timestamp(date), article_id) for article_id, date in result
+        ]
+        await self.run_query(query, params, is_many=True)
+        log.info(f"Backfilled {len(params)} publication timestamps")
+
+    async def url_exists(self, url):
+        q = self.query()
+        query = f"SELECT 1 FROM articles WHERE url={q.param(url)};"
+        result = await self.fetch(query, q.params)
+        return bool(result)
+
+    async def update_empty_articles(self, articles: list[Article]):
+        if not articles:
+            return
+
+        if not await self.table_exists("articles"):
+            return
+
+        params = []
+        body_params = []
+        for article in articles:
+            params.append(
+                (
+                    article.author,
+                    article.url,
+                    url_hash(article.url),
+                    article.body[:SNIPPET_LENGTH],
+                    article.image_url,
+                    article.article_id,
+                )
+            )
+            body_params.append(
+                (article.article_id,) + tuple(self._body_values(article.body).values())
+            )
+
+        p = self.query().placeholder
+        query = f"UPDATE articles SET author={p(1)}, url={p(2)}, url_hash={p(3)}, snippet={p(4)}, image_url={p(5)} WHERE article_id={p(6)};"
+        body_columns = self._body_columns()
+        body_query = (
+            f"INSERT INTO article_bodies (article_id, {', '.join(body_columns)})"
+            f" VALUES ({self.query().placeholders(len(body_columns) + 1)})"
+            f" ON CONFLICT (article_id) DO UPDATE SET "
+            + ", ".join(f"{column} = excluded.{column}" for column in body_columns)
+            + ";"
+        )
+        await self.run_many([(query, params), (body_query, body_params)])
+        await get_cache().invalidate()
+        log.info(f"Updated {len(articles)} articles ({articles[0].source}).")
+
+    async def reshuffle_articles(self):
+        """
+        Draws a new `shuffle_key` for every article, e.g. after a scrape, so
+        unseeded random pages are not always windows of the same order.
+        Seeded pages then follow the new order too.
+        """
+        await self.run_query(
+            f"UPDATE articles SET shuffle_key = {self.random_expression};"
+        )
+        await get_cache().invalidate()
+        log.info("Reshuffled the articles.")
+
+    async def get_article_count(self):
+        query = "SELECT COUNT(1) FROM articles;"
+        result = await self.fetch(query)
+        return result[0][0]
+
+    async def get_translation(
+        self, article_id: int, target: str, service: str, content_hash: str
+    ) -> Optional[dict[str, str]]:
+        q = self.query()
+        query = (
+            f"SELECT title, body FROM translations WHERE article_id={q.param(article_id)}"
+            f" AND target={q.param(target)} AND service={q.param(service)}"
+            f" AND content_hash={q.param(content_hash)};"
+        )
+        result = await self.fetch(query, q.params)
+        if not result:
+            return None
+        return {"title": result[0][0], "body": result[0][1]}
+
+    async def save_translation(
+        self,
+        article_id: int,
+        target: str,
+        service: str,
+        content_hash: str,
+        translation: dict[str, str],
+    ):
+        await self.insert_data(
+            [
+                {
+                    "article_id": article_id,
+                    "target": target,
+                    "service": service,
+                    "content_hash": content_hash,
+                    "title": translation["title"],
+                    "body": translation["body"],
+                }
+            ],
+            "translations",
+        )
+
+    async def get_untranslated_articles(
+        self,
+        target: str,
+        service: str,
+        since: int,
+        limit: int,
+        accept: Optional[Callable[[str], bool]] = None,
+    ) -> list[Article]:
+        """
+        Returns up to `limit` non-empty articles published at `since` (epoch
+        seconds) or later with no translation to `target` by `service` yet,
+        newest first. With `accept`, only articles whose snippet it accepts
+        (e.g. English ones) are returned.
+
+        Candidates are read `limit` at a time, without their bodies, in
+        published_at index order; only the returned articles are read in full.
+        """
+        selected = []
+        after = None
+        while len(selected) < limit:
+            q = self.query()
+            conditions = [
+                f"published_at >= {q.param(since)}",
+                "NOT EXISTS (SELECT 1 FROM translations"
+                " WHERE translations.article_id = articles.article_id"
+                f" AND target = {q.param(target)} AND service = {q.param(service)})",
+            ]
+            if after is not None:
+                conditions.append(
+                    f"(published_at, article_id) < ({q.param(after[0])}, {q.param(after[1])})"
+                )
+            query = (
+                "SELECT published_at, article_id, snippet FROM articles"
+                f" WHERE {' AND '.join(conditions)}"
+                f" ORDER BY published_at DESC, article_id DESC LIMIT {q.param(limit)};"
+            )
+            rows = await self.fetch(query, q.params)
+            selected.extend(
+                article_id
+                for _, article_id, snippet in rows
+                if snippet and (accept is None or accept(snippet))
+            )
+            if len(rows) < limit:
+                break
+            after = (rows[-1][0], rows[-1][1])
+
+        if not selected:
+            return []
+        q = self.query()
+        query = (
+            f"{q.select_articles()} WHERE article_id IN ({q.param_list(selected[:limit])})"
+            " ORDER BY published_at DESC, article_id DESC;"
+        )
+        return self._set_articles(await self.fetch(query, q.params))
+
+    async def get_user_history(self, user_id: str) -> list[str]:
+        return await get_user_store().get_user_history(user_id, mirror=self)
+
+    async def get_user_preferences(self, user_id: str) -> list[str]:
+        return await get_user_store().get_user_preferences(user_id)
+
+    async def get_user_profile(self, user_id: str) -> UserProfile:
+        return await get_user_store().get_user_profile(user_id, mirror=self)
+
+    async def get_mirrored_history(
+        self, user_id: str, limit: int
+    ) -> list[HistoryEntry]:
+        """
+        Returns the latest `limit` mirrored history entries of the user,
+        newest first.
+        """
+        q = self.query()
+        query = (
+            "SELECT article_id, clicked_at FROM user_history"
+            f" WHERE user_id = {q.param(user_id)}"
+            f" ORDER BY clicked_at DESC LIMIT {q.param(limit)};"
+        )
+        return [tuple(row) for row in await self.fetch(query, q.params)]
+
+    async def mirror_history(
+        self, user_id: str, entries: list[HistoryEntry], keep: int
+    ):
+        """
+        Adds history entries read from Firestore to the mirror, keeping only
+        the latest `keep` entries of the user.
+        """
+        p = self.query().placeholder
+        query = (
+            "INSERT INTO user_history (user_id, article_id, clicked_at)"
+            f" VALUES ({p(1)}, {p(2)}, {p(3)}) ON CONFLICT (user_id, article_id)"
+            " DO UPDATE SET clicked_at = excluded.clicked_at;"
+        )
+        trim_query = (
+            f"DELETE FROM user_history WHERE user_id = {p(1)} AND article_id NOT IN"
+            f" (SELECT article_id FROM user_history WHERE user_id = {p(2)}"
+            f" ORDER BY clicked_at DESC LIMIT {p(3)});"
+        )
+        await self.run_many(
+            [
+                (query, [(user_id, article_id, at) for article_id, at in entries]),
+                (trim_query, [(user_id, user_id, keep)]),
+            ]
+        )
@@ -0,0 +1,53 @@
+from typing import Optional
+import os
+import zlib
+import aiosqlite
+
+# Codecs for the compressed `body_z` column. Every blob starts with one tag
+# byte, so bodies written with different codecs can be read side by side.
+CODECS = {"zlib": b"\x01", "zstd": b"\x02"}
+ZLIB_LEVEL = 6
+ZSTD_LEVEL = 3
+
+
+def get_body_codec() -> Optional[str]:
+    """
+    Returns the codec new article bodies are compressed with (BODY_COMPRESSION),
+    or `None` to store them as plain text.
+    """
+    codec = os.getenv("BODY_COMPRESSION", "none").lower()
+    if codec == "none":
+        return None
+    if codec not in CODECS:
+        raise ValueError(f"Unknown BODY_COMPRESSION: {codec}")
+    return codec
+
+
+def compress_body(body: str, codec: str) -> bytes:
+    data = body.encode("utf-8")
+    if codec == "zstd":
+        import zstandard
+
+        return CODECS[codec] + zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(data)
+    return CODECS[codec] + zlib.compress(data, ZLIB_LEVEL)
+
+
+def decompress_body(blob: Optional[bytes]) -> Optional[str]:
+    if blob is None:
+        return None
+    tag, data = blob[:1], blob[1:]
+    if tag == CODECS["zstd"]:
+        import zstandard
+
+        return zstandard.ZstdDecompressor().decompress(data).decode("utf-8")
+    if tag == CODECS["zlib"]:
+        return zlib.decompress(data).decode("utf-8")
+    raise ValueError(f"Unknown body codec tag: {tag!r}")
+
+
+async def register_functions(conn: aiosqlite.Connection):
+    """
+    Registers `inflate_body(body_z)` on a SQLite connection, so queries can
+    select the full body (see `query.SQLITE_BODY`).
+    """
+    await conn.create_function("inflate_body", 1, decompress_body, deterministic=True)
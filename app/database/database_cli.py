@@ -1,6 +1,12 @@
 from datetime import datetime
+from pathlib import Path
 import sqlite3
 import json
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from app.database.dates import published_timestamp
 from database_utils import (
     run_query,
     table_exists,
@@ -60,9 +66,10 @@ while True:
                     print(f"Could not parse date: {date}")
                     continue
 
-            # Update the date in the database
+            # Update the date in the database, and the published_at it sorts by
             c.execute(
-                "UPDATE articles SET date = ? WHERE article_id = ?", (new_date, id)
+                "UPDATE articles SET date = ?, published_at = ? WHERE article_id = ?",
+                (new_date, published_timestamp(new_date), id),
             )
 
         # Commit the changes and close the connection
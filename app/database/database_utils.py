@@ -1,3 +1,4 @@
+import asyncio
 import sqlite3
 import os
 import logging
@@ -9,26 +10,6 @@ log = logging.getLogger(__name__)
 db_name = os.getenv("DB_NAME", "newsmead.sqlite")
 db_tbl_articles = "articles"
 
-db_create_article_table_query = f"""
-    CREATE TABLE IF NOT EXISTS {db_tbl_articles}
-    (
-        article_id INTEGER PRIMARY KEY AUTOINCREMENT,
-        date TEXT,
-        category TEXT,
-        source TEXT,
-        title TEXT,
-        author TEXT,
-        url TEXT UNIQUE,
-        body TEXT,
-        image_url TEXT,
-        read_time TEXT
-    );
-    """
-db_insert_query = f"""
-    INSERT OR IGNORE INTO {db_tbl_articles}
-    (date, category, source, title, author, url, body, image_url, read_time)
-    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-    """
 db_delete_duplicates_query = f"""
     DELETE FROM {db_tbl_articles}
     WHERE rowid NOT IN (
@@ -62,7 +43,7 @@ def get_articles(conn):
     articles = conn.execute(f"SELECT * FROM {db_tbl_articles}").fetchall()
     cleaned_articles = []
 
-    # date, category, source, title, author, url, body, image_url, read_time
+    # date, category, source, title, author, url, snippet, image_url, read_time
 
     for article in articles:
         cleaned_articles.append(
@@ -85,11 +66,11 @@ def get_articles(conn):
 def get_articles_by_provider(conn, provider, empty_body=False):
     conn = get_db() if conn is None else conn
     articles = conn.execute(
-        f"SELECT * FROM {db_tbl_articles} WHERE source = '{provider}' AND body {'IS' if empty_body else 'IS NOT'} ''"
+        f"SELECT * FROM {db_tbl_articles} WHERE source = '{provider}' AND snippet {'IS' if empty_body else 'IS NOT'} ''"
     ).fetchall()
     cleaned_articles = []
 
-    # date, category, source, title, author, url, body, image_url, read_time
+    # date, category, source, title, author, url, snippet, image_url, read_time
 
     for article in articles:
         cleaned_articles.append(
@@ -122,7 +103,20 @@ def table_exists(conn, table_name):
 
 
 def create_article_table(conn, table_name):
-    run_query(conn, db_create_article_table_query)
+    """
+    Creates the article tables of the database `conn` is connected to, by
+    migrating it to the current schema with `AsyncDatabase.migrate`.
+    """
+    # Imported here, as this module is also run as a script from its directory
+    from app.database.asyncdb import AsyncDatabase
+
+    _, _, path = conn.execute("PRAGMA database_list;").fetchone()
+
+    async def migrate():
+        async with AsyncDatabase(path) as db:
+            await db.migrate()
+
+    asyncio.run(migrate())
 
 
 def drop_table(conn, table_name):
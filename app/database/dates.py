@@ -0,0 +1,54 @@
+from datetime import datetime
+from typing import Union
+from dateutil.parser import parse
+from pytz import timezone
+import os
+
+
+# Formats of older rows that dateutil cannot parse (see database_cli.py)
+LEGACY_FORMATS = ["%b %d, %Y-%I:%M %p"]
+
+
+def local_timezone():
+    """
+    The timezone of article dates stored without an offset (TIMEZONE).
+    """
+    return timezone(os.getenv("TIMEZONE") or "Asia/Manila")
+
+
+def parse_date(value: Union[str, datetime]) -> datetime:
+    """
+    Parses an article date into an aware datetime. Dates without an offset
+    are taken to be in the local timezone.
+
+    Raises `ValueError` if the date cannot be parsed.
+    """
+    date = value if isinstance(value, datetime) else _parse(value)
+    if date.tzinfo is None:
+        return local_timezone().localize(date)
+    return date
+
+
+def published_timestamp(value: Union[str, datetime, None]) -> int:
+    """
+    Returns the `published_at` epoch seconds of an article date, or 0 if the
+    date is empty or cannot be parsed, which sorts it after every dated article.
+    """
+    if not value:
+        return 0
+    try:
+        return int(parse_date(value).timestamp())
+    except (ValueError, OverflowError):
+        return 0
+
+
+def _parse(value: str) -> datetime:
+    try:
+        return parse(value)
+    except ValueError:
+        for date_format in LEGACY_FORMATS:
+            try:
+                return datetime.strptime(value, date_format)
+            except ValueError:
+                continue
+        raise
@@ -0,0 +1,391 @@
+from typing import NamedTuple
+from app.models.article import SNIPPET_LENGTH
+import logging
+
+# Configure logging
+log = logging.getLogger(__name__)
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    statements: list[str]
+
+
+SQLITE_SCHEMA_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TEXT DEFAULT CURRENT_TIMESTAMP
+    );
+"""
+
+POSTGRES_SCHEMA_TABLE = """
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        description TEXT,
+        applied_at TIMESTAMPTZ DEFAULT now()
+    );
+"""
+
+# Indexes follow the shape of the queries in the database classes:
+# - get_articles filters on source/category and pages on (published_at, article_id);
+#   `published_at` is the epoch of the free-form `date` text (see dates.py),
+#   backfilled in Python by `migrate` because naive dates are in TIMEZONE
+# - get_empty_articles filters on source with the "missing fields" predicate
+# - random sampling seeks into (shuffle_key, article_id), optionally per source/category
+# - scrapers load every url_hash once per run (see UrlIndex); the values are
+#   computed in Python, so rows from older versions are backfilled on load
+# - SQLite may store compressed bodies in body_z (see compression.py); Postgres
+#   already compresses large TEXT values itself (TOAST), so it has no such column
+# - bodies live in article_bodies (v6), so article scans and list queries only
+#   read the narrow articles rows; `snippet` keeps the start of the body
+# - trending reads the article_popularity rows of the current and previous decay
+#   epoch (see popularity.py) in score order
+# - user_history mirrors the latest Firestore history entries per user, read
+#   newest first (see user_store.py)
+EMPTY_ARTICLE_PREDICATE = "(author = '' OR author IS NULL OR snippet = '' OR snippet IS NULL OR image_url = '' OR image_url IS NULL)"
+
+# The same predicate before `body` was renamed to `snippet`; renaming the
+# column also rewrites the partial index created with it
+V2_EMPTY_ARTICLE_PREDICATE = "(author = '' OR author IS NULL OR body = '' OR body IS NULL OR image_url = '' OR image_url IS NULL)"
+
+# Uniform random number in [0, 1) for SQLite, used as the `shuffle_key` of
+# rows that are not inserted through `insert_articles`
+SQLITE_SHUFFLE_KEY = "((random() & 9007199254740991) / 9007199254740992.0)"
+
+SQLITE_MIGRATIONS = [
+    Migration(
+        1,
+        "create articles and behaviors tables",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                article_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                date TEXT,
+                category TEXT,
+                source TEXT,
+                title TEXT,
+                author TEXT,
+                url TEXT UNIQUE,
+                body TEXT,
+                image_url TEXT,
+                read_time TEXT
+            );
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS behaviors (
+                behavior_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id TEXT,
+                time TEXT,
+                history TEXT,
+                impression_news TEXT,
+                score TEXT
+            );
+            """,
+        ],
+    ),
+    Migration(
+        2,
+        "add query-shaped article and behavior indexes",
+        [
+            "CREATE INDEX IF NOT EXISTS idx_articles_date_id ON articles (date DESC, article_id DESC);",
+            "CREATE INDEX IF NOT EXISTS idx_articles_source_date ON articles (source, date DESC, article_id DESC);",
+            "CREATE INDEX IF NOT EXISTS idx_articles_category_date ON articles (category, date DESC, article_id DESC);",
+            f"CREATE INDEX IF NOT EXISTS idx_articles_empty_source ON articles (source) WHERE {V2_EMPTY_ARTICLE_PREDICATE};",
+            "CREATE INDEX IF NOT EXISTS idx_behaviors_user_time ON behaviors (user_id, time);",
+        ],
+    ),
+    Migration(
+        3,
+        "add shuffle_key for random sampling",
+        [
+            "ALTER TABLE articles ADD COLUMN shuffle_key REAL;",
+            f"UPDATE articles SET shuffle_key = {SQLITE_SHUFFLE_KEY} WHERE shuffle_key IS NULL;",
+            "CREATE INDEX IF NOT EXISTS idx_articles_shuffle ON articles (shuffle_key, article_id);",
+            "CREATE INDEX IF NOT EXISTS idx_articles_source_shuffle ON articles (source, shuffle_key, article_id);",
+            "CREATE INDEX IF NOT EXISTS idx_articles_category_shuffle ON articles (category, shuffle_key, article_id);",
+        ],
+    ),
+    Migration(
+        4,
+        "add url_hash for scraper dedup",
+        [
+            "ALTER TABLE articles ADD COLUMN url_hash INTEGER;",
+            "CREATE INDEX IF NOT EXISTS idx_articles_url_hash ON articles (url_hash);",
+        ],
+    ),
+    Migration(
+        5,
+        "add compressed body column",
+        ["ALTER TABLE articles ADD COLUMN body_z BLOB;"],
+    ),
+    Migration(
+        6,
+        "move article bodies to article_bodies",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS article_bodies (
+                article_id INTEGER PRIMARY KEY REFERENCES articles (article_id) ON DELETE CASCADE,
+                body TEXT,
+                body_z BLOB
+            );
+            """,
+            """
+            INSERT OR IGNORE INTO article_bodies (article_id, body, body_z)
+            SELECT article_id, CASE WHEN body_z IS NULL THEN body END, body_z FROM articles;
+            """,
+            "ALTER TABLE articles RENAME COLUMN body TO snippet;",
+            # articles.body_z stays as an unused column, DROP COLUMN needs SQLite 3.35
+            f"UPDATE articles SET snippet = substr(snippet, 1, {SNIPPET_LENGTH}), body_z = NULL;",
+        ],
+    ),
+    Migration(
+        7,
+        "add translations cache",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS translations (
+                article_id INTEGER REFERENCES articles (article_id) ON DELETE CASCADE,
+                target TEXT,
+                service TEXT,
+                content_hash TEXT,
+                title TEXT,
+                body TEXT,
+                created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (article_id, target, service, content_hash)
+            );
+            """,
+        ],
+    ),
+    Migration(
+        8,
+        "add published_at epoch column",
+        [
+            "ALTER TABLE articles ADD COLUMN published_at INTEGER;",
+            "CREATE INDEX IF NOT EXISTS idx_articles_published ON articles (published_at DESC, article_id DESC);",
+            "CREATE INDEX IF NOT EXISTS idx_articles_source_published ON articles (source, published_at DESC, article_id DESC);",
+            "CREATE INDEX IF NOT EXISTS idx_articles_category_published ON articles (category, published_at DESC, article_id DESC);",
+            "DROP INDEX IF EXISTS idx_articles_date_id;",
+            "DROP INDEX IF EXISTS idx_articles_source_date;",
+            "DROP INDEX IF EXISTS idx_articles_category_date;",
+        ],
+    ),
+    Migration(
+        9,
+        "add decayed article popularity counts",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS article_popularity (
+                article_id INTEGER PRIMARY KEY REFERENCES articles (article_id) ON DELETE CASCADE,
+                epoch INTEGER NOT NULL,
+                impressions REAL NOT NULL DEFAULT 0,
+                clicks REAL NOT NULL DEFAULT 0
+            );
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_article_popularity_epoch ON article_popularity (epoch, clicks DESC);",
+        ],
+    ),
+    Migration(
+        10,
+        "add user history mirror",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS user_history (
+                user_id TEXT,
+                article_id TEXT,
+                clicked_at REAL,
+                PRIMARY KEY (user_id, article_id)
+            );
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_user_history_user_clicked ON user_history (user_id, clicked_at DESC);",
+        ],
+    ),
+]
+
+POSTGRES_MIGRATIONS = [
+    Migration(
+        1,
+        "create articles and behaviors tables",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                article_id SERIAL PRIMARY KEY,
+                date TEXT,
+                category TEXT,
+                source TEXT,
+                title TEXT,
+                author TEXT,
+                url TEXT UNIQUE,
+                body TEXT,
+                image_url TEXT,
+                read_time TEXT,
+                tsv tsvector
+            );
+            """,
+            "CREATE INDEX IF NOT EXISTS tsv_idx ON articles USING gin(tsv);",
+            "DROP TRIGGER IF EXISTS tsvectorupdate ON articles;",
+            """
+            CREATE TRIGGER tsvectorupdate BEFORE INSERT OR UPDATE
+            ON articles FOR EACH ROW EXECUTE FUNCTION
+            tsvector_update_trigger(tsv, 'pg_catalog.english', title, body);
+            """,
+            """
+            CREATE TABLE IF NOT EXISTS behaviors (
+                behavior_id SERIAL PRIMARY KEY,
+                user_id TEXT,
+                time TEXT,
+                history TEXT,
+                impression_news TEXT,
+                score JSONB
+            );
+            """,
+        ],
+    ),
+    Migration(
+        2,
+        "add query-shaped article and behavior indexes",
+        [
+            "CREATE INDEX IF NOT EXISTS idx_articles_date_id ON articles (date DESC, article_id DESC);",
+            "CREATE INDEX IF NOT EXISTS idx_articles_source_date ON articles (source, date DESC, article_id DESC);",
+            "CREATE INDEX IF NOT EXISTS idx_articles_category_date ON articles (category, date DESC, article_id DESC);",
+            f"CREATE INDEX IF NOT EXISTS idx_articles_empty_source ON articles (source) WHERE {V2_EMPTY_ARTICLE_PREDICATE};",
+            "CREATE INDEX IF NOT EXISTS idx_behaviors_user_time ON behaviors (user_id, time);",
+        ],
+    ),
+    Migration(
+        3,
+        "add shuffle_key for random sampling",
+        [
+            "ALTER TABLE articles ADD COLUMN IF NOT EXISTS shuffle_key DOUBLE PRECISION DEFAULT random();",
+            "CREATE INDEX IF NOT EXISTS idx_articles_shuffle ON articles (shuffle_key, article_id);",
+            "CREATE INDEX IF NOT EXISTS idx_articles_source_shuffle ON articles (source, shuffle_key, article_id);",
+            "CREATE INDEX IF NOT EXISTS idx_articles_category_shuffle ON articles (category, shuffle_key, article_id);",
+        ],
+    ),
+    Migration(
+        4,
+        "add url_hash for scraper dedup",
+        [
+            "ALTER TABLE articles ADD COLUMN IF NOT EXISTS url_hash BIGINT;",
+            "CREATE INDEX IF NOT EXISTS idx_articles_url_hash ON articles (url_hash);",
+        ],
+    ),
+    Migration(
+        6,
+        "move article bodies to article_bodies",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS article_bodies (
+                article_id INTEGER PRIMARY KEY REFERENCES articles (article_id) ON DELETE CASCADE,
+                body TEXT
+            );
+            """,
+            """
+            INSERT INTO article_bodies (article_id, body)
+            SELECT article_id, body FROM articles ON CONFLICT DO NOTHING;
+            """,
+            # The search vector stays on articles but is now built when the body is written
+            "DROP TRIGGER IF EXISTS tsvectorupdate ON articles;",
+            "ALTER TABLE articles RENAME COLUMN body TO snippet;",
+            f"UPDATE articles SET snippet = left(snippet, {SNIPPET_LENGTH});",
+            """
+            CREATE OR REPLACE FUNCTION article_bodies_tsv() RETURNS trigger AS $$
+            BEGIN
+                UPDATE articles
+                SET tsv = to_tsvector('pg_catalog.english', coalesce(title, '') || ' ' || coalesce(NEW.body, ''))
+                WHERE article_id = NEW.article_id;
+                RETURN NEW;
+            END
+            $$ LANGUAGE plpgsql;
+            """,
+            "DROP TRIGGER IF EXISTS article_bodies_tsv ON article_bodies;",
+            """
+            CREATE TRIGGER article_bodies_tsv AFTER INSERT OR UPDATE
+            ON article_bodies FOR EACH ROW EXECUTE FUNCTION article_bodies_tsv();
+            """,
+        ],
+    ),
+    Migration(
+        7,
+        "add translations cache",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS translations (
+                article_id INTEGER REFERENCES articles (article_id) ON DELETE CASCADE,
+                target TEXT,
+                service TEXT,
+                content_hash TEXT,
+                title TEXT,
+                body TEXT,
+                created_at TIMESTAMPTZ DEFAULT now(),
+                PRIMARY KEY (article_id, target, service, content_hash)
+            );
+            """,
+        ],
+    ),
+    Migration(
+        8,
+        "add published_at epoch column",
+        [
+            "ALTER TABLE articles ADD COLUMN IF NOT EXISTS published_at BIGINT;",
+            "CREATE INDEX IF NOT EXISTS idx_articles_published ON articles (published_at DESC, article_id DESC);",
+            "CREATE INDEX IF NOT EXISTS idx_articles_source_published ON articles (source, published_at DESC, article_id DESC);",
+            "CREATE INDEX IF NOT EXISTS idx_articles_category_published ON articles (category, published_at DESC, article_id DESC);",
+            "DROP INDEX IF EXISTS idx_articles_date_id;",
+            "DROP INDEX IF EXISTS idx_articles_source_date;",
+            "DROP INDEX IF EXISTS idx_articles_category_date;",
+        ],
+    ),
+    Migration(
+        9,
+        "add decayed article popularity counts",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS article_popularity (
+                article_id INTEGER PRIMARY KEY REFERENCES articles (article_id) ON DELETE CASCADE,
+                epoch BIGINT NOT NULL,
+                impressions DOUBLE PRECISION NOT NULL DEFAULT 0,
+                clicks DOUBLE PRECISION NOT NULL DEFAULT 0
+            );
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_article_popularity_epoch ON article_popularity (epoch, clicks DESC);",
+        ],
+    ),
+    Migration(
+        10,
+        "add user history mirror",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS user_history (
+                user_id TEXT,
+                article_id TEXT,
+                clicked_at DOUBLE PRECISION,
+                PRIMARY KEY (user_id, article_id)
+            );
+            """,
+            "CREATE INDEX IF NOT EXISTS idx_user_history_user_clicked ON user_history (user_id, clicked_at DESC);",
+        ],
+    ),
+]
+
+
+async def migrate(db, migrations: list[Migration]) -> int:
+    """
+    Applies every migration newer than the recorded schema version.
+
+    `db` must provide `create_schema_table`, `get_schema_version` and
+    `apply_migration`. Returns the schema version after migrating.
+    """
+    await db.create_schema_table()
+    version = await db.get_schema_version()
+
+    for migration in sorted(migrations, key=lambda m: m.version):
+        if migration.version <= version:
+            continue
+        log.info(f"Applying migration {migration.version}: {migration.description}")
+        await db.apply_migration(migration)
+        version = migration.version
+
+    log.info(f"Database schema at version {version}")
+    return version
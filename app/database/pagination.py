@@ -0,0 +1,36 @@
+import base64
+import json
+from typing import Union
+
+CursorKey = Union[int, float]
+
+
+def encode_cursor(key: CursorKey, article_id: int) -> str:
+    """
+    Encodes the sort key of the last article of a page into an opaque cursor.
+    The key is the `published_at` for recent sorting or the `shuffle_key` for
+    random sampling.
+    """
+    raw = json.dumps([key, article_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, key_type: type = int) -> tuple[CursorKey, int]:
+    """
+    Decodes a cursor created by `encode_cursor` into a `(key, article_id)` tuple.
+
+    Raises `ValueError` if the cursor is malformed or its key is not a `key_type`.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key, article_id = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except Exception:
+        raise ValueError(f"Invalid cursor: {cursor}")
+
+    if isinstance(key, bool):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    if key_type is float and isinstance(key, int):
+        key = float(key)
+    if not isinstance(key, key_type) or not isinstance(article_id, int):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return key, article_id
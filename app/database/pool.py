@@ -0,0 +1,220 @@
+from contextlib import asynccontextmanager
+from typing import Optional
+from urllib.parse import quote
+from app.database.compression import register_functions
+import asyncio
+import os
+import time
+import aiosqlite
+import asyncpg
+import logging
+
+# Configure logging
+log = logging.getLogger(__name__)
+
+
+def _setting(value: Optional[int], name: str, default: int) -> int:
+    """
+    Returns `value` unless it is `None`, then the `name` environment variable
+    or `default`. An explicit 0 (e.g. no mmap or no statement cache) is kept.
+    """
+    return value if value is not None else int(os.getenv(name, default))
+
+
+class SQLitePool:
+    """
+    A pool of read-only reader connections and a single serialized writer
+    connection to a SQLite database in WAL mode.
+
+    WAL lets readers keep serving while the writer (e.g. a scrape) commits,
+    so API reads are no longer blocked by scraper writes.
+    """
+
+    def __init__(
+        self,
+        db_name: str = None,
+        size: int = None,
+        mmap_size: int = None,
+        cache_size: int = None,
+        busy_timeout: int = 5000,
+    ):
+        self.db_name = db_name or os.getenv("DB_NAME")
+        self.size = _setting(size, "DB_POOL_SIZE", 4)
+        self.mmap_size = _setting(mmap_size, "DB_MMAP_SIZE", 268435456)
+        self.cache_size = _setting(cache_size, "DB_CACHE_SIZE", -65536)
+        self.busy_timeout = busy_timeout
+
+        # The queue outlives `suspended`, so readers waiting on it are served
+        # by the reopened connections. `_open` is cleared while closed.
+        self._readers: asyncio.Queue = asyncio.Queue()
+        self._open = asyncio.Event()
+        self._writer: aiosqlite.Connection = None
+        self._write_lock = asyncio.Lock()
+        self._stats = {
+            "reader_acquires": 0,
+            "reader_wait_ms": 0.0,
+            "writer_acquires": 0,
+            "writer_wait_ms": 0.0,
+        }
+
+    async def open(self):
+        # The writer is opened first so the database file and its WAL exist
+        # before the read-only connections are opened.
+        self._writer = await aiosqlite.connect(self.db_name)
+        await self._writer.execute("PRAGMA journal_mode=WAL;")
+        await self._configure(self._writer)
+
+        uri = f"file:{quote(os.path.abspath(self.db_name))}?mode=ro"
+        for _ in range(self.size):
+            reader = await aiosqlite.connect(uri, uri=True)
+            await self._configure(reader)
+            self._readers.put_nowait(reader)
+        self._open.set()
+
+        log.info(f"Opened SQLite pool ({self.size} readers, 1 writer): {self.db_name}")
+
+    async def close(self):
+        if self._open.is_set():
+            # New readers wait for `open`; readers already queued for a
+            # connection are served before every connection is taken back
+            self._open.clear()
+            for _ in range(self.size):
+                reader = await self._readers.get()
+                await reader.close()
+
+        if self._writer is not None:
+            await self._writer.close()
+            self._writer = None
+
+        log.info(f"Closed SQLite pool: {self.db_name}")
+
+    async def _configure(self, conn: aiosqlite.Connection):
+        await conn.execute("PRAGMA synchronous=NORMAL;")
+        await conn.execute(f"PRAGMA mmap_size={self.mmap_size};")
+        await conn.execute(f"PRAGMA cache_size={self.cache_size};")
+        await conn.execute(f"PRAGMA busy_timeout={self.busy_timeout};")
+        await register_functions(conn)
+
+    @asynccontextmanager
+    async def reader(self):
+        start_time = time.perf_counter()
+        await self._open.wait()
+        conn = await self._readers.get()
+        self._stats["reader_acquires"] += 1
+        self._stats["reader_wait_ms"] += (time.perf_counter() - start_time) * 1000
+        try:
+            yield conn
+        finally:
+            self._readers.put_nowait(conn)
+
+    @asynccontextmanager
+    async def writer(self):
+        start_time = time.perf_counter()
+        async with self._write_lock:
+            self._stats["writer_acquires"] += 1
+            self._stats["writer_wait_ms"] += (time.perf_counter() - start_time) * 1000
+            yield self._writer
+
+    async def checkpoint(self):
+        """
+        Moves every committed transaction from the WAL into the database file.
+        """
+        async with self.writer() as conn:
+            await conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+
+    @asynccontextmanager
+    async def suspended(self):
+        """
+        Closes every connection for the duration of the block, e.g. while the
+        database file is being replaced, and reopens them afterwards.
+        """
+        async with self._write_lock:
+            await self._writer.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+            await self.close()
+            try:
+                yield
+            finally:
+                await self.open()
+
+    def metrics(self) -> dict:
+        return {
+            "size": self.size,
+            "readers_in_use": (
+                self.size - self._readers.qsize() if self._open.is_set() else 0
+            ),
+            "writer_locked": self._write_lock.locked(),
+            **self._stats,
+        }
+
+
+_pool: Optional[SQLitePool] = None
+
+
+async def create_pool(db_name: str = None, **kwargs) -> SQLitePool:
+    global _pool
+    _pool = SQLitePool(db_name, **kwargs)
+    await _pool.open()
+    return _pool
+
+
+def get_pool() -> Optional[SQLitePool]:
+    return _pool
+
+
+async def close_pool():
+    global _pool
+    if _pool is not None:
+        await _pool.close()
+        _pool = None
+
+
+_pg_pool: Optional[asyncpg.Pool] = None
+
+
+async def create_pg_pool(
+    db_url: str = None,
+    min_size: int = None,
+    max_size: int = None,
+    statement_cache_size: int = None,
+) -> asyncpg.Pool:
+    """
+    Creates the application-wide asyncpg pool.
+
+    asyncpg prepares every query it runs and keeps the prepared statements in a
+    per-connection LRU cache, so the hot queries are only parsed and planned
+    once per pooled connection.
+    """
+    global _pg_pool
+    _pg_pool = await asyncpg.create_pool(
+        db_url or os.getenv("DATABASE_URL"),
+        min_size=_setting(min_size, "PG_POOL_MIN_SIZE", 2),
+        max_size=_setting(max_size, "PG_POOL_MAX_SIZE", 10),
+        statement_cache_size=_setting(
+            statement_cache_size, "PG_STATEMENT_CACHE_SIZE", 256
+        ),
+    )
+    log.info(
+        f"Opened Postgres pool ({_pg_pool.get_min_size()}-{_pg_pool.get_max_size()} connections)"
+    )
+    return _pg_pool
+
+
+def get_pg_pool() -> Optional[asyncpg.Pool]:
+    return _pg_pool
+
+
+def pg_pool_metrics(pg_pool: asyncpg.Pool) -> dict:
+    return {
+        "min_size": pg_pool.get_min_size(),
+        "max_size": pg_pool.get_max_size(),
+        "size": pg_pool.get_size(),
+        "idle": pg_pool.get_idle_size(),
+    }
+
+
+async def close_pg_pool():
+    global _pg_pool
+    if _pg_pool is not None:
+        await _pg_pool.close()
+        _pg_pool = None
+        log.info("Closed Postgres pool")
@@ -0,0 +1,61 @@
+from collections import defaultdict
+from typing import Optional
+import os
+import time
+
+# Decayed counts are stored with forward decay: an event at time t adds
+# 2 ** ((t - start) / half_life), where `start` is the start of the current
+# decay epoch. Every stored count is then scaled by the same factor at any
+# moment, so counts only ever grow by plain addition (an atomic upsert) and
+# rows compare without decaying them first. Starting a new epoch every
+# EPOCH_HALF_LIVES half-lives keeps the weights far from overflowing; counts
+# of the previous epoch are carried over scaled by EPOCH_DECAY.
+EPOCH_HALF_LIVES = 64
+EPOCH_DECAY = 2.0**-EPOCH_HALF_LIVES
+
+
+def half_life() -> float:
+    """
+    The half-life of trending scores in seconds (TRENDING_HALF_LIFE_HOURS).
+    """
+    return float(os.getenv("TRENDING_HALF_LIFE_HOURS", 24)) * 3600
+
+
+def decay_epoch(now: Optional[float] = None) -> int:
+    now = time.time() if now is None else now
+    return int(now // (half_life() * EPOCH_HALF_LIVES))
+
+
+def event_weight(now: Optional[float] = None) -> tuple[int, float]:
+    """
+    Returns the current decay epoch and the weight of an event happening now.
+    """
+    now = time.time() if now is None else now
+    epoch = decay_epoch(now)
+    start = epoch * half_life() * EPOCH_HALF_LIVES
+    return epoch, 2.0 ** ((now - start) / half_life())
+
+
+def current_score(count: float, epoch: int, now: Optional[float] = None) -> float:
+    """
+    Converts a stored count of `epoch` into the decayed number of events as of
+    `now`, e.g. 1.0 for one event right now or 0.5 for one a half-life ago.
+    """
+    now = time.time() if now is None else now
+    start = epoch * half_life() * EPOCH_HALF_LIVES
+    return count * 2.0 ** ((start - now) / half_life()) if count else 0.0
+
+
+def parse_impressions(impression_news: str) -> dict[int, tuple[int, int]]:
+    """
+    Counts the impressions and clicks per article of a behavior's
+    `impression_news`, e.g. "12-1 15-0" (article 12 was read, 15 was not).
+    """
+    counts = defaultdict(lambda: [0, 0])
+    for impression in impression_news.split():
+        article_id, _, label = impression.partition("-")
+        if not article_id.isdigit():
+            continue
+        counts[int(article_id)][0] += 1
+        counts[int(article_id)][1] += label == "1"
+    return {article_id: tuple(count) for article_id, count in counts.items()}
@@ -0,0 +1,256 @@
+from typing import Any, Optional
+from app.models.article import ARTICLE_FIELDS, Filter
+from app.database.dates import parse_date
+from app.database.popularity import EPOCH_DECAY
+
+SQLITE = "sqlite"
+POSTGRES = "postgres"
+
+# On SQLite the body may be compressed into `article_bodies.body_z`
+# (see compression.py)
+SQLITE_BODY = "COALESCE(inflate_body(article_bodies.body_z), article_bodies.body)"
+
+
+def projection_columns(fields: Optional[list[str]]) -> list[str]:
+    """
+    Returns the article columns needed to serve `fields`, always starting with
+    `article_id` and `date`. Unless the full body is requested, the stored
+    `snippet` is selected as `body`, which is enough for the snippet, language
+    detection and the empty-body check.
+    """
+    if fields is None:
+        return list(ARTICLE_FIELDS)
+    return [
+        column
+        for column in ARTICLE_FIELDS
+        if column in ("article_id", "date", "body") or column in fields
+    ]
+
+
+def timestamp(date: str) -> int:
+    """
+    Returns the epoch seconds of a `startDate`/`endDate` filter value.
+
+    Raises `ValueError` if the date cannot be parsed.
+    """
+    return int(parse_date(date).timestamp())
+
+
+def needs_body(fields: Optional[list[str]]) -> bool:
+    return fields is None or "body" in fields
+
+
+def column_expression(column: str, fields: Optional[list[str]], dialect: str) -> str:
+    if column != "body":
+        return column
+    if not needs_body(fields):
+        # No join with article_bodies and nothing is decompressed
+        return "snippet AS body"
+    if dialect == SQLITE:
+        return f"{SQLITE_BODY} AS body"
+    return column
+
+
+class QueryBuilder:
+    """
+    Collects query parameters and renders placeholders for a SQL dialect,
+    so the same query can be built for SQLite (`?`) and Postgres (`$1`).
+    """
+
+    def __init__(self, dialect: str):
+        self.dialect = dialect
+        self.params: list[Any] = []
+
+    def placeholder(self, index: int) -> str:
+        return "?" if self.dialect == SQLITE else f"${index}"
+
+    def placeholders(self, count: int) -> str:
+        """
+        Returns `count` unbound placeholders, e.g. for `executemany`.
+        """
+        return ", ".join(self.placeholder(i + 1) for i in range(count))
+
+    def param(self, value: Any) -> str:
+        self.params.append(value)
+        return self.placeholder(len(self.params))
+
+    def param_list(self, values: list[Any]) -> str:
+        return ", ".join(self.param(value) for value in values)
+
+    def select_articles(
+        self,
+        fields: Optional[list[str]] = None,
+        extra_columns: Optional[list[str]] = None,
+    ) -> str:
+        """
+        Returns `SELECT <columns> FROM ...` for articles, joining article_bodies
+        only when the full body is needed.
+        """
+        columns = ", ".join(
+            [
+                column_expression(column, fields, self.dialect)
+                for column in projection_columns(fields)
+            ]
+            + (extra_columns or [])
+        )
+        source = "articles"
+        if needs_body(fields):
+            source += " LEFT JOIN article_bodies USING (article_id)"
+        return f"SELECT {columns} FROM {source}"
+
+    def text_search(self, text: str) -> str:
+        if self.dialect == SQLITE:
+            pattern = f"%{text}%"
+            return (
+                f"(title LIKE {self.param(pattern)} OR article_id IN"
+                f" (SELECT article_id FROM article_bodies WHERE {SQLITE_BODY} LIKE {self.param(pattern)}))"
+            )
+        return f"tsv @@ to_tsquery('english', {self.param(text.replace(' ', ' & '))})"
+
+    def article_conditions(self, filter: Filter) -> list[str]:
+        conditions = []
+
+        if filter.source is not None:
+            conditions.append(f"source IN ({self.param_list(filter.source.split(','))})")
+
+        if filter.category is not None:
+            conditions.append(
+                f"category IN ({self.param_list(filter.category.split(','))})"
+            )
+
+        if filter.startDate is not None:
+            start = timestamp(filter.startDate)
+            conditions.append(f"published_at >= {self.param(start)}")
+
+        if filter.endDate is not None:
+            end = timestamp(filter.endDate)
+            conditions.append(f"published_at <= {self.param(end)}")
+
+        if filter.text is not None:
+            conditions.append(self.text_search(filter.text))
+
+        return conditions
+
+    def articles_query(
+        self,
+        filter: Filter,
+        limit: int,
+        offset: int = 0,
+        after: Optional[tuple[int, int]] = None,
+        fields: Optional[list[str]] = None,
+    ) -> str:
+        """
+        Selects articles newest first, in `(published_at, article_id)` index
+        order. Selects `published_at` as the last column, for the next page's
+        cursor.
+        """
+        conditions = self.article_conditions(filter)
+
+        if after is not None:
+            published_at, article_id = after
+            conditions.append(
+                f"(published_at, article_id) < ({self.param(published_at)}, {self.param(article_id)})"
+            )
+
+        return self._select(
+            conditions,
+            fields,
+            "published_at DESC, article_id DESC",
+            limit,
+            offset,
+            extra_columns=["published_at"],
+        )
+
+    def sample_query(
+        self,
+        filter: Filter,
+        limit: int,
+        pivot: float,
+        wrapped: bool = False,
+        offset: int = 0,
+        after: Optional[tuple[float, int]] = None,
+        fields: Optional[list[str]] = None,
+    ) -> str:
+        """
+        Selects articles in `shuffle_key` order starting at `pivot`. The first
+        pass reads keys in [pivot, 1), the `wrapped` pass reads [0, pivot), so
+        both passes together visit every article once. Each pass is an index
+        range scan, so the cost does not depend on the size of the table.
+
+        Selects `shuffle_key` as the last column, for the next page's cursor.
+        """
+        conditions = self.article_conditions(filter)
+        operator = "<" if wrapped else ">="
+        conditions.append(f"shuffle_key {operator} {self.param(pivot)}")
+
+        if after is not None:
+            shuffle_key, article_id = after
+            conditions.append(
+                f"(shuffle_key, article_id) > ({self.param(shuffle_key)}, {self.param(article_id)})"
+            )
+
+        return self._select(
+            conditions,
+            fields,
+            "shuffle_key, article_id",
+            limit,
+            offset,
+            extra_columns=["shuffle_key"],
+        )
+
+    def sample_count_query(self, filter: Filter, pivot: float) -> str:
+        """
+        Counts the articles of the first `sample_query` pass.
+        """
+        conditions = self.article_conditions(filter)
+        conditions.append(f"shuffle_key >= {self.param(pivot)}")
+        return f"SELECT COUNT(1) FROM articles WHERE {' AND '.join(conditions)};"
+
+    def trending_query(
+        self,
+        filter: Filter,
+        epoch: int,
+        limit: int,
+        fields: Optional[list[str]] = None,
+    ) -> str:
+        """
+        Selects the most read articles with counts in the current or previous
+        decay `epoch` (see popularity.py), highest decayed click count first.
+
+        Selects the `clicks` and `impressions` counts, carried over to `epoch`,
+        as the last columns.
+        """
+        conditions = self.article_conditions(filter)
+        conditions.append(f"epoch >= {self.param(epoch - 1)}")
+
+        def carry(column: str) -> str:
+            # The epoch is an int literal, so the expression needs no parameter
+            return (
+                f"CASE WHEN epoch = {int(epoch)} THEN {column}"
+                f" ELSE {column} * {EPOCH_DECAY!r} END AS {column}_score"
+            )
+
+        select = self.select_articles(
+            fields, extra_columns=[carry("clicks"), carry("impressions")]
+        )
+        return (
+            f"{select} JOIN article_popularity USING (article_id)"
+            f" WHERE {' AND '.join(conditions)}"
+            " ORDER BY clicks_score DESC, impressions_score DESC, article_id DESC"
+            f" LIMIT {self.param(limit)};"
+        )
+
+    def _select(
+        self,
+        conditions: list[str],
+        fields: Optional[list[str]],
+        sort_order: str,
+        limit: int,
+        offset: int,
+        extra_columns: Optional[list[str]] = None,
+    ) -> str:
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return (
+            f"{self.select_articles(fields, extra_columns)}{where} ORDER BY {sort_order}"
+            f" LIMIT {self.param(limit)} OFFSET {self.param(offset)};"
+        )
@@ -0,0 +1,49 @@
+from typing import Iterable
+from app.models.article import Article
+import hashlib
+
+
+def url_hash(url: str) -> int:
+    """
+    Returns a signed 64-bit hash of `url`, as stored in `articles.url_hash`.
+    """
+    digest = hashlib.blake2b(url.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+class UrlIndex:
+    """
+    In-memory set of the URL hashes of stored articles, loaded once per scrape
+    run with `BaseDatabase.load_url_index`. Membership checks are O(1) and take
+    8 bytes of hash per article instead of the whole URL.
+
+    A 64-bit collision makes a new article look stored; at a few hundred
+    thousand articles the chance of that is around 1e-9.
+    """
+
+    def __init__(self, hashes: Iterable[int] = ()):
+        self.hashes = set(hashes)
+
+    def __contains__(self, url: str) -> bool:
+        return url_hash(url) in self.hashes
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def add(self, url: str):
+        self.hashes.add(url_hash(url))
+
+    def filter_new(self, articles: list[Article]) -> list[Article]:
+        """
+        Returns the articles whose URL is not in the index and adds them to it,
+        so the same URL found again in this run (e.g. under another category)
+        is not scraped twice.
+        """
+        new_articles = []
+        for article in articles:
+            h = url_hash(article.url)
+            if h in self.hashes:
+                continue
+            self.hashes.add(h)
+            new_articles.append(article)
+        return new_articles
@@ -0,0 +1,359 @@
+from collections import OrderedDict
+from datetime import datetime, timezone
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, NamedTuple, Optional
+from firebase_admin import firestore, credentials
+import firebase_admin
+import asyncio
+import threading
+import time
+import os
+import logging
+
+# Configure logging
+log = logging.getLogger(__name__)
+
+
+# (article id, click time in epoch seconds) of a history document
+HistoryEntry = tuple[str, float]
+
+
+def history_entry(doc, order_field: str) -> HistoryEntry:
+    clicked_at = doc.get(order_field)
+    if isinstance(clicked_at, datetime):
+        clicked_at = clicked_at.timestamp()
+    return doc.id, float(clicked_at)
+
+
+def merge_history(
+    entries: list[HistoryEntry], mirrored: list[HistoryEntry], limit: int
+) -> list[HistoryEntry]:
+    """
+    Merges new and mirrored entries into the latest `limit` entries, newest
+    first, keeping the latest click of articles read more than once.
+    """
+    merged = []
+    seen = set()
+    for article_id, clicked_at in sorted(
+        entries + mirrored, key=lambda entry: entry[1], reverse=True
+    ):
+        if article_id not in seen:
+            seen.add(article_id)
+            merged.append((article_id, clicked_at))
+    return merged[:limit]
+
+
+def history_ids(entries: list[HistoryEntry]) -> list[str]:
+    # Oldest first, so the end of the history is the latest click
+    return [article_id for article_id, _ in reversed(entries)]
+
+
+class UserProfile(NamedTuple):
+    history: list[str]
+    preferences: list[str]
+
+
+class UserHistoryCache:
+    """
+    Per-user reading histories, bounded by user count and expiring after `ttl`
+    seconds. Entries kept fresh by a snapshot listener (`watch`) do not
+    expire; evicting them stops the listener.
+
+    Listeners call `update` from Firestore's threads, hence the lock.
+    """
+
+    def __init__(self, ttl: float = 300, max_users: int = 10000):
+        self.ttl = ttl
+        self.max_users = max_users
+        self.entries: OrderedDict[str, tuple[float, Optional[list[str]], Any]] = (
+            OrderedDict()
+        )
+        self.lock = threading.Lock()
+
+    def get(self, user_id: str) -> tuple[bool, Optional[list[str]]]:
+        """
+        Returns `(hit, history)`. The history of a missing user is `None`.
+        """
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is None:
+                return False, None
+            expires_at, history, watch = entry
+            if watch is None and expires_at < time.monotonic():
+                del self.entries[user_id]
+                return False, None
+            self.entries.move_to_end(user_id)
+            return True, history
+
+    def set(self, user_id: str, history: Optional[list[str]], watch: Any = None):
+        evicted = []
+        with self.lock:
+            previous = self.entries.get(user_id)
+            if previous is not None and previous[2] not in (None, watch):
+                evicted.append(previous[2])
+            self.entries[user_id] = (time.monotonic() + self.ttl, history, watch)
+            self.entries.move_to_end(user_id)
+            while len(self.entries) > self.max_users:
+                _, (_, _, evicted_watch) = self.entries.popitem(last=False)
+                evicted.append(evicted_watch)
+        for evicted_watch in evicted:
+            if evicted_watch is not None:
+                evicted_watch.unsubscribe()
+
+    def update(self, user_id: str, history: list[str]):
+        """
+        Replaces the cached history if the user is still cached.
+        """
+        with self.lock:
+            entry = self.entries.get(user_id)
+            if entry is not None:
+                self.entries[user_id] = (entry[0], history, entry[2])
+
+    def clear(self):
+        with self.lock:
+            watches = [watch for _, _, watch in self.entries.values()]
+            self.entries.clear()
+        for watch in watches:
+            if watch is not None:
+                watch.unsubscribe()
+
+    def size(self) -> int:
+        return len(self.entries)
+
+
+class UserStore:
+    """
+    Reads users' reading histories and preferences from Firestore through one
+    shared client. Only the latest `history_limit` history documents are read,
+    ordered by their `order_field` click time. Histories are cached; with
+    `listen`, a snapshot listener per cached user keeps the history current
+    instead of re-reading it after the TTL.
+
+    The blocking Firestore calls run on a dedicated executor of `max_workers`
+    threads, so slow reads cannot take over the default executor.
+    """
+
+    def __init__(
+        self,
+        client,
+        cache: UserHistoryCache,
+        listen: bool = False,
+        history_limit: int = 50,
+        order_field: str = "timestamp",
+        max_workers: int = 8,
+    ):
+        self.client = client
+        self.cache = cache
+        self.listen = listen
+        self.history_limit = history_limit
+        self.order_field = order_field
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="firestore"
+        )
+
+    async def _run(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, func, *args
+        )
+
+    def _user_ref(self, user_id: str):
+        return self.client.collection("users").document(user_id)
+
+    def _history_query(self, user_id: str, after: Optional[float] = None):
+        query = self._user_ref(user_id).collection("history")
+        if after is not None:
+            after_time = datetime.fromtimestamp(after, timezone.utc)
+            query = query.where(
+                filter=firestore.FieldFilter(self.order_field, ">", after_time)
+            )
+        return query.order_by(
+            self.order_field, direction=firestore.Query.DESCENDING
+        ).limit(self.history_limit)
+
+    def _query_user_history(
+        self, user_id: str, after: Optional[float] = None
+    ) -> list[HistoryEntry]:
+        """
+        Returns the latest `history_limit` entries clicked after `after` (epoch
+        seconds), newest first.
+        """
+        return [
+            history_entry(doc, self.order_field)
+            for doc in self._history_query(user_id, after).stream()
+        ]
+
+    def _user_exists(self, user_id: str) -> Optional[bool]:
+        return True if self._user_ref(user_id).get().exists else None
+
+    def _watch_user_history(self, user_id: str):
+        def on_snapshot(snapshot, changes, read_time):
+            self.cache.update(user_id, [doc.id for doc in snapshot][::-1])
+
+        return self._history_query(user_id).on_snapshot(on_snapshot)
+
+    def _cache_user_history(self, user_id: str, history: Optional[list[str]]):
+        watch = None
+        if self.listen and history is not None:
+            try:
+                watch = self._watch_user_history(user_id)
+            except Exception as e:
+                log.warning(f"Could not watch the history of user {user_id}: {e}")
+        self.cache.set(user_id, history, watch)
+
+    async def _load_user(self, user_id: str, read_user, mirror=None):
+        """
+        Runs `read_user`, which returns `None` for missing users, concurrently
+        with the history query and caches the history. Returns both results.
+
+        With a `mirror` database (see `BaseDatabase.mirror_history`), only the
+        entries newer than the mirrored ones are read from Firestore.
+        """
+        mirrored = []
+        if mirror is not None:
+            try:
+                mirrored = await mirror.get_mirrored_history(
+                    user_id, self.history_limit
+                )
+            except Exception as e:
+                log.warning(f"Could not read the history mirror: {e}")
+        after = mirrored[0][1] if mirrored else None
+
+        user, entries = await asyncio.gather(
+            self._run(read_user, user_id),
+            self._run(self._query_user_history, user_id, after),
+        )
+        if user is None:
+            self.cache.set(user_id, None)
+            return None, None
+
+        if entries and mirror is not None:
+            try:
+                await mirror.mirror_history(user_id, entries, self.history_limit)
+            except Exception as e:
+                log.warning(f"Could not update the history mirror: {e}")
+        history = history_ids(merge_history(entries, mirrored, self.history_limit))
+        await self._run(self._cache_user_history, user_id, history)
+        return user, history
+
+    def _get_user_preferences(self, user_id: str) -> Optional[list[str]]:
+        """
+        Reads the user document and the preferences document in one `get_all`
+        round trip. Returns `None` if the user does not exist.
+        """
+        user_ref = self._user_ref(user_id)
+        categories_ref = user_ref.collection("preferences").document("categories")
+        snapshots = {
+            snapshot.reference.path: snapshot
+            for snapshot in self.client.get_all([user_ref, categories_ref])
+        }
+        if not snapshots[user_ref.path].exists:
+            return None
+        categories = snapshots[categories_ref.path]
+        if not categories.exists:
+            return []
+        return (categories.to_dict() or {}).get("categories", [])
+
+    async def get_user_history(self, user_id: str, mirror=None) -> list[str]:
+        """
+        Returns the ids of the latest articles the user has read, oldest first.
+
+        Raises `ValueError` if the user does not exist.
+        """
+        hit, history = self.cache.get(user_id)
+        if not hit:
+            _, history = await self._load_user(user_id, self._user_exists, mirror)
+        if history is None:
+            raise ValueError(f"User {user_id} does not exist.")
+        return history
+
+    async def get_user_preferences(self, user_id: str) -> list[str]:
+        """
+        Returns the user's preferred categories.
+
+        Raises `ValueError` if the user does not exist.
+        """
+        preferences = await self._run(self._get_user_preferences, user_id)
+        if preferences is None:
+            raise ValueError(f"User {user_id} does not exist.")
+        return preferences
+
+    async def get_user_profile(self, user_id: str, mirror=None) -> UserProfile:
+        """
+        Returns the user's history and preferences. The user and preferences
+        documents are read in one round trip, concurrently with the history
+        query unless the history is cached.
+
+        Raises `ValueError` if the user does not exist.
+        """
+        hit, history = self.cache.get(user_id)
+        if hit and history is None:
+            raise ValueError(f"User {user_id} does not exist.")
+
+        if hit:
+            preferences = await self._run(self._get_user_preferences, user_id)
+        else:
+            preferences, history = await self._load_user(
+                user_id, self._get_user_preferences, mirror
+            )
+        if preferences is None:
+            raise ValueError(f"User {user_id} does not exist.")
+        return UserProfile(history, preferences)
+
+    def close(self):
+        self.cache.clear()
+        self.executor.shutdown(wait=False)
+
+
+def create_firestore_client():
+    """
+    Returns a Firestore client. With FIRESTORE_EMULATOR_HOST set, the client
+    talks to the local emulator and needs no service account.
+    """
+    if os.getenv("FIRESTORE_EMULATOR_HOST"):
+        return firestore.Client(project=os.getenv("FIREBASE_PROJECT_ID", "newsmead"))
+
+    if not firebase_admin._apps:
+        cred = credentials.Certificate(os.getenv("FIREBASE_ADMIN_SDK_NAME"))
+        firebase_admin.initialize_app(cred)
+    return firestore.client()
+
+
+_user_store: Optional[UserStore] = None
+
+
+def create_user_store(client=None) -> UserStore:
+    """
+    Sets up the user store from the environment, e.g. at startup. Pass a
+    `client` to use another Firestore client, like a local fake.
+    """
+    global _user_store
+    close_user_store()
+    cache = UserHistoryCache(
+        ttl=float(os.getenv("USER_HISTORY_TTL", 300)),
+        max_users=int(os.getenv("USER_HISTORY_MAX_USERS", 10000)),
+    )
+    listen = os.getenv("USER_HISTORY_LISTEN", "false").lower() == "true"
+    _user_store = UserStore(
+        client or create_firestore_client(),
+        cache,
+        listen,
+        history_limit=int(os.getenv("USER_HISTORY_LIMIT", 50)),
+        order_field=os.getenv("USER_HISTORY_ORDER_FIELD", "timestamp"),
+        max_workers=int(os.getenv("FIRESTORE_MAX_WORKERS", 8)),
+    )
+    log.info(f"User store: history cache ttl={cache.ttl}s, listen={listen}")
+    return _user_store
+
+
+def get_user_store() -> UserStore:
+    """
+    Returns the user store, creating it on first use outside the app.
+    """
+    return _user_store or create_user_store()
+
+
+def close_user_store():
+    global _user_store
+    if _user_store is not None:
+        _user_store.close()
+        _user_store = None
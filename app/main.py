@@ -2,6 +2,7 @@ from fastapi import FastAPI, Request, HTTPException
 from collections import defaultdict
 from datetime import datetime, timedelta
 from app.api import articles, base, logviewer, recommender
+from brotli_asgi import BrotliMiddleware
 import logging.config
 import random
 import string
@@ -18,6 +19,8 @@ app.include_router(base.router)
 app.include_router(articles.router, prefix="/articles")
 app.include_router(recommender.router, prefix="/recommendations")
 app.include_router(logviewer.router, prefix="/logviewer")
+# Compress responses with brotli, or gzip for clients without brotli support
+app.add_middleware(BrotliMiddleware, minimum_size=1000, gzip_fallback=True)
 
 
 @app.middleware("http")
@@ -1,5 +1,8 @@
-from typing import Optional
-from pydantic import BaseModel
+from typing import Any, Optional
+from pydantic import BaseModel, field_validator
+
+# Number of body characters returned as `snippet` and used for language detection
+SNIPPET_LENGTH = 250
 
 
 class Article(BaseModel):
@@ -16,11 +19,65 @@ class Article(BaseModel):
     language: Optional[str] = None
 
 
+ARTICLE_FIELDS = [
+    "article_id",
+    "date",
+    "category",
+    "source",
+    "title",
+    "author",
+    "url",
+    "body",
+    "image_url",
+    "read_time",
+]
+PROJECTION_FIELDS = ARTICLE_FIELDS + ["language", "snippet"]
+
+
+def project_fields(article: dict[str, Any], fields: list[str]) -> dict[str, Any]:
+    """
+    Returns only the given fields of an article dict. `snippet` is the start
+    of the body.
+    """
+    data = {field: article.get(field) for field in fields if field != "snippet"}
+    if "snippet" in fields:
+        data["snippet"] = (article.get("body") or "")[:SNIPPET_LENGTH]
+    return data
+
+
+def parse_fields(fields: Optional[str]) -> Optional[list[str]]:
+    """
+    Parses a comma-separated `fields` query parameter.
+
+    Raises `ValueError` on unknown fields.
+    """
+    if fields is None:
+        return None
+    parsed = [field.strip() for field in fields.split(",") if field.strip()]
+    unknown = [field for field in parsed if field not in PROJECTION_FIELDS]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return parsed
+
+
 class Filter(BaseModel):
     text: Optional[str] = None
     language: Optional[str] = None
     category: Optional[str] = None
     source: Optional[str] = None
     sortBy: Optional[str] = None
+    seed: Optional[int] = None
     startDate: Optional[str] = None
     endDate: Optional[str] = None
+
+    @field_validator("category", "source")
+    @classmethod
+    def normalize_list(cls, value: Optional[str]) -> Optional[str]:
+        """
+        Strips, dedups and sorts a comma-separated list, so equivalent lists
+        (e.g. "a, b" and "b,a") query and cache alike. An empty list is `None`.
+        """
+        if value is None:
+            return None
+        items = sorted(set(item.strip() for item in value.split(",")) - {""})
+        return ",".join(items) or None
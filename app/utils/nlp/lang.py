@@ -1,9 +1,4 @@
 from lingua import Language, LanguageDetectorBuilder
-from azure.ai.translation.text import TextTranslationClient, TranslatorCredential
-from azure.ai.translation.text.models import InputTextItem
-from azure.core.exceptions import HttpResponseError
-from google.cloud import translate_v2 as translate
-import os
 import logging
 
 # Configure logging
@@ -53,48 +48,3 @@ class Lang:
         """
         return self.detect(text) == "ENGLISH"
 
-    def translate_text(
-        self, text: str, source: str = "en", target: str = "fil", service: str = "bing"
-    ) -> str:
-        """
-        Translates the text to the target language.
-        By default, it translate from English to Filipino using the Bing Translator API.
-
-        For Google, target must be an ISO 639-1 language code.
-        See https://g.co/cloud/translate/v2/translate-reference#supported_languages
-        """
-
-        if service == "bing":
-            api_key = os.getenv("AZURE_TRANSLATOR_API_KEY")
-            region = os.getenv("AZURE_TRANSLATOR_REGION")
-
-            text_translator = TextTranslationClient(
-                credential=TranslatorCredential(api_key, region)
-            )
-
-            try:
-                input_text_elements = [InputTextItem(text=text)]
-
-                response = text_translator.translate(
-                    content=input_text_elements, to=[target], from_parameter=source
-                )
-                translation = response[0] if response else None
-
-                if translation:
-                    for translated_text in translation.translations:
-                        return translated_text.text
-                else:
-                    raise ValueError(
-                        "Translation failed, no result returned from Azure Translator."
-                    )
-
-            except HttpResponseError as exception:
-                log.error(f"Error Code: {exception.error.code}")
-                log.error(f"Message: {exception.error.message}")
-
-        elif service == "google":
-            translate_client = translate.Client()
-            if isinstance(text, bytes):
-                text = text.decode("utf-8")
-            result = translate_client.translate(text, target_language=target)
-            return result["translatedText"]
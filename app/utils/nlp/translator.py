@@ -0,0 +1,268 @@
+from abc import ABC, abstractmethod
+from typing import Optional
+import asyncio
+import os
+import re
+import time
+import httpx
+import logging
+
+# Configure logging
+log = logging.getLogger(__name__)
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_long_text(text: str, max_chars: int) -> list[str]:
+    """
+    Splits a paragraph longer than `max_chars` at sentence ends, or at spaces
+    if a sentence is still too long.
+    """
+    parts = []
+    current = ""
+    for sentence in SENTENCE_END.split(text):
+        if len(sentence) > max_chars and current:
+            # Flushed first, so the text stays in order
+            parts.append(current)
+            current = ""
+        while len(sentence) > max_chars:
+            cut = sentence.rfind(" ", 0, max_chars)
+            cut = cut if cut > 0 else max_chars
+            parts.append(sentence[:cut])
+            sentence = sentence[cut:].lstrip()
+        if current and len(current) + 1 + len(sentence) > max_chars:
+            parts.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}" if current else sentence
+    if current:
+        parts.append(current)
+    return parts
+
+
+class Translator(ABC):
+    """
+    Translates batches of texts with one HTTP request per chunk. A chunk holds
+    at most `max_items` texts and `max_chars` characters, the service limits.
+    """
+
+    max_items: int
+    max_chars: int
+
+    def __init__(self, client: httpx.AsyncClient, concurrency: int):
+        self.client = client
+        self.semaphore = asyncio.Semaphore(concurrency)
+
+    @abstractmethod
+    async def _translate_chunk(
+        self, texts: list[str], source: str, target: str
+    ) -> list[str]:
+        pass
+
+    def _chunks(self, texts: list[str]) -> list[list[str]]:
+        chunks = []
+        current = []
+        size = 0
+        for text in texts:
+            if current and (
+                len(current) == self.max_items or size + len(text) > self.max_chars
+            ):
+                chunks.append(current)
+                current = []
+                size = 0
+            current.append(text)
+            size += len(text)
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def translate(self, texts: list[str], source: str, target: str) -> list[str]:
+        """
+        Translates `texts` keeping their order, with the chunks translated
+        concurrently. Every text must be at most `max_chars` long.
+        """
+
+        async def translate_chunk(chunk: list[str]) -> list[str]:
+            async with self.semaphore:
+                return await self._translate_chunk(chunk, source, target)
+
+        results = await asyncio.gather(
+            *[translate_chunk(chunk) for chunk in self._chunks(texts)]
+        )
+        return [text for result in results for text in result]
+
+
+class AzureTranslator(Translator):
+    max_items = 1000
+    max_chars = 5000
+
+    def __init__(self, client: httpx.AsyncClient, concurrency: int):
+        super().__init__(client, concurrency)
+        self.endpoint = os.getenv(
+            "AZURE_TRANSLATOR_ENDPOINT", "https://api.cognitive.microsofttranslator.com"
+        )
+        self.headers = {
+            "Ocp-Apim-Subscription-Key": os.getenv("AZURE_TRANSLATOR_API_KEY", ""),
+            "Ocp-Apim-Subscription-Region": os.getenv("AZURE_TRANSLATOR_REGION", ""),
+        }
+
+    async def _translate_chunk(
+        self, texts: list[str], source: str, target: str
+    ) -> list[str]:
+        response = await self.client.post(
+            f"{self.endpoint}/translate",
+            params={"api-version": "3.0", "from": source, "to": target},
+            headers=self.headers,
+            json=[{"Text": text} for text in texts],
+        )
+        response.raise_for_status()
+        return [item["translations"][0]["text"] for item in response.json()]
+
+
+class GoogleTranslator(Translator):
+    """
+    Google Cloud Translation (v2). Authenticates with GOOGLE_TRANSLATE_API_KEY
+    if set, otherwise with the service account of GOOGLE_APPLICATION_CREDENTIALS.
+    """
+
+    max_items = 128
+    max_chars = 5000
+
+    def __init__(self, client: httpx.AsyncClient, concurrency: int):
+        super().__init__(client, concurrency)
+        self.endpoint = os.getenv(
+            "GOOGLE_TRANSLATE_ENDPOINT",
+            "https://translation.googleapis.com/language/translate/v2",
+        )
+        self.api_key = os.getenv("GOOGLE_TRANSLATE_API_KEY")
+        self.credentials = None
+
+    async def _auth(self) -> tuple[dict, dict]:
+        if self.api_key:
+            return {"key": self.api_key}, {}
+
+        if self.credentials is None:
+            import google.auth
+
+            self.credentials, _ = google.auth.default(
+                scopes=["https://www.googleapis.com/auth/cloud-translation"]
+            )
+        if not self.credentials.valid:
+            from google.auth.transport.requests import Request
+
+            # Refreshing the token is blocking
+            await asyncio.get_event_loop().run_in_executor(
+                None, self.credentials.refresh, Request()
+            )
+        return {}, {"Authorization": f"Bearer {self.credentials.token}"}
+
+    async def _translate_chunk(
+        self, texts: list[str], source: str, target: str
+    ) -> list[str]:
+        params, headers = await self._auth()
+        response = await self.client.post(
+            self.endpoint,
+            params=params,
+            headers=headers,
+            json={"q": texts, "source": source, "target": target, "format": "text"},
+        )
+        response.raise_for_status()
+        return [
+            item["translatedText"] for item in response.json()["data"]["translations"]
+        ]
+
+
+class TranslationService:
+    """
+    Async translation clients sharing one HTTP connection pool, created once in
+    the lifespan (see `create_translation_service`).
+    """
+
+    def __init__(self, timeout: float = 30, concurrency: int = 8):
+        self.client = httpx.AsyncClient(timeout=timeout)
+        self.translators: dict[str, Translator] = {
+            "bing": AzureTranslator(self.client, concurrency),
+            "google": GoogleTranslator(self.client, concurrency),
+        }
+
+    async def close(self):
+        await self.client.aclose()
+
+    def get_translator(self, service: str) -> Translator:
+        if service not in self.translators:
+            raise ValueError(f"Unknown translation service: {service}")
+        return self.translators[service]
+
+    async def translate_texts(
+        self,
+        texts: list[str],
+        service: str = "bing",
+        source: str = "en",
+        target: str = "fil",
+    ) -> list[str]:
+        return await self.get_translator(service).translate(texts, source, target)
+
+    async def translate_article(
+        self,
+        title: str,
+        body: str,
+        service: str = "bing",
+        source: str = "en",
+        target: str = "fil",
+    ) -> dict[str, str]:
+        """
+        Translates the title and body of an article. The body is split into
+        paragraphs, each sent as its own text, so line breaks are kept exactly.
+        Paragraphs over the service limit are split at sentence ends.
+        """
+        start_time = time.perf_counter()
+        max_chars = self.get_translator(service).max_chars
+        paragraphs = body.split("\n")
+
+        # (paragraph index, part) of every non-empty piece of the body
+        pieces = []
+        for index, paragraph in enumerate(paragraphs):
+            if not paragraph.strip():
+                continue
+            for part in split_long_text(paragraph, max_chars):
+                pieces.append((index, part))
+
+        translated = await self.translate_texts(
+            [title] + [part for _, part in pieces], service, source, target
+        )
+
+        translated_paragraphs: list[list[str]] = [[] for _ in paragraphs]
+        for (index, _), text in zip(pieces, translated[1:]):
+            translated_paragraphs[index].append(text)
+        body = "\n".join(
+            " ".join(parts) if parts else paragraph
+            for parts, paragraph in zip(translated_paragraphs, paragraphs)
+        )
+
+        log.info(
+            f"Translated article ({service}, {len(pieces)} pieces) in {time.perf_counter() - start_time:.2f}s"
+        )
+        return {"title": translated[0], "body": body}
+
+
+_translation_service: Optional[TranslationService] = None
+
+
+def create_translation_service() -> TranslationService:
+    global _translation_service
+    _translation_service = TranslationService(
+        timeout=float(os.getenv("TRANSLATION_TIMEOUT", 30)),
+        concurrency=int(os.getenv("TRANSLATION_CONCURRENCY", 8)),
+    )
+    return _translation_service
+
+
+def get_translation_service() -> Optional[TranslationService]:
+    return _translation_service
+
+
+async def close_translation_service():
+    global _translation_service
+    if _translation_service is not None:
+        await _translation_service.close()
+        _translation_service = None
@@ -0,0 +1,63 @@
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+import asyncio
+import os
+import logging
+
+# Configure logging
+log = logging.getLogger(__name__)
+
+
+_extraction_pool: Optional[ProcessPoolExecutor] = None
+
+
+def extraction_workers() -> int:
+    default = max(1, (os.cpu_count() or 2) - 1)
+    return int(os.getenv("SCRAPER_EXTRACT_WORKERS") or default)
+
+
+def create_extraction_pool() -> Optional[ProcessPoolExecutor]:
+    """
+    Starts the worker processes that parse scraped HTML (see
+    `news.extract_articles`). Call it at startup before the ML model is loaded,
+    so the forked workers do not copy it.
+
+    With SCRAPER_EXTRACT_WORKERS=0 there is no pool and extraction runs on the
+    default thread executor.
+    """
+    global _extraction_pool
+    close_extraction_pool()
+    workers = extraction_workers()
+    if workers > 0:
+        _extraction_pool = ProcessPoolExecutor(max_workers=workers)
+        # Start the workers now instead of on the first scrape
+        for future in [_extraction_pool.submit(os.getpid) for _ in range(workers)]:
+            future.result()
+        log.info(f"Started {workers} HTML extraction workers")
+    return _extraction_pool
+
+
+def get_extraction_pool() -> Optional[ProcessPoolExecutor]:
+    return _extraction_pool or create_extraction_pool()
+
+
+def close_extraction_pool():
+    global _extraction_pool
+    if _extraction_pool is not None:
+        _extraction_pool.shutdown(wait=False, cancel_futures=True)
+        _extraction_pool = None
+
+
+async def run_extraction(func, *args):
+    """
+    Runs `func(*args)` in the extraction pool, keeping the parsing off the
+    event loop. A pool broken by a dead worker is replaced and the job retried
+    once.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_extraction_pool(), func, *args)
+    except BrokenProcessPool:
+        log.warning("HTML extraction pool broke, restarting it")
+        return await loop.run_in_executor(create_extraction_pool(), func, *args)
@@ -0,0 +1,131 @@
+from contextlib import asynccontextmanager
+from typing import Optional
+from urllib.parse import urlsplit
+from fake_useragent import UserAgent
+import httpx
+import asyncio
+import random
+import time
+import os
+import logging
+
+# Configure logging
+log = logging.getLogger(__name__)
+
+# Used if fake_useragent cannot load its data
+FALLBACK_USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/124.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.4 Safari/605.1.15",
+    "Mozilla/5.0 (X11; Linux x86_64; rv:125.0) Gecko/20100101 Firefox/125.0",
+]
+
+
+class UserAgentPool:
+    """
+    User agents drawn once from fake_useragent, so rotating them per request
+    does not load its data again (`UserAgent()` parses it on every call).
+    """
+
+    def __init__(self, size: int = 50):
+        try:
+            user_agent = UserAgent()
+            self.agents = list(dict.fromkeys(user_agent.random for _ in range(size)))
+        except Exception as e:
+            log.warning(f"Could not load user agents, using fallbacks: {e}")
+            self.agents = list(FALLBACK_USER_AGENTS)
+
+    def random(self) -> str:
+        return random.choice(self.agents)
+
+
+_user_agents: Optional[UserAgentPool] = None
+
+
+def get_user_agents() -> UserAgentPool:
+    global _user_agents
+    if _user_agents is None:
+        _user_agents = UserAgentPool(int(os.getenv("SCRAPER_USER_AGENTS", 50)))
+    return _user_agents
+
+
+def http2_available() -> bool:
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def create_scraper_client(proxy: Optional[str] = None) -> httpx.AsyncClient:
+    """
+    Returns a client for scraping one provider. It keeps connections alive
+    (at most SCRAPER_MAX_CONNECTIONS), speaks HTTP/2 if `h2` is installed and
+    accepts gzip/deflate (and brotli, if installed) compressed responses.
+    """
+    max_connections = int(os.getenv("SCRAPER_MAX_CONNECTIONS", 10))
+    return httpx.AsyncClient(
+        http2=http2_available(),
+        limits=httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_connections,
+            keepalive_expiry=30,
+        ),
+        timeout=httpx.Timeout(10.0, connect=30.0),
+        follow_redirects=True,
+        proxies=proxy,
+    )
+
+
+def request_headers() -> dict[str, str]:
+    return {"User-Agent": get_user_agents().random()}
+
+
+class HostLimiter:
+    """
+    Caps concurrent requests per host (`per_host`) and overall (`total`) and
+    spaces the requests to one host at least `delay` seconds apart, so
+    scraping every provider at once stays polite to each site.
+
+    The semaphores are created on first use, inside the running event loop.
+    """
+
+    def __init__(self, per_host: int = 4, total: int = 32, delay: float = 0.25):
+        self.per_host = per_host
+        self.total = total
+        self.delay = delay
+        self.hosts: dict[str, asyncio.Semaphore] = {}
+        self.next_start: dict[str, float] = {}
+        self._total: Optional[asyncio.Semaphore] = None
+
+    @asynccontextmanager
+    async def slot(self, url: str):
+        host = urlsplit(url).hostname or ""
+        if host not in self.hosts:
+            self.hosts[host] = asyncio.Semaphore(self.per_host)
+        if self._total is None:
+            self._total = asyncio.Semaphore(self.total)
+
+        async with self.hosts[host]:
+            now = time.monotonic()
+            start = max(now, self.next_start.get(host, now))
+            self.next_start[host] = start + self.delay
+            if start > now:
+                await asyncio.sleep(start - now)
+            # Waiting for the host does not hold one of the global slots
+            async with self._total:
+                yield
+
+
+_host_limiter: Optional[HostLimiter] = None
+
+
+def get_host_limiter() -> HostLimiter:
+    global _host_limiter
+    if _host_limiter is None:
+        _host_limiter = HostLimiter(
+            per_host=int(os.getenv("SCRAPER_PER_HOST_CONCURRENCY", 4)),
+            total=int(os.getenv("SCRAPER_MAX_CONCURRENCY", 32)),
+            delay=float(os.getenv("SCRAPER_HOST_DELAY", 0.25)),
+        )
+    return _host_limiter
+
@@ -2,15 +2,23 @@
 # Licensed under the BSD 2-Clause License.
 
 from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
 from enum import Enum
-from typing import NamedTuple
-from bs4 import BeautifulSoup
+from typing import NamedTuple, Optional
+from lxml.html import HtmlElement
 from newspaper import Article as ArticleScraper
 from datetime import datetime
-from dateutil.parser import parse
-from fake_useragent import UserAgent
-from app.database.asyncdb import AsyncDatabase
+from app.database import create_database
+from app.database.url_index import UrlIndex
+from app.database.dates import local_timezone, parse_date
 from app.models.article import Article
+from app.utils.scrapers.timeline import ScrapeTimeline
+from app.utils.scrapers.extraction import run_extraction
+from app.utils.scrapers.http import (
+    create_scraper_client,
+    get_host_limiter,
+    request_headers,
+)
 import app.backend.config as config
 import os
 import httpx
@@ -53,21 +61,102 @@ class ScraperConfig(NamedTuple):
     webcrawler_urls: dict[Category, list[str]] = None
 
 
+class ExtractedArticle(NamedTuple):
+    title: str
+    body: str
+    author: str
+    publish_date: Optional[str]
+    top_image: str
+    read_time: str
+
+
+def has_class(name: str) -> str:
+    """
+    Returns an XPath predicate matching elements with the CSS class `name`
+    among their classes, like BeautifulSoup's `class_=name`.
+    """
+    return f"contains(concat(' ', normalize-space(@class), ' '), ' {name} ')"
+
+
+def first(doc: HtmlElement, path: str):
+    """
+    Returns the first match of the XPath `path` in `doc`, or `None`.
+    """
+    matches = doc.xpath(path)
+    return matches[0] if matches else None
+
+
 class ScraperStrategy(ABC):
+    _client: Optional[httpx.AsyncClient] = None
+
     @property
     @abstractmethod
     def config(self) -> ScraperConfig:
         pass
 
-    async def scrape_all(self, proxy_scraper=None) -> list[Article]:
-        results = []
-        for category in self.config.category_mapping:
-            category_results = await self.scrape_category(category, proxy_scraper)
-            results.extend(category_results)
-        return results
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """
+        The long-lived client of this provider, reused by every request made
+        without a proxy.
+        """
+        if self._client is None or self._client.is_closed:
+            self._client = create_scraper_client()
+        return self._client
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @asynccontextmanager
+    async def http_client(self, proxy: Optional[str] = None):
+        if proxy is None:
+            yield self.client
+        else:
+            # Proxies rotate on every retry, so their clients are not kept
+            async with create_scraper_client(proxy) as client:
+                yield client
+
+    async def get(self, client: httpx.AsyncClient, url: str) -> httpx.Response:
+        """
+        Fetches `url` within the per-host and global request limits.
+        """
+        async with get_host_limiter().slot(url):
+            return await client.get(url, headers=request_headers())
+
+    async def scrape_all(
+        self,
+        proxy_scraper=None,
+        url_index: Optional[UrlIndex] = None,
+        timeline: Optional[ScrapeTimeline] = None,
+    ) -> list[Article]:
+        """
+        Scrapes every category concurrently; `get` keeps the requests within
+        the per-host limits. Category runs are recorded on the `timeline`.
+        """
+        if url_index is None:
+            async with create_database() as db:
+                url_index = await db.load_url_index()
+        if timeline is None:
+            timeline = ScrapeTimeline()
+        results = await asyncio.gather(
+            *(
+                timeline.track(
+                    self.config.provider_name,
+                    category.value,
+                    self.scrape_category(category, proxy_scraper, url_index),
+                )
+                for category in self.config.category_mapping
+            )
+        )
+        return [article for articles in results for article in articles]
 
     async def scrape_category(
-        self, category: Category, proxy_scraper=None
+        self,
+        category: Category,
+        proxy_scraper=None,
+        url_index: Optional[UrlIndex] = None,
     ) -> list[Article]:
         if category in self.config.category_mapping:
             log.info(f"{self._cname()} scraping for {category} started")
@@ -75,10 +164,11 @@ class ScraperStrategy(ABC):
             articles = []
             articles.extend(await self.fetch_and_parse_rss(category, proxy_scraper))
 
-            async with AsyncDatabase() as db:
-                filtered_articles = await db.filter_new_urls(
-                    articles, category=category.value
-                )
+            if url_index is None:
+                async with create_database() as db:
+                    filtered_articles = await db.filter_new_urls(articles)
+            else:
+                filtered_articles = url_index.filter_new(articles)
 
             scraped_articles = await self.scrape_articles(
                 filtered_articles, proxy_scraper
@@ -107,12 +197,19 @@ class ScraperStrategy(ABC):
         failed = []
 
         for i in range(0, len(articles), chunk_size):
-            tasks = [
-                self.scrape_article(article) for article in articles[i : i + chunk_size]
-            ]
-            results = await asyncio.gather(*tasks)
+            chunk = articles[i : i + chunk_size]
+            responses = await asyncio.gather(
+                *(self.fetch_article(article) for article in chunk)
+            )
+            fetched = []
+            for article, response in zip(chunk, responses):
+                if response is None:
+                    failed.append(article)
+                else:
+                    fetched.append((article, response))
 
-            for result in results:
+            # The chunk's pages are parsed in one extraction job
+            for result in await self.extract_responses(fetched):
                 if result[0]:
                     success.append(result[1])
                 else:
@@ -135,15 +232,22 @@ class ScraperStrategy(ABC):
         return success
 
     async def scrape_article(self, article: Article, proxy: dict = None) -> tuple:
-        headers = {"User-Agent": UserAgent().random}
-        timeout = httpx.Timeout(10.0, connect=30.0)
-        async with httpx.AsyncClient(
-            headers=headers, follow_redirects=True, proxies=proxy, timeout=timeout
-        ) as client:
+        response = await self.fetch_article(article, proxy)
+        if response is None:
+            return False, article
+        return (await self.extract_responses([(article, response)]))[0]
+
+    async def fetch_article(
+        self, article: Article, proxy: dict = None
+    ) -> Optional[httpx.Response]:
+        """
+        Downloads the article's page. Returns `None` if it fails or is empty.
+        """
+        async with self.http_client(proxy) as client:
             try:
                 if proxy is not None:
-                    log.info(f"Fetching w/ proxy: {article.url} {timeout}")
-                response = await client.get(article.url)
+                    log.info(f"Fetching w/ proxy: {article.url} {client.timeout}")
+                response = await self.get(client, article.url)
                 if proxy is not None:
                     log.info(f"Fetching w/ proxy success")
                 response.raise_for_status()
@@ -151,53 +255,98 @@ class ScraperStrategy(ABC):
                 log.error(
                     f"HTTP Exception {'' if proxy is None else '(proxy: ' + proxy + ')'}: {e}"
                 )
-                return False, article
-
-            if not response.content:
-                log.error(f"Article has no content: {article.url}")
-                return False, article
-
-            soup = BeautifulSoup(response.content, "html.parser")
-            author = self.extract_author(soup)
-
-            news_article = ArticleScraper(str(response.url))
-            news_article.download(input_html=response.content)
-            news_article.parse()
+                return None
 
-            article.date = article.date or self.parse_date_complete(
-                news_article.publish_date or datetime.now().isoformat()
-            )
-            article.title = article.title or news_article.title
-            article.body = self.clean_body(news_article.text)
-            article.author = (
-                author
-                if author is not None
-                else (
-                    news_article.authors[0].strip()
-                    if news_article.authors
-                    else self.config.default_author
-                )
-            )
-            article.author = (
-                article.author.title() if article.author.isupper() else article.author
+        if not response.content:
+            log.error(f"Article has no content: {article.url}")
+            return None
+        return response
+
+    async def extract_responses(
+        self, fetched: list[tuple[Article, httpx.Response]]
+    ) -> list[tuple]:
+        """
+        Parses the fetched pages in one job of the extraction pool and fills in
+        their articles. Returns `(success, article)` tuples in order.
+        """
+        if not fetched:
+            return []
+        pages = [(str(response.url), response.content) for _, response in fetched]
+        try:
+            extracted = await run_extraction(
+                extract_articles, self.config.provider_name, pages
             )
-            article.author = (
-                self.config.default_author if article.author == "" else article.author
+        except Exception as e:
+            log.error(f"{self._cname()} failed to extract {len(pages)} articles: {e}")
+            extracted = [None] * len(pages)
+
+        return [
+            (False, article)
+            if result is None
+            else (True, self.apply_extracted(article, str(response.url), result))
+            for (article, response), result in zip(fetched, extracted)
+        ]
+
+    def extract(self, url: str, html: bytes) -> ExtractedArticle:
+        """
+        Parses an article page. CPU-bound, so it runs in the extraction pool
+        (see `extract_articles`).
+
+        The page is parsed once: the author selectors run on the lxml tree
+        newspaper built for the text, title, image and date.
+        """
+        news_article = ArticleScraper(url)
+        news_article.download(input_html=html)
+        news_article.parse()
+        doc = news_article.doc
+        author = self.extract_author(doc) if doc is not None else None
+
+        author = (
+            author
+            if author is not None
+            else (
+                news_article.authors[0].strip()
+                if news_article.authors
+                else self.config.default_author
             )
-            article.url = str(response.url)
-            article.image_url = article.image_url or news_article.top_image
-            article.read_time = str(readtime.of_text(news_article.text))
+        )
+        author = author.title() if author.isupper() else author
+        return ExtractedArticle(
+            title=news_article.title,
+            body=self.clean_body(news_article.text),
+            author=self.config.default_author if author == "" else author,
+            publish_date=(
+                news_article.publish_date.isoformat()
+                if news_article.publish_date
+                else None
+            ),
+            top_image=news_article.top_image,
+            read_time=str(readtime.of_text(news_article.text)),
+        )
 
-            try:
-                if article.movies:
-                    # add movies to article as string "[Video: movies[0]]"
-                    article.body += "\n\n" + "\n\n".join(
-                        [f"[Video: {movie}]" for movie in article.movies]
-                    )
-            except:
-                pass
+    def apply_extracted(
+        self, article: Article, url: str, extracted: ExtractedArticle
+    ) -> Article:
+        article.date = article.date or self.parse_date_complete(
+            extracted.publish_date or datetime.now().isoformat()
+        )
+        article.title = article.title or extracted.title
+        article.body = extracted.body
+        article.author = extracted.author
+        article.url = url
+        article.image_url = article.image_url or extracted.top_image
+        article.read_time = extracted.read_time
+
+        try:
+            if article.movies:
+                # add movies to article as string "[Video: movies[0]]"
+                article.body += "\n\n" + "\n\n".join(
+                    [f"[Video: {movie}]" for movie in article.movies]
+                )
+        except:
+            pass
 
-        return True, article
+        return article
 
     async def scrape_article_with_retries(
         self, article: Article, proxy_scraper, max_retries=10
@@ -226,16 +375,9 @@ class ScraperStrategy(ABC):
         while retries > 0:
             log.info(f"Fetching RSS feed for {category} ({retries} retries left)")
             proxy = proxy_scraper.get_next_proxy_deprecated() if retries < 10 else None
-            timeout = httpx.Timeout(10.0, connect=30.0)
-            headers = {"User-Agent": UserAgent().random}
             try:
-                async with httpx.AsyncClient(
-                    headers=headers,
-                    proxies=proxy,
-                    follow_redirects=True,
-                    timeout=timeout,
-                ) as client:
-                    rss_response = await client.get(rss_url)
+                async with self.http_client(proxy) as client:
+                    rss_response = await self.get(client, rss_url)
             except httpx.HTTPError as e:
                 log.error("Connection error: " + str(e))
                 retries -= 1
@@ -310,10 +452,10 @@ class ScraperStrategy(ABC):
 
         log.info(f"Saved webcrawler feed to {filename}")
 
-    def extract_author(self, soup: BeautifulSoup) -> str:
-        author = soup.find("meta", {"name": "author"})
+    def extract_author(self, doc: HtmlElement) -> str:
+        author = first(doc, "//meta[@name='author']")
         if author is not None:
-            return author.get("content").split(",")[0].strip()
+            return author.get("content", "").split(",")[0].strip()
         return None
 
     def clean_body(self, text: str) -> str:
@@ -331,10 +473,11 @@ class ScraperStrategy(ABC):
         return self.__class__.__name__
 
     def parse_date_complete(self, date) -> str:
-        if isinstance(date, datetime):
-            return date.strftime("%Y-%m-%d %H:%M:%S")
-        else:
-            return parse(date).strftime("%Y-%m-%d %H:%M:%S")
+        # Dates with an offset are converted to local time, so the stored text
+        # and its `published_at` timestamp (see dates.py) agree
+        return (
+            parse_date(date).astimezone(local_timezone()).strftime("%Y-%m-%d %H:%M:%S")
+        )
 
 
 class GMANewsScraper(ScraperStrategy):
@@ -374,11 +517,15 @@ class PhilstarScraper(ScraperStrategy):
             default_author="Philstar.com",
         )
 
-    def extract_author(self, soup: BeautifulSoup) -> str:
-        author_tag = soup.find("div", class_="article__credits-author-pub")
-        if author_tag:
-            a_tags = author_tag.find_all("a")
-            return a_tags[-1].text.strip() if a_tags else author_tag.text.strip()
+    def extract_author(self, doc: HtmlElement) -> str:
+        author_tag = first(doc, f"//div[{has_class('article__credits-author-pub')}]")
+        if author_tag is not None:
+            a_tags = author_tag.xpath(".//a")
+            return (
+                a_tags[-1].text_content().strip()
+                if a_tags
+                else author_tag.text_content().strip()
+            )
         else:
             return None
 
@@ -395,11 +542,13 @@ class ManilaBulletinScraper(ScraperStrategy):
             default_author="Manila Bulletin",
         )
 
-    def extract_author(self, soup: BeautifulSoup) -> str:
-        author_tag = soup.find(
-            "a", class_="custom-text-link uppercase author-name-link pb-0 mt-1"
+    def extract_author(self, doc: HtmlElement) -> str:
+        span = first(
+            doc,
+            "//a[@class='custom-text-link uppercase author-name-link pb-0 mt-1']"
+            "//span",
         )
-        return author_tag.span.text if author_tag else None
+        return span.text_content() if span is not None else None
 
 
 class InquirerScraper(ScraperStrategy):
@@ -420,46 +569,52 @@ class InquirerScraper(ScraperStrategy):
             default_author="INQUIRER.net",
         )
 
-    def extract_author(self, soup: BeautifulSoup) -> str:
-        author = super().extract_author(soup)
+    def extract_author(self, doc: HtmlElement) -> str:
+        author = super().extract_author(doc)
         if author:
             return author
 
-        script_tag = soup.find("script", text=re.compile(r"\'author_name\':"))
-        if script_tag:
+        script_tag = first(doc, "//script[contains(text(), \"'author_name':\")]")
+        if script_tag is not None:
             author_name_match = re.search(
-                r"\'author_name\': \'(.*?)\'", script_tag.text
+                r"\'author_name\': \'(.*?)\'", script_tag.text_content()
             )
             return author_name_match.group(1).strip() if author_name_match else None
 
         # If author_name is empty in script, extract from the subsequent div tag
-        div_tag = soup.find("div", id="art_plat")
-        if div_tag:
-            author_link = div_tag.find("a")
-            return author_link.text.strip() if author_link else None
+        div_tag = first(doc, "//div[@id='art_plat']")
+        if div_tag is not None:
+            author_link = first(div_tag, ".//a")
+            return (
+                author_link.text_content().strip() if author_link is not None else None
+            )
 
 
 class News5Scraper(ScraperStrategy):
     @property
     def config(self) -> ScraperConfig:
+        category_mapping = {
+            Category.News: "news",
+            Category.Opinion: "opinion",
+            Category.Sports: "sports",
+            Category.Technology: "tech",
+            Category.Lifestyle: "lifestyle",
+            Category.Business: "business",
+            Category.Entertainment: "entertainment",
+        }
         return ScraperConfig(
             provider_name=Provider.News5.value,
-            category_mapping={
-                Category.News: "news",
-                Category.Opinion: "opinion",
-                Category.Sports: "sports",
-                Category.Technology: "tech",
-                Category.Lifestyle: "lifestyle",
-                Category.Business: "business",
-                Category.Entertainment: "entertainment",
+            category_mapping=category_mapping,
+            webcrawler_urls={
+                category: [f"https://news.tv5.com.ph/articles/{path}"]
+                for category, path in category_mapping.items()
             },
-            web_url="https://news.tv5.com.ph/articles/[category]",
             default_author="News5",
         )
 
-    def extract_author(self, soup: BeautifulSoup) -> str:
-        author_tag = soup.find("div", class_="author")
-        return author_tag.text.strip() if author_tag else None
+    def extract_author(self, doc: HtmlElement) -> str:
+        author_tag = first(doc, f"//div[{has_class('author')}]")
+        return author_tag.text_content().strip() if author_tag is not None else None
 
 
 class AbanteNewsScraper(ScraperStrategy):
@@ -479,7 +634,7 @@ class AbanteNewsScraper(ScraperStrategy):
             default_author="Abante News",
         )
 
-    def extract_author(self, soup: BeautifulSoup) -> str:
+    def extract_author(self, doc: HtmlElement) -> str:
         return None
 
 
@@ -501,9 +656,9 @@ class ABSCBNScraper(ScraperStrategy):
             default_author="ABS-CBN News",
         )
 
-    def extract_author(self, soup: BeautifulSoup) -> str:
-        author_tag = soup.find("div", class_="author")
-        return author_tag.text.strip() if author_tag else None
+    def extract_author(self, doc: HtmlElement) -> str:
+        author_tag = first(doc, f"//div[{has_class('author')}]")
+        return author_tag.text_content().strip() if author_tag is not None else None
 
     async def fetch_and_parse_rss(
         self, category: Category, proxy_scraper, retries=10, save=True
@@ -519,16 +674,9 @@ class ABSCBNScraper(ScraperStrategy):
         while retries > 0:
             log.info(f"Fetching RSS feed for {category} ({retries} retries left)")
             proxy = proxy_scraper.get_next_proxy_deprecated() if retries < 10 else None
-            timeout = httpx.Timeout(10.0, connect=30.0)
-            headers = {"User-Agent": UserAgent().random}
             try:
-                async with httpx.AsyncClient(
-                    headers=headers,
-                    proxies=proxy,
-                    follow_redirects=True,
-                    timeout=timeout,
-                ) as client:
-                    rss_response = await client.get(rss_url)
+                async with self.http_client(proxy) as client:
+                    rss_response = await self.get(client, rss_url)
             except httpx.HTTPError as e:
                 log.error("Connection error: " + str(e))
                 retries -= 1
@@ -578,13 +726,23 @@ class NewsScraper:
     def __init__(self, strategy: ScraperStrategy):
         self.strategy = strategy
 
-    async def scrape_all(self, proxy_scraper) -> list[Article]:
-        return await self.strategy.scrape_all(proxy_scraper=proxy_scraper)
+    async def scrape_all(
+        self,
+        proxy_scraper,
+        url_index: Optional[UrlIndex] = None,
+        timeline: Optional[ScrapeTimeline] = None,
+    ) -> list[Article]:
+        return await self.strategy.scrape_all(
+            proxy_scraper=proxy_scraper, url_index=url_index, timeline=timeline
+        )
 
     async def scrape_category(
-        self, category: Category, proxy_scraper=None
+        self,
+        category: Category,
+        proxy_scraper=None,
+        url_index: Optional[UrlIndex] = None,
     ) -> list[Article]:
-        return await self.strategy.scrape_category(category, proxy_scraper)
+        return await self.strategy.scrape_category(category, proxy_scraper, url_index)
 
     async def scrape_articles(
         self, articles: list[Article], proxy_scraper=None
@@ -609,3 +767,57 @@ provider_strategy_mapping = {
 
 def get_scraper_strategy(provider: Provider) -> ScraperStrategy:
     return provider_strategy_mapping.get(provider)
+
+
+def extract_articles(
+    provider: str, pages: list[tuple[str, bytes]]
+) -> list[Optional[ExtractedArticle]]:
+    """
+    Extracts `(url, html)` pages with the provider's strategy. Runs in the
+    extraction pool; a page that fails to parse gives `None`.
+    """
+    strategy = get_scraper_strategy(Provider(provider))
+    extracted = []
+    for url, html in pages:
+        try:
+            extracted.append(strategy.extract(url, html))
+        except Exception as e:
+            log.error(f"Failed to extract {url}: {e}")
+            extracted.append(None)
+    return extracted
+
+
+async def scrape_providers(
+    proxy_scraper,
+    url_index: Optional[UrlIndex] = None,
+    providers: Optional[list[Provider]] = None,
+) -> tuple[dict[Provider, list[Article]], ScrapeTimeline]:
+    """
+    Scrapes all `providers` (default: every provider) and their categories
+    concurrently, so the run takes about as long as the slowest provider.
+    Returns each provider's articles and the run's timeline.
+    """
+    if url_index is None:
+        async with create_database() as db:
+            url_index = await db.load_url_index()
+    providers = list(providers or Provider)
+    timeline = ScrapeTimeline()
+
+    async def scrape_provider(provider: Provider) -> list[Article]:
+        # One failing provider must not discard the others' articles
+        try:
+            return await NewsScraper(get_scraper_strategy(provider)).scrape_all(
+                proxy_scraper, url_index, timeline
+            )
+        except Exception as e:
+            log.error(f"Scraping {provider.value} failed: {e}")
+            return []
+
+    results = await asyncio.gather(*(scrape_provider(p) for p in providers))
+    log.info(timeline.report())
+    return dict(zip(providers, results)), timeline
+
+
+async def close_scraper_clients():
+    for strategy in provider_strategy_mapping.values():
+        await strategy.close()
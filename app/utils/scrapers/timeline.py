@@ -0,0 +1,97 @@
+from typing import Awaitable, NamedTuple, Optional
+from app.models.article import Article
+import time
+import logging
+
+# Configure logging
+log = logging.getLogger(__name__)
+
+
+class CategoryRun(NamedTuple):
+    provider: str
+    category: str
+    start: float  # seconds since the run started
+    end: float
+    articles: int
+    error: Optional[str] = None
+
+
+class ProviderSpan(NamedTuple):
+    provider: str
+    start: float
+    end: float
+    articles: int
+    errors: int
+
+
+class ScrapeTimeline:
+    """
+    Records when each provider's categories were scraped during one run, to
+    see which provider bounds the run's duration.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.runs: list[CategoryRun] = []
+
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    async def track(
+        self, provider: str, category: str, scrape: Awaitable[list[Article]]
+    ) -> list[Article]:
+        """
+        Awaits `scrape` and records its run. A failed category is logged and
+        recorded, and returns no articles instead of failing the whole run.
+        """
+        start = self.elapsed()
+        articles, error = [], None
+        try:
+            articles = await scrape
+        except Exception as e:
+            log.error(f"{provider} scraping for {category} failed: {e}")
+            error = repr(e)
+        self.runs.append(
+            CategoryRun(provider, category, start, self.elapsed(), len(articles), error)
+        )
+        return articles
+
+    def provider_spans(self) -> list[ProviderSpan]:
+        """
+        Returns the span of each provider, from its first category's start to
+        its last category's end, slowest provider first.
+        """
+        spans = {}
+        for run in self.runs:
+            span = spans.get(run.provider)
+            if span is None:
+                span = ProviderSpan(run.provider, run.start, run.end, 0, 0)
+            spans[run.provider] = ProviderSpan(
+                run.provider,
+                min(span.start, run.start),
+                max(span.end, run.end),
+                span.articles + run.articles,
+                span.errors + (run.error is not None),
+            )
+        return sorted(spans.values(), key=lambda span: span.end, reverse=True)
+
+    def report(self, width: int = 40) -> str:
+        """
+        Renders the provider spans as a text timeline, e.g.
+
+            gmanews         0.0s - 41.8s  |########################################|  120 articles
+            philstar        0.0s - 12.3s  |############                            |   64 articles
+        """
+        spans = self.provider_spans()
+        total = max((span.end for span in spans), default=0.0)
+        lines = [f"Scrape timeline: {len(spans)} providers in {total:.1f}s"]
+        for span in spans:
+            begin = int(span.start / total * width) if total else 0
+            end = max(int(span.end / total * width) if total else 0, begin + 1)
+            bar = " " * begin + "#" * (end - begin) + " " * (width - end)
+            errors = f", {span.errors} failed categories" if span.errors else ""
+            lines.append(
+                f"  {span.provider:<15} {span.start:5.1f}s - {span.end:5.1f}s"
+                f"  |{bar}|  {span.articles:4d} articles{errors}"
+            )
+        return "\n".join(lines)
@@ -13,12 +13,22 @@ def merge_databases(main_db_path, second_db_path):
     # Copy articles from the second database to the main one
     conn.execute(
         """
-        INSERT INTO articles (date, category, source, title, author, url, body, image_url, read_time)
-        SELECT date, category, source, title, author, url, body, image_url, read_time
+        INSERT INTO articles (date, category, source, title, author, url, snippet, image_url, read_time, shuffle_key, url_hash, published_at)
+        SELECT date, category, source, title, author, url, snippet, image_url, read_time, shuffle_key, url_hash, published_at
         FROM second_db.articles
         WHERE url NOT IN (SELECT url FROM articles)
     """
     )
+    # Copy their bodies, matched to the new article ids by URL
+    conn.execute(
+        """
+        INSERT OR IGNORE INTO article_bodies (article_id, body, body_z)
+        SELECT articles.article_id, second_bodies.body, second_bodies.body_z
+        FROM second_db.articles AS second_articles
+        JOIN second_db.article_bodies AS second_bodies USING (article_id)
+        JOIN articles ON articles.url = second_articles.url
+    """
+    )
     print("Merged articles from second database to main database")
 
     # Commit changes
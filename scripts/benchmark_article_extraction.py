@@ -0,0 +1,64 @@
+# Extracts recorded article pages with each provider's strategy, printing the
+# extracted author, title and date for checking, and compares the throughput
+# of the single lxml parse with the old extra BeautifulSoup (html.parser)
+# parse per page.
+#
+# Pages are read from <pages>/<provider>/*.html, e.g. pages/inquirer/1.html,
+# where <provider> is a Provider value.
+#
+# Usage: python scripts/benchmark_article_extraction.py pages [--rounds 3]
+import argparse
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bs4 import BeautifulSoup
+import app.utils.scrapers.news as news
+
+
+def load_pages(root: Path) -> list[tuple[news.ScraperStrategy, str, bytes]]:
+    pages = []
+    for path in sorted(root.glob("*/*.html")):
+        strategy = news.get_scraper_strategy(news.Provider(path.parent.name))
+        url = f"https://example.com/{path.parent.name}/{path.stem}"
+        pages.append((strategy, url, path.read_bytes()))
+    return pages
+
+
+def throughput(pages, rounds: int, extra_parse: bool) -> float:
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for strategy, url, html in pages:
+            if extra_parse:
+                BeautifulSoup(html, "html.parser")
+            strategy.extract(url, html)
+    return rounds * len(pages) / (time.perf_counter() - start)
+
+
+def main(root: Path, rounds: int):
+    pages = load_pages(root)
+    if not pages:
+        sys.exit(f"No pages found in {root}/<provider>/*.html")
+
+    for strategy, url, html in pages:
+        extracted = strategy.extract(url, html)
+        print(
+            f"{url.split('/')[-2]:<15} {extracted.author!r:<25}"
+            f" {extracted.publish_date or '-':<26} {extracted.title[:40]!r}"
+        )
+
+    two_parses = throughput(pages, rounds, extra_parse=True)
+    one_parse = throughput(pages, rounds, extra_parse=False)
+    print(f"\n{len(pages)} pages x {rounds} rounds")
+    print(f"  html.parser + lxml: {two_parses:7.1f} pages/s")
+    print(f"  lxml only:          {one_parse:7.1f} pages/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("pages", type=Path)
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    main(args.pages, args.rounds)
@@ -0,0 +1,145 @@
+# Measures event-loop lag while articles are scraped from a local stand-in news
+# server, with the HTML parsed on the event loop (the old scrape_article path)
+# and in the extraction process pool.
+#
+# Usage: python scripts/benchmark_scraper_loop_lag.py [--articles 100] [--workers 3]
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault("SCRAPER_HOST_DELAY", "0")
+
+import app.utils.scrapers.news as news
+from app.models.article import Article
+from app.utils.scrapers.extraction import (
+    create_extraction_pool,
+    close_extraction_pool,
+)
+
+PARAGRAPH = (
+    "<p>Lorem ipsum dolor sit amet, consectetur adipiscing elit, sed do eiusmod"
+    " tempor incididunt ut labore et dolore magna aliqua. <a href='/x'>Ut enim</a>"
+    " ad minim veniam, quis nostrud exercitation ullamco laboris.</p>"
+)
+PAGE = (
+    "<html><head><title>Article title</title>"
+    "<meta name='author' content='Juan Cruz'>"
+    "<meta property='article:published_time' content='2024-03-01T10:00:00+08:00'>"
+    "</head><body><nav>" + "<a href='/n'>Section</a>" * 100 + "</nav><article>"
+    + PARAGRAPH * 300
+    + "</article></body></html>"
+).encode("utf-8")
+
+
+def start_server() -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            time.sleep(0.02)
+            self.send_response(200)
+            self.send_header("Content-Type", "text/html; charset=utf-8")
+            self.send_header("Content-Length", str(len(PAGE)))
+            self.end_headers()
+            self.wfile.write(PAGE)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+async def monitor_lag(lags: list[float], stop: asyncio.Event, interval=0.005):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(interval)
+        lags.append(time.perf_counter() - start - interval)
+
+
+async def scrape_inline(strategy, articles: list[Article]) -> int:
+    # Parses every page on the event loop, as scrape_article used to
+    scraped = 0
+    for i in range(0, len(articles), 25):
+        chunk = articles[i : i + 25]
+        responses = await asyncio.gather(
+            *(strategy.fetch_article(article) for article in chunk)
+        )
+        for article, response in zip(chunk, responses):
+            if response is not None:
+                url = str(response.url)
+                strategy.apply_extracted(
+                    article, url, strategy.extract(url, response.content)
+                )
+                scraped += 1
+    return scraped
+
+
+async def scrape_pooled(strategy, articles: list[Article]) -> int:
+    return len(await strategy.scrape_articles(articles))
+
+
+async def measure(scrape, strategy, base: str, count: int):
+    articles = [
+        Article(date="", category="news", source="gmanews", title="", url=f"{base}/{i}")
+        for i in range(count)
+    ]
+    lags, stop = [], asyncio.Event()
+    monitor = asyncio.create_task(monitor_lag(lags, stop))
+    start = time.perf_counter()
+    scraped = await scrape(strategy, articles)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await monitor
+    lags_ms = sorted(lag * 1000 for lag in lags)
+    return (
+        scraped,
+        elapsed,
+        statistics.median(lags_ms),
+        lags_ms[int(len(lags_ms) * 0.99)],
+        lags_ms[-1],
+    )
+
+
+async def main(count: int):
+    server = start_server()
+    base = f"http://127.0.0.1:{server.server_address[1]}/news"
+    strategy = news.get_scraper_strategy(news.Provider.GMANews)
+    try:
+        rows = [
+            ("inline", *await measure(scrape_inline, strategy, base, count)),
+            ("pool", *await measure(scrape_pooled, strategy, base, count)),
+        ]
+    finally:
+        await news.close_scraper_clients()
+        server.shutdown()
+
+    print(f"{'path':>7} {'articles':>8} {'seconds':>8}  lag p50      p99      max")
+    for path, scraped, elapsed, p50, p99, worst in rows:
+        print(
+            f"{path:>7} {scraped:>8} {elapsed:>8.2f}"
+            f" {p50:>6.1f}ms {p99:>6.1f}ms {worst:>6.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--articles", type=int, default=100)
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+    if args.workers is not None:
+        os.environ["SCRAPER_EXTRACT_WORKERS"] = str(args.workers)
+    create_extraction_pool()
+    try:
+        asyncio.run(main(args.articles))
+    finally:
+        close_extraction_pool()
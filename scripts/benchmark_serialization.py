@@ -0,0 +1,68 @@
+# Compares the serialization time of an /articles response built from
+# Pydantic `Article` models (jsonable_encoder + json) with the row path
+# (plain dicts + orjson).
+#
+# Usage: python scripts/benchmark_serialization.py
+import json
+import random
+import string
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from app.models.article import ARTICLE_FIELDS, Article
+
+SIZES = [35, 500, 5000]
+
+
+def make_row(i: int) -> tuple:
+    words = lambda n: " ".join(
+        "".join(random.choices(string.ascii_lowercase, k=6)) for _ in range(n)
+    )
+    return (
+        i,
+        f"2024-03-{i % 28 + 1:02d} 12:00:00",
+        "news",
+        "inquirer",
+        words(10),
+        words(2),
+        f"https://example.com/{i}",
+        words(400),
+        f"https://example.com/{i}.jpg",
+        "3 min read",
+    )
+
+
+def pydantic_path(rows: list[tuple]) -> bytes:
+    articles = [Article(**dict(zip(ARTICLE_FIELDS, row))) for row in rows]
+    content = jsonable_encoder(
+        {"status": "success", "totalResults": len(articles), "articles": articles}
+    )
+    return json.dumps(content, ensure_ascii=False).encode("utf-8")
+
+
+def row_path(rows: list[tuple]) -> bytes:
+    articles = [dict(zip(ARTICLE_FIELDS, row)) for row in rows]
+    return orjson.dumps(
+        {"status": "success", "totalResults": len(articles), "articles": articles}
+    )
+
+
+def main():
+    random.seed(0)
+    print(f"{'articles':>8} {'pydantic (ms)':>14} {'rows (ms)':>10} {'speedup':>8}")
+    for size in SIZES:
+        rows = [make_row(i) for i in range(size)]
+        number = max(1, 2000 // size)
+        slow = min(timeit.repeat(lambda: pydantic_path(rows), number=number, repeat=5))
+        fast = min(timeit.repeat(lambda: row_path(rows), number=number, repeat=5))
+        slow, fast = slow / number * 1000, fast / number * 1000
+        print(f"{size:>8} {slow:>14.2f} {fast:>10.2f} {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# Converts the article bodies of an existing SQLite database to (or from) the
+# compressed article_bodies.body_z column, then reports the database size and read latency
+# before and after.
+#
+# Usage:
+#   python scripts/compress_bodies.py newsmead.sqlite --codec zstd
+#   python scripts/compress_bodies.py newsmead.sqlite --decompress
+import argparse
+import asyncio
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from app.database.asyncdb import AsyncDatabase
+from app.database.compression import CODECS, compress_body
+from app.database.query import SQLITE_BODY
+from app.models.article import Filter
+
+BATCH_SIZE = 500
+SAMPLE_SIZE = 200
+
+
+async def report(db: AsyncDatabase, label: str):
+    size = os.path.getsize(db.db_name) / 1024 / 1024
+    ids = [row[0] for row in await db.fetch("SELECT article_id FROM articles;")]
+    sample = random.sample(ids, min(SAMPLE_SIZE, len(ids)))
+
+    start = time.perf_counter()
+    for article_id in sample:
+        await db.get_article_by_id(article_id)
+    detail_ms = (time.perf_counter() - start) * 1000 / max(1, len(sample))
+
+    start = time.perf_counter()
+    for _ in range(20):
+        await db.get_article_rows_page(Filter(), 1, 30, fields=["title", "snippet"])
+    list_ms = (time.perf_counter() - start) * 1000 / 20
+
+    print(
+        f"{label:>7}: {size:8.1f} MB, detail {detail_ms:6.2f} ms/article,"
+        f" list {list_ms:6.2f} ms/page"
+    )
+
+
+async def convert(db: AsyncDatabase, codec: str):
+    if codec is None:
+        condition = "body_z IS NOT NULL"
+    else:
+        condition = "body_z IS NULL AND body != ''"
+
+    converted = 0
+    last_id = 0
+    while True:
+        rows = await db.fetch(
+            f"SELECT article_id, {SQLITE_BODY} FROM article_bodies"
+            f" WHERE article_id > ? AND {condition} ORDER BY article_id LIMIT ?;",
+            (last_id, BATCH_SIZE),
+        )
+        if not rows:
+            break
+        params = [
+            (None, compress_body(body, codec), article_id)
+            if codec
+            else (body, None, article_id)
+            for article_id, body in rows
+        ]
+        await db.run_query(
+            "UPDATE article_bodies SET body = ?, body_z = ? WHERE article_id = ?;",
+            params,
+            is_many=True,
+        )
+        converted += len(rows)
+        last_id = rows[-1][0]
+        print(f"Converted {converted} articles", end="\r")
+
+    print(f"Converted {converted} articles")
+    # Give the freed pages back to the file system
+    await db.run_query("VACUUM;")
+
+
+async def main(db_name: str, codec: str):
+    async with AsyncDatabase(db_name) as db:
+        await db.migrate()
+        await report(db, "before")
+        await convert(db, codec)
+        await report(db, "after")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compress article bodies")
+    parser.add_argument("db_name", help="path of the SQLite database")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("--codec", choices=list(CODECS))
+    group.add_argument("--decompress", action="store_true")
+    args = parser.parse_args()
+    asyncio.run(main(args.db_name, None if args.decompress else args.codec))
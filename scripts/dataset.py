@@ -1,85 +1,263 @@
-from azure.ai.translation.text import TextTranslationClient, TranslatorCredential
-from azure.ai.translation.text.models import InputTextItem
-from azure.core.exceptions import HttpResponseError
-import tensorflow as tf
+# Translates the titles and abstracts of a MIND news.tsv file.
+#
+# Many lines are packed into each translation request, requests run
+# concurrently under a token-bucket rate limit (characters per second) and
+# are retried with backoff. Output lines are written in input order, and a
+# checkpoint records the next input line and the output size after every
+# write, so an interrupted run resumes exactly where it stopped.
+#
+# Usage:
+#   python scripts/dataset.py news.tsv "news_translated (valid).tsv"
+#   python scripts/dataset.py news.tsv out.tsv --concurrency 16 --rate 20000
+#
+# Point AZURE_TRANSLATOR_ENDPOINT or GOOGLE_TRANSLATE_ENDPOINT at a local stub
+# server to measure throughput without using quota.
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
 import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Optional
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
 
-def translate_text(text: str, source: str = "en", target: str = "fil") -> str:
-    api_key = "api_key"
-    region = "southeastasia"  # os.getenv("AZURE_TRANSLATOR_REGION")
+import dotenv
+import httpx
+from app.utils.nlp.translator import TranslationService, Translator
 
-    text_translator = TextTranslationClient(
-        credential=TranslatorCredential(api_key, region)
-    )
+RETRY_STATUS = {408, 429, 500, 502, 503, 504}
 
-    try:
-        input_text_elements = [InputTextItem(text=text)]
 
-        response = text_translator.translate(
-            content=input_text_elements, to=[target], from_parameter=source
-        )
-        translation = response[0] if response else None
-
-        if translation:
-            for translated_text in translation.translations:
-                return translated_text.text
-        else:
-            raise ValueError(
-                "Translation failed, no result returned from Azure Translator."
-            )
+class TokenBucket:
+    """
+    Allows `rate` tokens per second on average, with bursts up to `capacity`.
+    """
 
-    except HttpResponseError as exception:
-        print(f"Error Code: {exception.error.code}")
-        print(f"Message: {exception.error.message}")
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+        self.lock = asyncio.Lock()
 
+    async def acquire(self, tokens: float):
+        tokens = min(tokens, self.capacity)
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated_at) * self.rate
+                )
+                self.updated_at = now
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((tokens - self.tokens) / self.rate)
+
+
+class Checkpoint:
+    """
+    The next input line to translate and the output size once every line
+    before it is written. Saved atomically next to the output file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.line = 0
+        self.offset = 0
+        if os.path.exists(path):
+            with open(path) as f:
+                data = json.load(f)
+            self.line, self.offset = data["line"], data["offset"]
+
+    def save(self, line: int, offset: int):
+        self.line, self.offset = line, offset
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"line": line, "offset": offset}, f)
+        os.replace(tmp_path, self.path)
+
+
+def make_batches(
+    lines: list[str], start: int, max_items: int, max_chars: int
+) -> list[tuple[int, list[list[str]]]]:
+    """
+    Groups the split lines from `start` into `(first line, rows)` batches whose
+    titles and abstracts fit in one request.
+    """
+    batches = []
+    rows = []
+    first = start
+    size = 0
+    for number in range(start, len(lines)):
+        row = lines[number].rstrip("\n").split("\t")
+        texts = row[3:5]
+        length = sum(len(text) for text in texts)
+        if rows and (2 * (len(rows) + 1) > max_items or size + length > max_chars):
+            batches.append((first, rows))
+            rows, first, size = [], number, 0
+        rows.append(row)
+        size += length
+    if rows:
+        batches.append((first, rows))
+    return batches
+
+
+def retry_delay(retry_after: Optional[str], default: float) -> float:
+    """
+    Returns the seconds to wait from a Retry-After header, either a number of
+    seconds or an HTTP-date, or `default` if it is missing or invalid.
+    """
+    if not retry_after:
+        return default
+    try:
+        seconds = float(retry_after)
+        return max(0.0, seconds) if math.isfinite(seconds) else default
+    except ValueError:
+        pass
+    try:
+        date = parsedate_to_datetime(retry_after)
+    except (TypeError, ValueError):
+        return default
+    if date.tzinfo is None:
+        date = date.replace(tzinfo=timezone.utc)
+    return max(0.0, (date - datetime.now(timezone.utc)).total_seconds())
 
-if __name__ == "__main__":
-    i = 0
-    line_start = 0
-    news_translated = "news_translated (valid).tsv"
-
-    # Check if the news_translated (valid).tsv file exists
-    if tf.io.gfile.exists(news_translated):
-        # Count the lines in the news_translated (valid).tsv file
-        with tf.io.gfile.GFile(news_translated, "r") as wr:
-            line_start = sum(1 for _ in wr) + 1
-
-    with tf.io.gfile.GFile("news.tsv", "r") as rd, tf.io.gfile.GFile(
-        news_translated, "a"
-    ) as wr:
-        for line in rd:
-            i += 1
-            if i < line_start:
-                continue
-
-            print(f"Processing line {i}...")
-            nid, vert, subvert, title, ab, url, entities_title, entities_ab = (
-                line.strip().split("\t")
-            )
 
-            # Translate the title and abstract
-            translated_title = translate_text(title)
+async def translate_batch(
+    translator: Translator,
+    bucket: TokenBucket,
+    rows: list[list[str]],
+    source: str,
+    target: str,
+    retries: int,
+) -> list[str]:
+    # Only non-empty titles/abstracts are sent, in row order
+    texts = [text for row in rows for text in row[3:5] if text]
+    await bucket.acquire(sum(len(text) for text in texts))
 
-            if translated_title is None:
-                print("Translating title failed. Sleeping for 60 seconds...")
-                time.sleep(60)
-                translated_title = translate_text(title)
+    for attempt in range(retries + 1):
+        try:
+            translated = iter(await translator.translate(texts, source, target))
+            break
+        except (httpx.HTTPStatusError, httpx.TransportError) as e:
+            response = getattr(e, "response", None)
+            status = response.status_code if response is not None else None
+            if attempt == retries or (status is not None and status not in RETRY_STATUS):
+                raise
+            retry_after = response.headers.get("Retry-After") if response is not None else None
+            delay = retry_delay(retry_after, 2**attempt + random.random())
+            print(f"Request failed ({status or e}), retrying in {delay:.1f}s...")
+            await asyncio.sleep(delay)
 
-            translated_ab = translate_text(ab)
+    lines = []
+    for row in rows:
+        title, abstract = [next(translated) if text else text for text in row[3:5]]
+        lines.append("\t".join(row[:3] + [title, abstract] + row[5:]) + "\n")
+    return lines
 
-            if translated_ab is None:
-                print("Translating abstract failed. Sleeping for 60 seconds...")
-                time.sleep(60)
-                translated_ab = translate_text(ab)
 
-            if translated_title is None or translated_ab is None:
-                raise RuntimeError("Translation failed.")
+async def translate_file(
+    input_path: str,
+    output_path: str,
+    service: str,
+    source: str,
+    target: str,
+    concurrency: int,
+    rate: float,
+    retries: int,
+    checkpoint_path: Optional[str] = None,
+):
+    with open(input_path, encoding="utf-8") as f:
+        lines = f.readlines()
+
+    checkpoint = Checkpoint(checkpoint_path or f"{output_path}.checkpoint")
+    translation_service = TranslationService(concurrency=concurrency)
+    translator = translation_service.get_translator(service)
+    bucket = TokenBucket(rate, capacity=max(rate, translator.max_chars))
+    batches = make_batches(
+        lines, checkpoint.line, translator.max_items, translator.max_chars
+    )
+    print(f"Translating lines {checkpoint.line + 1}-{len(lines)} in {len(batches)} requests...")
 
-            # Print the translated text
-            print(f"\t Translated text: {translated_title} -> {translated_ab}")
+    # Drop whatever was written after the last checkpoint
+    with open(output_path, "a", encoding="utf-8") as wr:
+        wr.truncate(checkpoint.offset)
 
-            # Write to the new file
-            wr.write(
-                f"{nid}\t{vert}\t{subvert}\t{translated_title}\t{translated_ab}\t{url}\t{entities_title}\t{entities_ab}\n"
+    start_time = time.perf_counter()
+    translated_chars = 0
+    queue = asyncio.Queue()
+    for index, batch in enumerate(batches):
+        queue.put_nowait((index, batch))
+    done: dict[int, list[str]] = {}
+    written = asyncio.Event()
+
+    async def worker():
+        nonlocal translated_chars
+        while not queue.empty():
+            index, (first, rows) = queue.get_nowait()
+            done[index] = await translate_batch(
+                translator, bucket, rows, source, target, retries
             )
+            translated_chars += sum(len(text) for row in rows for text in row[3:5])
+            written.set()
+
+    async def writer():
+        with open(output_path, "a", encoding="utf-8") as wr:
+            for index, (first, rows) in enumerate(batches):
+                while index not in done:
+                    written.clear()
+                    await written.wait()
+                wr.writelines(done.pop(index))
+                wr.flush()
+                checkpoint.save(first + len(rows), wr.tell())
+                elapsed = time.perf_counter() - start_time
+                print(
+                    f"Line {checkpoint.line}/{len(lines)}"
+                    f" ({(checkpoint.line - batches[0][0]) / elapsed:.1f} lines/s,"
+                    f" {translated_chars / elapsed:.0f} chars/s)"
+                )
+
+    try:
+        workers = [asyncio.create_task(worker()) for _ in range(concurrency)]
+        await asyncio.gather(writer(), *workers)
+    finally:
+        await translation_service.close()
+
+
+if __name__ == "__main__":
+    dotenv.load_dotenv()
+    parser = argparse.ArgumentParser(description="Translate a MIND news.tsv file")
+    parser.add_argument("input", nargs="?", default="news.tsv")
+    parser.add_argument("output", nargs="?", default="news_translated (valid).tsv")
+    parser.add_argument("--service", default="bing", choices=["bing", "google"])
+    parser.add_argument("--source", default="en")
+    parser.add_argument("--target", default="fil")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--rate", type=float, default=5000, help="characters per second"
+    )
+    parser.add_argument("--retries", type=int, default=6)
+    parser.add_argument("--checkpoint", default=None)
+    args = parser.parse_args()
+    if not args.input or not os.path.exists(args.input):
+        sys.exit(f"Input file not found: {args.input}")
+    asyncio.run(
+        translate_file(
+            args.input,
+            args.output,
+            args.service,
+            args.source,
+            args.target,
+            args.concurrency,
+            args.rate,
+            args.retries,
+            args.checkpoint,
+        )
+    )
@@ -0,0 +1,41 @@
+import os
+import asyncpg
+import pytest
+from app.database.asyncdb import AsyncDatabase
+from app.database.asyncpgdb import AsyncPGDatabase
+
+# Postgres runs only against a disposable database, e.g.
+# TEST_DATABASE_URL=postgresql://postgres@localhost/newsmead_test
+BACKENDS = [
+    "sqlite",
+    pytest.param(
+        "postgres",
+        marks=pytest.mark.skipif(
+            not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL is not set"
+        ),
+    ),
+]
+
+
+@pytest.fixture
+def anyio_backend():
+    return "asyncio"
+
+
+@pytest.fixture(params=BACKENDS)
+async def db(request, tmp_path):
+    """
+    A migrated, empty database of each backend, on a single connection.
+    """
+    if request.param == "sqlite":
+        database = AsyncDatabase(str(tmp_path / "test.sqlite"))
+    else:
+        url = os.environ["TEST_DATABASE_URL"]
+        conn = await asyncpg.connect(url)
+        await conn.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public;")
+        await conn.close()
+        database = AsyncPGDatabase(url)
+
+    async with database:
+        await database.migrate()
+        yield database
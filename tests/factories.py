@@ -0,0 +1,26 @@
+from app.models.article import Article
+
+WORDS = (
+    "the government said the economy grew as the president met people"
+    " from the city and the senate passed a new bill on rice prices"
+).split()
+
+
+def make_articles(count: int, start: int = 0) -> list[Article]:
+    """
+    Returns `count` English articles, one hour apart, newest last.
+    """
+    return [
+        Article(
+            date=f"2024-03-{i // 24 % 28 + 1:02d} {i % 24:02d}:00:00",
+            category=["news", "sports"][i % 2],
+            source=["gmanews", "philstar", "inquirer"][i % 3],
+            title=f"Title {i}",
+            author=f"Author {i}",
+            url=f"https://example.com/articles/{i}",
+            body=" ".join(WORDS[(i + j) % len(WORDS)] for j in range(300)),
+            image_url=f"https://example.com/images/{i}.jpg",
+            read_time="2 min read",
+        )
+        for i in range(start, start + count)
+    ]
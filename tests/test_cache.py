@@ -0,0 +1,37 @@
+import pytest
+from app.backend.cache import LocalCacheBackend, ResponseCache
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_hit_under_same_generation():
+    cache = ResponseCache(LocalCacheBackend())
+    key = await cache.key("articles", {"page": 1})
+    assert await cache.get(key) is None
+    await cache.set(key, b"body")
+    assert await cache.get(await cache.key("articles", {"page": 1})) == b"body"
+
+
+async def test_body_read_before_invalidation_is_not_served_after_it():
+    cache = ResponseCache(LocalCacheBackend())
+    key = await cache.key("articles", {"page": 1})
+    assert await cache.get(key) is None
+
+    # A write lands between the read and the store of its body
+    await cache.invalidate()
+    await cache.set(key, b"stale")
+
+    assert await cache.get(await cache.key("articles", {"page": 1})) is None
+
+
+async def test_unreadable_generation_is_a_miss():
+    class BrokenBackend(LocalCacheBackend):
+        async def get_generation(self):
+            raise ConnectionError("down")
+
+    cache = ResponseCache(BrokenBackend())
+    key = await cache.key("articles", {})
+    assert key is None
+    await cache.set(key, b"body")
+    assert await cache.get(key) is None
+    assert cache.metrics()["misses"] == 1
@@ -0,0 +1,230 @@
+"""
+Behavior both database backends must share, run against each of them (see
+the `db` fixture).
+"""
+
+import pytest
+from app.models.article import Filter
+from factories import make_articles
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_insert_articles_skips_stored_urls(db):
+    assert await db.insert_articles(make_articles(5)) == 5
+    assert await db.insert_articles(make_articles(8)) == 3
+    assert await db.get_article_count() == 8
+    assert await db.url_exists("https://example.com/articles/7")
+    assert not await db.url_exists("https://example.com/articles/8")
+
+
+async def test_get_article_by_id_returns_full_body(db):
+    [article] = make_articles(1)
+    await db.insert_articles([article])
+    [row] = await db.get_articles(Filter(), page_size=1)
+
+    stored = await db.get_article_by_id(row.article_id)
+    assert stored.title == article.title
+    assert stored.body == article.body
+    assert await db.get_article_by_id(row.article_id + 1) is None
+
+
+async def test_recent_cursor_pages_cover_every_article_newest_first(db):
+    await db.insert_articles(make_articles(25))
+
+    titles, cursor = [], None
+    while True:
+        articles, cursor = await db.get_articles_page(
+            Filter(), page_size=10, cursor=cursor
+        )
+        titles.extend(article.title for article in articles)
+        if cursor is None:
+            break
+    assert titles == [f"Title {i}" for i in reversed(range(25))]
+
+    page_two = await db.get_articles(Filter(), page=2, page_size=10)
+    assert [a.title for a in page_two] == titles[10:20]
+
+
+async def test_filters(db):
+    await db.insert_articles(make_articles(12))
+
+    articles = await db.get_articles(Filter(source="gmanews"), page_size=20)
+    assert {a.source for a in articles} == {"gmanews"}
+    assert len(articles) == 4
+
+    articles = await db.get_articles(
+        Filter(source="gmanews,philstar", category="sports"), page_size=20
+    )
+    assert [a.title for a in articles] == ["Title 9", "Title 7", "Title 3", "Title 1"]
+
+    articles = await db.get_articles(
+        Filter(startDate="2024-03-01 03:00:00", endDate="2024-03-01 05:00:00"),
+        page_size=20,
+    )
+    assert [a.title for a in articles] == ["Title 5", "Title 4", "Title 3"]
+
+
+async def test_list_filters_are_normalized(db):
+    await db.insert_articles(make_articles(12))
+
+    # Equivalent lists share a cache key, so they must query the same rows
+    spaced = Filter(source=" philstar, gmanews,,gmanews", category="sports ")
+    assert spaced == Filter(source="gmanews,philstar", category="sports")
+    articles = await db.get_articles(spaced, page_size=20)
+    assert [a.title for a in articles] == ["Title 9", "Title 7", "Title 3", "Title 1"]
+    assert Filter(source=" , ").source is None
+
+
+async def test_text_search_matches_full_bodies(db):
+    articles = make_articles(3)
+    # Past the snippet, so only the full body has it
+    articles[0].body += " typhoon warnings were raised"
+    await db.insert_articles(articles)
+
+    found = await db.get_articles(Filter(text="typhoon"), page_size=10)
+    assert [a.title for a in found] == ["Title 0"]
+
+    # Updated bodies are searched too
+    [article] = await db.get_articles(Filter(source="philstar"), page_size=1)
+    article.body = "The volcano erupted again on Sunday. " * 20
+    await db.update_empty_articles([article])
+    found = await db.get_articles(Filter(text="volcano"), page_size=10)
+    assert [a.title for a in found] == ["Title 1"]
+
+
+async def test_fields_select_only_the_requested_columns(db):
+    [article] = make_articles(1)
+    await db.insert_articles([article])
+
+    [row], _ = await db.get_article_rows_page(Filter(), page_size=1, fields=["title"])
+    assert row["title"] == "Title 0"
+    assert "url" not in row
+    # Without `body` only the stored snippet is read
+    assert article.body.startswith(row["body"])
+    assert len(row["body"]) < len(article.body)
+
+    [row], _ = await db.get_article_rows_page(Filter(), page_size=1, fields=["body"])
+    assert row["body"] == article.body
+
+
+async def test_seeded_random_pages_are_stable_and_complete(db):
+    await db.insert_articles(make_articles(25))
+
+    async def sample():
+        titles, cursor = [], None
+        while True:
+            articles, cursor = await db.get_articles_page(
+                Filter(sortBy="random", seed=7), page_size=10, cursor=cursor
+            )
+            titles.extend(article.title for article in articles)
+            if cursor is None:
+                return titles
+
+    titles = await sample()
+    assert sorted(titles) == sorted(f"Title {i}" for i in range(25))
+    assert await sample() == titles
+
+    page_two = await db.get_articles(
+        Filter(sortBy="random", seed=7), page=2, page_size=10
+    )
+    assert [a.title for a in page_two] == titles[10:20]
+
+
+async def test_reshuffle_draws_new_shuffle_keys(db):
+    await db.insert_articles(make_articles(25))
+    query = "SELECT article_id, shuffle_key FROM articles ORDER BY article_id;"
+    before = await db.fetch(query)
+
+    await db.reshuffle_articles()
+    after = await db.fetch(query)
+    assert [row[0] for row in after] == [row[0] for row in before]
+    assert all(0 <= row[1] < 1 for row in after)
+    assert sum(a[1] != b[1] for a, b in zip(after, before)) == 25
+
+    articles = await db.get_articles(Filter(sortBy="random", seed=7), page_size=30)
+    assert len(articles) == 25
+
+
+async def test_empty_articles_are_found_and_updated(db):
+    articles = make_articles(3)
+    articles[1].author = ""
+    articles[2].image_url = ""
+    await db.insert_articles(articles)
+
+    empty = await db.get_empty_articles("philstar")
+    assert [a.title for a in empty] == ["Title 1"]
+    assert await db.get_empty_articles("gmanews") == []
+
+    empty[0].author = "Author 1"
+    empty[0].body = "fixed " * 100
+    await db.update_empty_articles(empty)
+    assert await db.get_empty_articles("philstar") == []
+    stored = await db.get_article_by_id(empty[0].article_id)
+    assert stored.author == "Author 1"
+    assert stored.body == empty[0].body
+    assert [a.title for a in await db.get_empty_articles("inquirer")] == ["Title 2"]
+
+
+async def test_translations_are_keyed_by_content_hash(db):
+    await db.insert_articles(make_articles(1))
+    [article] = await db.get_articles(Filter(), page_size=1)
+
+    translation = {"title": "Pamagat", "body": "Katawan"}
+    await db.save_translation(article.article_id, "fil", "bing", "h1", translation)
+    assert await db.get_translation(article.article_id, "fil", "bing", "h1") == (
+        translation
+    )
+    assert await db.get_translation(article.article_id, "fil", "bing", "h2") is None
+    assert await db.get_translation(article.article_id, "fil", "google", "h1") is None
+
+
+async def test_behaviors_rank_trending_articles(db):
+    await db.insert_articles(make_articles(3))
+    ids = {a.title: a.article_id for a in await db.get_articles(Filter())}
+    first, second = ids["Title 0"], ids["Title 1"]
+
+    await db.insert_behavior(
+        "user", "2024-03-02 00:00:00", "", f"{first}-0 {second}-1", {}
+    )
+    await db.insert_behavior("user", "2024-03-02 00:01:00", "", f"{second}-1", {})
+
+    trending = await db.get_trending_rows(Filter(), limit=10)
+    assert [a["title"] for a in trending][:2] == ["Title 1", "Title 0"]
+    trending = await db.get_trending_rows(Filter(source="gmanews"), limit=10)
+    assert [a["title"] for a in trending] == ["Title 0"]
+
+    scores = await db.get_popularity_scores([first, second, ids["Title 2"]])
+    # Articles only shown, never read, score nothing
+    assert scores.get(first, 0) == 0
+    assert scores[second] > 0
+    assert ids["Title 2"] not in scores
+
+
+async def test_mirrored_history_keeps_the_latest_entries(db):
+    entries = [("1", 100.0), ("2", 200.0), ("3", 300.0)]
+    await db.mirror_history("user", entries, keep=2)
+    assert await db.get_mirrored_history("user", 10) == [("3", 300.0), ("2", 200.0)]
+
+    await db.mirror_history("user", [("2", 400.0)], keep=2)
+    assert await db.get_mirrored_history("user", 1) == [("2", 400.0)]
+    assert await db.get_mirrored_history("other", 10) == []
+
+
+async def test_url_index_filters_stored_urls(db):
+    await db.insert_articles(make_articles(3))
+
+    url_index = await db.load_url_index()
+    assert len(url_index) == 3
+    new = await db.filter_new_urls(make_articles(5), url_index)
+    assert [a.title for a in new] == ["Title 3", "Title 4"]
+    # New URLs are added to the index of the run
+    assert await db.filter_new_urls(make_articles(5), url_index) == []
+
+
+async def test_iter_articles_reads_every_article(db):
+    await db.insert_articles(make_articles(7))
+
+    chunks = [chunk async for chunk in db.iter_articles(chunk_size=3)]
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert await db.get_article_count() == 7
@@ -0,0 +1,124 @@
+import asyncio
+import os
+import pytest
+from app.database.asyncpgdb import AsyncPGDatabase
+from app.database.pool import SQLitePool
+import app.database.pool as pool_module
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+async def pool(tmp_path):
+    pool = SQLitePool(str(tmp_path / "pool.sqlite"), size=2)
+    await pool.open()
+    async with pool.writer() as conn:
+        await conn.execute("CREATE TABLE t (x INTEGER);")
+        await conn.execute("INSERT INTO t VALUES (1);")
+        await conn.commit()
+    yield pool
+    await pool.close()
+
+
+async def read(pool: SQLitePool) -> int:
+    async with pool.reader() as conn:
+        async with conn.execute("SELECT x FROM t;") as cursor:
+            return (await cursor.fetchone())[0]
+
+
+async def test_reader_during_suspension_waits_for_reopen(pool):
+    reopen = asyncio.Event()
+
+    async def suspend():
+        async with pool.suspended():
+            await reopen.wait()
+
+    suspension = asyncio.create_task(suspend())
+    await asyncio.sleep(0.05)
+    reader = asyncio.create_task(read(pool))
+    await asyncio.sleep(0.05)
+    assert not reader.done()
+
+    reopen.set()
+    await suspension
+    assert await asyncio.wait_for(reader, 5) == 1
+
+
+async def test_readers_queued_before_suspension_are_served(pool):
+    # Hold every connection, so the next readers queue for one
+    held = [pool.reader() for _ in range(pool.size)]
+    for context in held:
+        await context.__aenter__()
+    queued = [asyncio.create_task(read(pool)) for _ in range(3)]
+    await asyncio.sleep(0.05)
+
+    async def suspend():
+        async with pool.suspended():
+            pass
+
+    suspension = asyncio.create_task(suspend())
+    await asyncio.sleep(0.05)
+    for context in held:
+        await context.__aexit__(None, None, None)
+
+    await asyncio.wait_for(suspension, 5)
+    assert await asyncio.wait_for(asyncio.gather(*queued), 5) == [1, 1, 1]
+    assert pool.metrics()["readers_in_use"] == 0
+
+
+async def test_explicit_zero_settings_are_kept(tmp_path, monkeypatch):
+    monkeypatch.setenv("DB_MMAP_SIZE", "1048576")
+    pool = SQLitePool(str(tmp_path / "pool.sqlite"), size=1, mmap_size=0)
+    await pool.open()
+    try:
+        async with pool.reader() as conn:
+            async with conn.execute("PRAGMA mmap_size;") as cursor:
+                assert (await cursor.fetchone())[0] == 0
+    finally:
+        await pool.close()
+
+
+async def test_pg_pool_keeps_explicit_zero_statement_cache(monkeypatch):
+    calls = []
+
+    class FakePool:
+        def get_min_size(self):
+            return calls[0]["min_size"]
+
+        def get_max_size(self):
+            return calls[0]["max_size"]
+
+    async def create_pool(url, **kwargs):
+        calls.append(kwargs)
+        return FakePool()
+
+    monkeypatch.setattr(pool_module.asyncpg, "create_pool", create_pool)
+    monkeypatch.setattr(pool_module, "_pg_pool", None)
+    monkeypatch.delenv("PG_POOL_MIN_SIZE", raising=False)
+    monkeypatch.delenv("PG_POOL_MAX_SIZE", raising=False)
+    monkeypatch.setenv("PG_STATEMENT_CACHE_SIZE", "100")
+    await pool_module.create_pg_pool("postgresql://test", statement_cache_size=0)
+    assert calls == [{"min_size": 2, "max_size": 10, "statement_cache_size": 0}]
+
+
+@pytest.mark.skipif(
+    not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL is not set"
+)
+@pytest.mark.parametrize("statement_cache_size", [0, 256])
+async def test_pg_pool_serves_databases(statement_cache_size):
+    pg_pool = await pool_module.create_pg_pool(
+        os.environ["TEST_DATABASE_URL"],
+        min_size=1,
+        max_size=2,
+        statement_cache_size=statement_cache_size,
+    )
+    try:
+        assert pool_module.get_pg_pool() is pg_pool
+        # Without a URL the database uses the application pool
+        async with AsyncPGDatabase() as db:
+            for value in (1, 2):
+                assert await db.fetch("SELECT $1::int;", [value]) == [(value,)]
+        assert pool_module.pg_pool_metrics(pg_pool)["idle"] == 1
+    finally:
+        await pool_module.close_pg_pool()
+    assert pool_module.get_pg_pool() is None
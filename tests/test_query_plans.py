@@ -0,0 +1,104 @@
+"""
+Checks that the article queries are planned on the indexes added for them
+(see migrations.py).
+"""
+
+import pytest
+from app.database.migrations import EMPTY_ARTICLE_PREDICATE
+from app.database.query import SQLITE
+from app.models.article import Filter
+from factories import make_articles
+
+pytestmark = pytest.mark.anyio
+
+
+async def query_plan(db, query: str, params=None) -> str:
+    if db.dialect == SQLITE:
+        rows = await db.fetch(f"EXPLAIN QUERY PLAN {query}", params)
+        return "\n".join(row[3] for row in rows)
+    # Postgres plans tables this small as sequential scans, whatever the indexes
+    await db.run_query("SET enable_seqscan = off;")
+    rows = await db.fetch(f"EXPLAIN {query}", params)
+    return "\n".join(row[0] for row in rows)
+
+
+@pytest.fixture
+async def articles_db(db):
+    await db.insert_articles(make_articles(60))
+    # Startup runs the migrations, which refresh the SQLite planner statistics
+    await db.migrate()
+    yield db
+
+
+@pytest.mark.parametrize(
+    "filter, after, index",
+    [
+        (Filter(), None, "idx_articles_published"),
+        (Filter(), (1709251200, 10), "idx_articles_published"),
+        (Filter(startDate="2024-03-02"), None, "idx_articles_published"),
+        (Filter(source="gmanews"), None, "idx_articles_source_published"),
+        (Filter(category="news"), None, "idx_articles_category_published"),
+    ],
+)
+async def test_recent_articles_use_published_indexes(articles_db, filter, after, index):
+    q = articles_db.query()
+    query = q.articles_query(filter, 30, after=after, fields=["title"])
+    assert index in await query_plan(articles_db, query, q.params)
+
+
+@pytest.mark.parametrize(
+    "filter, index",
+    [
+        (Filter(), "idx_articles_shuffle"),
+        (Filter(source="gmanews"), "idx_articles_source_shuffle"),
+        (Filter(category="news"), "idx_articles_category_shuffle"),
+    ],
+)
+async def test_random_articles_use_shuffle_indexes(articles_db, filter, index):
+    for wrapped in (False, True):
+        q = articles_db.query()
+        query = q.sample_query(filter, 30, 0.5, wrapped=wrapped, fields=["title"])
+        assert index in await query_plan(articles_db, query, q.params)
+
+
+async def test_empty_articles_use_partial_index(articles_db):
+    q = articles_db.query()
+    query = (
+        f"{q.select_articles()} WHERE {EMPTY_ARTICLE_PREDICATE}"
+        f" AND source = {q.param('gmanews')};"
+    )
+    assert "idx_articles_empty_source" in await query_plan(
+        articles_db, query, q.params
+    )
+
+
+async def test_url_index_reads_only_url_hashes(articles_db):
+    plan = await query_plan(articles_db, "SELECT url_hash FROM articles;")
+    assert "idx_articles_url_hash" in plan
+
+
+async def test_mirrored_history_uses_user_index(articles_db):
+    q = articles_db.query()
+    query = (
+        "SELECT article_id, clicked_at FROM user_history"
+        f" WHERE user_id = {q.param('user')}"
+        f" ORDER BY clicked_at DESC LIMIT {q.param(10)};"
+    )
+    plan = await query_plan(articles_db, query, q.params)
+    assert "idx_user_history_user_clicked" in plan
+
+
+async def test_translation_lookup_uses_primary_key(articles_db):
+    q = articles_db.query()
+    query = (
+        f"SELECT title, body FROM translations WHERE article_id={q.param(1)}"
+        f" AND target={q.param('fil')} AND service={q.param('bing')}"
+        f" AND content_hash={q.param('hash')};"
+    )
+    plan = await query_plan(articles_db, query, q.params)
+    key = (
+        "sqlite_autoindex_translations_1"
+        if articles_db.dialect == SQLITE
+        else "translations_pkey"
+    )
+    assert key in plan
@@ -0,0 +1,79 @@
+import asyncio
+import json
+import pytest
+from app.database.asyncpgdb import AsyncPGDatabase
+from app.database.user_store import UserProfile
+
+pytestmark = pytest.mark.anyio
+
+
+class ExclusiveConnection:
+    """
+    Fails if used while another call is in progress, like an asyncpg
+    connection ("another operation is in progress").
+    """
+
+    def __init__(self):
+        self.busy = False
+
+    async def _use(self, result):
+        assert not self.busy, "another operation is in progress"
+        self.busy = True
+        await asyncio.sleep(0.01)
+        self.busy = False
+        return result
+
+    async def fetch(self, query, *params):
+        return await self._use([(query,)])
+
+    async def fetchval(self, query, *params):
+        return await self._use(True)
+
+
+async def test_pg_database_queues_concurrent_calls():
+    db = AsyncPGDatabase("postgresql://localhost/unused")
+    db.conn = ExclusiveConnection()
+
+    results = await asyncio.gather(
+        db.fetch("SELECT 1;"), db.fetch("SELECT 2;"), db.table_exists("articles")
+    )
+    assert results == [[("SELECT 1;",)], [("SELECT 2;",)], True]
+
+
+class SlowDatabase:
+    def __init__(self):
+        self.active = 0
+        self.max_active = 0
+
+    async def _call(self, result):
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        await asyncio.sleep(0.05)
+        self.active -= 1
+        return result
+
+    async def get_user_profile(self, user_id):
+        return await self._call(UserProfile([], ["sports"]))
+
+    async def get_article_rows_page(self, filter, page, page_size, fields=None):
+        articles = [
+            {"article_id": 1, "category": "news", "title": "Title 1"},
+            {"article_id": 2, "category": "sports", "title": "Title 2"},
+        ]
+        return await self._call((articles, None))
+
+    async def get_popularity_scores(self, article_ids):
+        return {}
+
+
+async def test_profile_and_articles_are_read_concurrently():
+    recommender = pytest.importorskip("app.api.recommender")
+    db = SlowDatabase()
+
+    response = await recommender.recommended_articles(
+        None, "reader", page=1, page_size=35, language=None, fields=None, db=db
+    )
+    assert db.max_active == 2
+    # Cold start: the preferred category comes first
+    articles = json.loads(response.body)["articles"]
+    assert [article["title"] for article in articles] == ["Title 2", "Title 1"]
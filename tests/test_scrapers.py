@@ -0,0 +1,99 @@
+from pathlib import Path
+import pytest
+from app.database.url_index import UrlIndex
+from app.models.article import Article
+
+news = pytest.importorskip("app.utils.scrapers.news")
+
+pytestmark = pytest.mark.anyio
+
+# Article pages per provider, with the author markup each extract_author
+# handles (and some it must not match). The page title and date hold the
+# page's number; the body is shared.
+PAGES = Path(__file__).parent / "pages"
+EXTRACTED_AUTHORS = {
+    "gmanews/meta-author.html": (1, "Juan Dela Cruz"),
+    "gmanews/no-author.html": (2, "GMA News Online"),
+    "philstar/credits-links.html": (3, "Maria Santos"),
+    "philstar/credits-text.html": (4, "Pedro Reyes"),
+    "philstar/meta-author-ignored.html": (5, "Philstar.com"),
+    "manilabulletin/author-link.html": (6, "Ana Lopez"),
+    "manilabulletin/inexact-class.html": (7, "Manila Bulletin"),
+    "inquirer/meta-author.html": (8, "Jane Doe"),
+    "inquirer/script-author.html": (9, "Mark Villanueva"),
+    "inquirer/art-plat.html": (10, "Leila Cruz"),
+    "inquirer/empty-script-author.html": (11, "INQUIRER.net"),
+    "news5/meta-author-div.html": (12, "Carlo Mateo"),
+    "news5/no-author.html": (13, "News5"),
+    "abantenews/meta-author.html": (14, "Abante"),
+    "abs-cbn/author.html": (15, "John Smith"),
+    "abs-cbn/authors-class.html": (16, "ABS-CBN News"),
+}
+
+
+@pytest.mark.parametrize("provider", list(news.Provider))
+def test_provider_config(provider):
+    config = news.get_scraper_strategy(provider).config
+    assert config.provider_name == provider.value
+    assert config.category_mapping
+
+
+class FakeScraper(news.ScraperStrategy):
+    def __init__(self, name: str, fail: bool = False):
+        self.name = name
+        self.fail = fail
+
+    @property
+    def config(self):
+        if self.fail:
+            raise TypeError("broken config")
+        return news.ScraperConfig(
+            provider_name=self.name,
+            default_author=self.name,
+            category_mapping={news.Category.News: "news"},
+        )
+
+    async def scrape_category(self, category, proxy_scraper=None, url_index=None):
+        return [
+            Article(
+                date="", category="news", source=self.name, title="", url=self.name
+            )
+        ]
+
+
+async def test_failing_provider_does_not_abort_the_run(monkeypatch):
+    strategies = {
+        news.Provider.GMANews: FakeScraper("gmanews"),
+        news.Provider.News5: FakeScraper("news5", fail=True),
+    }
+    monkeypatch.setattr(news, "get_scraper_strategy", strategies.get)
+
+    results, timeline = await news.scrape_providers(
+        None, UrlIndex(), list(strategies)
+    )
+
+    assert [a.source for a in results[news.Provider.GMANews]] == ["gmanews"]
+    assert results[news.Provider.News5] == []
+    assert [span.provider for span in timeline.provider_spans()] == ["gmanews"]
+
+
+def test_every_provider_has_pages():
+    assert {path.name for path in PAGES.iterdir()} == {p.value for p in news.Provider}
+    assert sorted(EXTRACTED_AUTHORS) == sorted(
+        str(path.relative_to(PAGES)) for path in PAGES.glob("*/*.html")
+    )
+
+
+@pytest.mark.parametrize("page", sorted(EXTRACTED_AUTHORS))
+def test_extract(page):
+    number, author = EXTRACTED_AUTHORS[page]
+    provider = news.Provider(page.split("/")[0])
+    url = f"https://example.com/{page}"
+
+    extracted = news.get_scraper_strategy(provider).extract(
+        url, (PAGES / page).read_bytes()
+    )
+    assert extracted.author == author
+    assert extracted.title == f"Senate approves bill {number} on third reading"
+    assert extracted.publish_date == f"2024-03-{number:02d}T10:00:00+08:00"
+    assert extracted.body.startswith("Paragraph 0:")
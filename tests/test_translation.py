@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+import app.core.translation as translation
+from app.database.dates import published_timestamp
+from factories import make_articles
+
+pytestmark = pytest.mark.anyio
+
+
+async def test_untranslated_articles_are_limited_and_newest_first(db):
+    articles = make_articles(10)
+    await db.insert_articles(articles)
+    since = published_timestamp(articles[2].date)
+
+    found = await db.get_untranslated_articles("fil", "bing", since, 3)
+    assert [a.title for a in found] == ["Title 9", "Title 8", "Title 7"]
+    assert all(len(a.body) > 1000 for a in found)
+
+    await db.save_translation(
+        found[0].article_id, "fil", "bing", "hash", {"title": "t", "body": "b"}
+    )
+    found = await db.get_untranslated_articles("fil", "bing", since, 3)
+    assert [a.title for a in found] == ["Title 8", "Title 7", "Title 6"]
+    # Other services are tracked separately
+    found = await db.get_untranslated_articles("fil", "google", since, 1)
+    assert [a.title for a in found] == ["Title 9"]
+
+
+async def test_untranslated_articles_pages_past_rejected_snippets(db):
+    await db.insert_articles(make_articles(10))
+
+    # Only every third article is accepted, so several pages are read
+    accepted = {"Title 0", "Title 3", "Title 6", "Title 9"}
+    titles = {
+        article.body[:40]: article.title for article in make_articles(10)
+    }
+    found = await db.get_untranslated_articles(
+        "fil",
+        "bing",
+        0,
+        3,
+        accept=lambda snippet: titles.get(snippet[:40]) in accepted,
+    )
+    assert [a.title for a in found] == ["Title 9", "Title 6", "Title 3"]
+
+
+class FakeService:
+    async def translate_article(self, title, body, service, target):
+        await asyncio.sleep(0.01)
+        return {"title": title.upper(), "body": body.upper()}
+
+
+class ExclusiveDatabase:
+    """
+    Fails if called while another call is in progress, like one asyncpg
+    connection.
+    """
+
+    def __init__(self, articles):
+        self.articles = articles
+        self.busy = False
+        self.saved = []
+
+    async def get_untranslated_articles(self, target, service, since, limit, accept):
+        return self.articles[:limit]
+
+    async def save_translation(self, article_id, target, service, key, translation):
+        assert not self.busy, "another operation is in progress"
+        self.busy = True
+        await asyncio.sleep(0.01)
+        self.saved.append(article_id)
+        self.busy = False
+
+
+async def test_pretranslate_serializes_database_calls(monkeypatch):
+    monkeypatch.setattr(translation, "get_translation_service", FakeService)
+    monkeypatch.setenv("PRETRANSLATE_CONCURRENCY", "4")
+    articles = make_articles(8)
+    for i, article in enumerate(articles):
+        article.article_id = i
+    db = ExclusiveDatabase(articles)
+
+    await translation.pretranslate_articles(db)
+
+    assert sorted(db.saved) == list(range(8))
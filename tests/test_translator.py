@@ -0,0 +1,103 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from app.utils.nlp.translator import TranslationService, split_long_text
+
+pytestmark = pytest.mark.anyio
+
+
+class StubTranslator(BaseHTTPRequestHandler):
+    """
+    Azure-shaped /translate endpoint that upper-cases every text and records
+    the texts of each request.
+    """
+
+    requests: list[list[str]] = []
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers["Content-Length"])
+        texts = [item["Text"] for item in json.loads(self.rfile.read(length))]
+        self.requests.append(texts)
+        body = json.dumps(
+            [{"translations": [{"text": text.upper()}]} for text in texts]
+        ).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def stub_server(monkeypatch):
+    StubTranslator.requests = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubTranslator)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv(
+        "AZURE_TRANSLATOR_ENDPOINT", f"http://127.0.0.1:{server.server_address[1]}"
+    )
+    yield StubTranslator
+    server.shutdown()
+
+
+@pytest.fixture
+async def service(stub_server):
+    service = TranslationService(timeout=5, concurrency=4)
+    yield service
+    await service.close()
+
+
+def test_split_long_text_keeps_order():
+    text = "Alpha beta. Gamma delta. " + "w " * 20
+    parts = split_long_text(text, 12)
+    assert parts[:2] == ["Alpha beta.", "Gamma delta."]
+    assert all(len(part) <= 12 for part in parts)
+    assert " ".join(parts).split() == text.split()
+
+
+def test_split_long_text_keeps_short_text_whole():
+    assert split_long_text("One. Two.", 100) == ["One. Two."]
+
+
+async def test_translate_article_keeps_paragraphs(service, stub_server):
+    body = "First paragraph.\n\nSecond paragraph.\n   \nThird."
+    result = await service.translate_article("Title", body)
+
+    assert result == {
+        "title": "TITLE",
+        "body": "FIRST PARAGRAPH.\n\nSECOND PARAGRAPH.\n   \nTHIRD.",
+    }
+    # Title and the three non-empty paragraphs in one request
+    assert stub_server.requests == [
+        ["Title", "First paragraph.", "Second paragraph.", "Third."]
+    ]
+
+
+async def test_translate_article_splits_long_paragraphs(service, stub_server):
+    translator = service.get_translator("bing")
+    translator.max_chars = 40
+    sentences = [f"Sentence number {i} is here." for i in range(10)]
+    body = "Short intro.\n" + " ".join(sentences)
+
+    result = await service.translate_article("Title", body)
+
+    intro, long_paragraph = result["body"].split("\n")
+    assert intro == "SHORT INTRO."
+    assert long_paragraph == " ".join(sentences).upper()
+    sent = [text for request in stub_server.requests for text in request]
+    assert all(len(text) <= 40 for text in sent)
+    assert all(sum(map(len, request)) <= 40 for request in stub_server.requests)
+
+
+async def test_translate_keeps_order_across_chunks(service, stub_server):
+    translator = service.get_translator("bing")
+    translator.max_items = 3
+    texts = [f"text {i}" for i in range(10)]
+
+    assert await service.translate_texts(texts) == [text.upper() for text in texts]
+    # Chunks are sent concurrently, so they arrive in any order
+    assert sorted(len(request) for request in stub_server.requests) == [1, 3, 3, 3]
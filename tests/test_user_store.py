@@ -0,0 +1,269 @@
+from datetime import datetime, timezone
+from types import SimpleNamespace
+import pytest
+import app.database.user_store as user_store
+from app.database.user_store import (
+    UserHistoryCache,
+    UserProfile,
+    UserStore,
+    merge_history,
+)
+
+pytestmark = pytest.mark.anyio
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self.exists = data is not None
+        self._data = data
+
+    def get(self, field):
+        return self._data[field]
+
+    def to_dict(self):
+        return dict(self._data) if self.exists else None
+
+
+class FakeWatch:
+    def __init__(self):
+        self.unsubscribed = False
+
+    def unsubscribe(self):
+        self.unsubscribed = True
+
+
+class FakeQuery:
+    """
+    A collection, or a query of its documents.
+    """
+
+    def __init__(self, client, path, filters=(), order=None, count=None):
+        self.client = client
+        self.path = path
+        self.filters = list(filters)
+        self.order = order
+        self.count = count
+
+    def document(self, document_id):
+        return FakeDocumentRef(self.client, f"{self.path}/{document_id}")
+
+    def where(self, filter):
+        return FakeQuery(
+            self.client, self.path, self.filters + [filter], self.order, self.count
+        )
+
+    def order_by(self, field, direction):
+        return FakeQuery(self.client, self.path, self.filters, field, self.count)
+
+    def limit(self, count):
+        return FakeQuery(self.client, self.path, self.filters, self.order, count)
+
+    def stream(self):
+        self.client.queries.append(self)
+        docs = [
+            FakeSnapshot(FakeDocumentRef(self.client, path), data)
+            for path, data in self.client.docs.items()
+            if path.rpartition("/")[0] == self.path
+        ]
+        for filter in self.filters:
+            assert filter.op_string == ">"
+            docs = [d for d in docs if d.get(filter.field_path) > filter.value]
+        docs.sort(key=lambda doc: doc.get(self.order), reverse=True)
+        return docs[: self.count]
+
+    def on_snapshot(self, callback):
+        watch = FakeWatch()
+        self.client.listeners.append((self, callback))
+        self.client.watches.append(watch)
+        callback(self.stream(), [], None)
+        return watch
+
+
+class FakeDocumentRef:
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+        self.id = path.rpartition("/")[2]
+
+    def get(self):
+        return FakeSnapshot(self, self.client.docs.get(self.path))
+
+    def collection(self, name):
+        return FakeQuery(self.client, f"{self.path}/{name}")
+
+
+class FakeFirestore:
+    """
+    The subset of the Firestore client used by UserStore, over documents
+    stored by path.
+    """
+
+    def __init__(self):
+        self.docs = {}
+        self.queries = []
+        self.listeners = []
+        self.watches = []
+
+    def collection(self, name):
+        return FakeQuery(self, name)
+
+    def get_all(self, refs):
+        return [ref.get() for ref in refs]
+
+    def add_user(self, user_id, categories=None):
+        self.docs[f"users/{user_id}"] = {}
+        if categories is not None:
+            self.docs[f"users/{user_id}/preferences/categories"] = {
+                "categories": categories
+            }
+
+    def add_click(self, user_id, article_id, clicked_at):
+        self.docs[f"users/{user_id}/history/{article_id}"] = {
+            "timestamp": datetime.fromtimestamp(clicked_at, timezone.utc)
+        }
+        for query, callback in self.listeners:
+            if query.path == f"users/{user_id}/history":
+                callback(query.stream(), [], None)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(
+        user_store, "time", SimpleNamespace(monotonic=lambda: clock.now)
+    )
+    return clock
+
+
+@pytest.fixture
+def firestore():
+    client = FakeFirestore()
+    client.add_user("reader", categories=["sports"])
+    for article_id, clicked_at in [("1", 100.0), ("2", 200.0), ("3", 300.0)]:
+        client.add_click("reader", article_id, clicked_at)
+    return client
+
+
+@pytest.fixture
+def store(firestore):
+    store = UserStore(firestore, UserHistoryCache(), history_limit=2)
+    yield store
+    store.close()
+
+
+def test_merge_history_keeps_latest_clicks():
+    entries = [("1", 500.0), ("2", 200.0)]
+    mirrored = [("1", 400.0), ("3", 300.0), ("4", 100.0)]
+    assert merge_history(entries, mirrored, 3) == [
+        ("1", 500.0),
+        ("3", 300.0),
+        ("2", 200.0),
+    ]
+    assert merge_history([], [], 3) == []
+
+
+def test_cache_entries_expire(clock):
+    cache = UserHistoryCache(ttl=60)
+    cache.set("reader", ["1"])
+    cache.set("missing", None)
+
+    clock.now += 59
+    assert cache.get("reader") == (True, ["1"])
+    assert cache.get("missing") == (True, None)
+    clock.now += 2
+    assert cache.get("reader") == (False, None)
+    assert cache.size() == 1
+
+
+def test_watched_cache_entries_do_not_expire(clock):
+    cache = UserHistoryCache(ttl=60)
+    cache.set("reader", ["1"], FakeWatch())
+
+    clock.now += 3600
+    assert cache.get("reader") == (True, ["1"])
+    cache.update("reader", ["1", "2"])
+    assert cache.get("reader") == (True, ["1", "2"])
+    # Users that are not cached are not added by their listener
+    cache.update("other", ["3"])
+    assert cache.get("other") == (False, None)
+
+
+def test_cache_evicts_least_recently_used_and_unsubscribes():
+    cache = UserHistoryCache(max_users=2)
+    watches = {user_id: FakeWatch() for user_id in "abc"}
+    cache.set("a", [], watches["a"])
+    cache.set("b", [], watches["b"])
+    cache.get("a")
+    cache.set("c", [], watches["c"])
+
+    assert cache.get("b") == (False, None)
+    assert watches["b"].unsubscribed
+    assert not watches["a"].unsubscribed and not watches["c"].unsubscribed
+
+
+def test_cache_unsubscribes_replaced_and_cleared_watches():
+    cache = UserHistoryCache()
+    first, second = FakeWatch(), FakeWatch()
+    cache.set("reader", [], first)
+    cache.set("reader", ["1"], first)
+    assert not first.unsubscribed
+
+    cache.set("reader", ["1"], second)
+    assert first.unsubscribed and not second.unsubscribed
+    cache.clear()
+    assert second.unsubscribed
+    assert cache.size() == 0
+
+
+async def test_get_user_profile(store, firestore):
+    profile = await store.get_user_profile("reader")
+    # The latest `history_limit` clicks, oldest first
+    assert profile == UserProfile(["2", "3"], ["sports"])
+
+    # The history is cached, only the preferences are read again
+    firestore.queries.clear()
+    assert await store.get_user_profile("reader") == profile
+    assert firestore.queries == []
+
+
+async def test_user_without_preferences(store, firestore):
+    firestore.add_user("new")
+    assert await store.get_user_profile("new") == UserProfile([], [])
+    assert await store.get_user_preferences("new") == []
+
+
+async def test_missing_user_raises_value_error(store, firestore):
+    with pytest.raises(ValueError):
+        await store.get_user_profile("missing")
+    with pytest.raises(ValueError):
+        await store.get_user_history("missing")
+    with pytest.raises(ValueError):
+        await store.get_user_preferences("missing")
+    # The missing user is cached, Firestore was queried only once
+    assert len(firestore.queries) == 1
+
+
+async def test_mirror_limits_firestore_reads(store, firestore, db):
+    await db.mirror_history("reader", [("2", 200.0)], keep=2)
+
+    assert await store.get_user_history("reader", mirror=db) == ["2", "3"]
+    [query] = firestore.queries
+    [after] = query.filters
+    assert after.value == datetime.fromtimestamp(200.0, timezone.utc)
+    assert await db.get_mirrored_history("reader", 10) == [
+        ("3", 300.0),
+        ("2", 200.0),
+    ]
+
+
+async def test_listener_keeps_history_current(firestore):
+    store = UserStore(firestore, UserHistoryCache(ttl=0), listen=True)
+    try:
+        assert await store.get_user_history("reader") == ["1", "2", "3"]
+        firestore.add_click("reader", "4", 400.0)
+        assert await store.get_user_history("reader") == ["1", "2", "3", "4"]
+    finally:
+        store.close()
+    assert [watch.unsubscribed for watch in firestore.watches] == [True]